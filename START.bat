@@ -47,7 +47,7 @@ if not exist "venv\Scripts\activate.bat" (
 )
 
 echo [5/6] Checking model files...
-if not exist "models\xgb_model.joblib" (
+if not exist "models\registry\CURRENT" if not exist "models\road_cost_model.joblib" (
     echo [WARNING] ML model not found - using fallback calculations.
 )
 
@@ -1,28 +1,33 @@
+import time
+_import_started = time.perf_counter()  # startup timing: importing this module
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
-import subprocess
 import json
 import os
 import hashlib
-import pymysql
-import yaml
-
-# Load config
-cfg = yaml.safe_load(open("config.yaml"))
-
-def get_conn():
-    return pymysql.connect(
-        host=cfg["mysql"]["host"],
-        user=cfg["mysql"]["user"],
-        password=cfg["mysql"]["password"],
-        db=cfg["mysql"]["db"],
-        cursorclass=pymysql.cursors.DictCursor,
-        charset="utf8mb4"
-    )
+
+from backend.database import (
+    cfg, connection, get_pool_stats, run_db, fetch_one, fetch_all, execute, run_in_transaction,
+    insert_predicted_projects, get_prediction_write_stats
+)
+from backend.utils.material_catalog import get_catalog, invalidate_catalog, get_catalog_stats
+from backend.utils.quantity_estimator import (
+    estimate_quantities_batch, quantities_to_dict, LOCATION_TYPES, PROJECT_TYPES, TRAFFIC_LEVELS, SOIL_TYPES
+)
+from backend.utils.cost_engine import price_quantities, project_breakdown, budget_summary
+from backend.utils.quote_tokens import issue_quote_token, read_quote_token, InvalidQuoteToken
+from backend.utils.scenario_sweep import build_axes, run_sweep, SweepError
+from backend.utils.cost_uncertainty import simulate_costs, MAX_SAMPLES
+from backend.ml.model_server import get_model_server, get_model_stats
+from backend.ml import model_registry
+from backend.utils.warmup import Warmup, process_age_seconds
+from backend.utils.prediction_cache import get_prediction_cache, get_prediction_cache_stats, prediction_key
+from backend.ml.training_jobs import training_runner, TrainingAlreadyRunning, progress_line
 
 app = FastAPI(title="Road Cost Prediction API - Redesigned")
 
@@ -65,6 +70,23 @@ class ProjectInput(BaseModel):
     soil_type: str = "normal"
     traffic_volume: str = "medium"
 
+class QuoteSave(BaseModel):
+    quote_token: str
+
+class ParameterRange(BaseModel):
+    start: float
+    stop: float
+    steps: int = 5
+
+class ScenarioSweep(BaseModel):
+    base: ProjectInput
+    road_length_km: Optional[Union[ParameterRange, List[float]]] = None
+    road_width_m: Optional[Union[ParameterRange, List[float]]] = None
+    project_type: Optional[List[str]] = None
+    traffic_volume: Optional[List[str]] = None
+    location_type: Optional[List[str]] = None
+    include_cells: bool = True
+
 class MaterialPriceUpdate(BaseModel):
     material_id: int
     price_current: float
@@ -88,22 +110,21 @@ class TenderTrainingData(BaseModel):
 # AUTHENTICATION
 # ============================================================================
 
+async def require_admin(admin_id: int, detail: str = "Admin access required"):
+    """Raise 403 unless admin_id belongs to an admin account"""
+    admin = await fetch_one("SELECT role FROM users WHERE user_id=%s", (admin_id,))
+    if not admin or admin['role'] != 'admin':
+        raise HTTPException(status_code=403, detail=detail)
+
 @app.post("/api/auth/login")
 async def login(credentials: UserLogin):
     """Login for admin and employees"""
-    conn = get_conn()
-    cur = conn.cursor()
-
     password_hash = hashlib.sha256(credentials.password.encode()).hexdigest()
-    cur.execute("""
+    user = await fetch_one("""
         SELECT user_id, name, email, role FROM users
         WHERE username=%s AND password_hash=%s
     """, (credentials.username, password_hash))
 
-    user = cur.fetchone()
-    cur.close()
-    conn.close()
-
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -118,24 +139,14 @@ async def login(credentials: UserLogin):
 @app.post("/api/auth/change-password")
 async def change_password(user_id: int, password_data: PasswordChange):
     """Change user password"""
-    conn = get_conn()
-    cur = conn.cursor()
-
     # Verify old password
     old_hash = hashlib.sha256(password_data.old_password.encode()).hexdigest()
-    cur.execute("SELECT 1 FROM users WHERE user_id=%s AND password_hash=%s", (user_id, old_hash))
-
-    if not cur.fetchone():
-        cur.close()
-        conn.close()
+    if not await fetch_one("SELECT 1 FROM users WHERE user_id=%s AND password_hash=%s", (user_id, old_hash)):
         raise HTTPException(status_code=400, detail="Incorrect old password")
 
     # Update password
     new_hash = hashlib.sha256(password_data.new_password.encode()).hexdigest()
-    cur.execute("UPDATE users SET password_hash=%s WHERE user_id=%s", (new_hash, user_id))
-    conn.commit()
-    cur.close()
-    conn.close()
+    await execute("UPDATE users SET password_hash=%s WHERE user_id=%s", (new_hash, user_id))
 
     return {"message": "Password changed successfully"}
 
@@ -146,64 +157,33 @@ async def change_password(user_id: int, password_data: PasswordChange):
 @app.post("/api/admin/create-user")
 async def admin_create_user(admin_id: int, user_data: UserCreate):
     """Admin creates employee account"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Only admins can create users")
+    await require_admin(admin_id, "Only admins can create users")
 
     # Check if username exists
-    cur.execute("SELECT 1 FROM users WHERE username=%s", (user_data.username,))
-    if cur.fetchone():
-        cur.close()
-        conn.close()
+    if await fetch_one("SELECT 1 FROM users WHERE username=%s", (user_data.username,)):
         raise HTTPException(status_code=400, detail="Username already exists")
 
     # Create user
     password_hash = hashlib.sha256(user_data.password.encode()).hexdigest()
-    cur.execute("""
+    user_id = await execute("""
         INSERT INTO users (name, email, phone, username, password_hash, role, created_by)
         VALUES (%s, %s, %s, %s, %s, 'employee', %s)
     """, (user_data.name, user_data.email, user_data.phone, user_data.username, password_hash, admin_id))
 
-    conn.commit()
-    user_id = cur.lastrowid
-    cur.close()
-    conn.close()
-
     return {"message": "User created successfully", "user_id": user_id}
 
 @app.get("/api/admin/users")
 async def get_all_users(admin_id: int):
     """Get all employees (admin only)"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    await require_admin(admin_id)
 
     # Get all users except admin
-    cur.execute("""
+    users = await fetch_all("""
         SELECT user_id, name, email, phone, username, role, created_at
         FROM users
         WHERE role='employee'
         ORDER BY created_at DESC
     """)
-    users = cur.fetchall()
-    cur.close()
-    conn.close()
 
     return [{"user_id": u['user_id'], "name": u['name'], "email": u['email'],
             "phone": u['phone'], "username": u['username'],
@@ -212,37 +192,19 @@ async def get_all_users(admin_id: int):
 @app.delete("/api/admin/delete-user/{user_id}")
 async def delete_user(admin_id: int, user_id: int):
     """Admin deletes employee (projects remain)"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    await require_admin(admin_id)
 
     # Check if user is employee
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (user_id,))
-    target = cur.fetchone()
+    target = await fetch_one("SELECT role FROM users WHERE user_id=%s", (user_id,))
 
     if not target:
-        cur.close()
-        conn.close()
         raise HTTPException(status_code=404, detail="User not found")
 
     if target['role'] == 'admin':
-        cur.close()
-        conn.close()
         raise HTTPException(status_code=400, detail="Cannot delete admin account")
 
     # Delete user (CASCADE will delete their projects)
-    cur.execute("DELETE FROM users WHERE user_id=%s", (user_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    await execute("DELETE FROM users WHERE user_id=%s", (user_id,))
 
     return {"message": "User deleted successfully"}
 
@@ -253,20 +215,10 @@ async def delete_user(admin_id: int, user_id: int):
 @app.get("/api/admin/materials-prices")
 async def get_all_materials_prices(admin_id: int):
     """Get all materials with prices (admin only)"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    await require_admin(admin_id)
 
     # Get materials with prices
-    cur.execute("""
+    materials = await fetch_all("""
         SELECT m.material_id, m.material_name, m.unit, mc.category_name,
                mp.price_2023, mp.price_2024, mp.price_current,
                mp.last_updated_at
@@ -275,9 +227,6 @@ async def get_all_materials_prices(admin_id: int):
         LEFT JOIN material_prices mp ON m.material_id = mp.material_id
         ORDER BY mc.display_order, m.material_name
     """)
-    materials = cur.fetchall()
-    cur.close()
-    conn.close()
 
     return [{
         "material_id": m['material_id'],
@@ -290,22 +239,7 @@ async def get_all_materials_prices(admin_id: int):
         "last_updated": m['last_updated_at'].strftime("%Y-%m-%d %H:%M") if m['last_updated_at'] else None
     } for m in materials]
 
-@app.post("/api/admin/update-material-prices")
-async def update_material_prices(admin_id: int, updates: List[MaterialPriceUpdate]):
-    """Admin updates material prices (bulk update)"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
-
-    # Update prices
+def _apply_price_updates(cur, admin_id, updates):
     for update in updates:
         cur.execute("""
             UPDATE material_prices
@@ -313,9 +247,14 @@ async def update_material_prices(admin_id: int, updates: List[MaterialPriceUpdat
             WHERE material_id=%s
         """, (update.price_current, admin_id, update.material_id))
 
-    conn.commit()
-    cur.close()
-    conn.close()
+@app.post("/api/admin/update-material-prices")
+async def update_material_prices(admin_id: int, updates: List[MaterialPriceUpdate]):
+    """Admin updates material prices (bulk update)"""
+    await require_admin(admin_id)
+
+    # Update prices
+    await run_in_transaction(_apply_price_updates, admin_id, updates)
+    invalidate_catalog()
 
     return {"message": f"Updated {len(updates)} material prices successfully"}
 
@@ -324,298 +263,315 @@ async def update_material_prices(admin_id: int, updates: List[MaterialPriceUpdat
 # ============================================================================
 
 def get_material_prices_dict():
-    """Get current material prices from database"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT m.material_name, mp.price_current
-        FROM materials m
-        JOIN material_prices mp ON m.material_id = mp.material_id
-    """)
-    prices = {row['material_name']: float(row['price_current']) for row in cur.fetchall()}
-    cur.close()
-    conn.close()
-    return prices
+    """Get current material prices (from the cached catalog snapshot)"""
+    return get_catalog().prices
 
 def get_material_climate_impacts_dict():
-    """Get climate impact factors from database"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT m.material_name, mci.emission_factor_kg_co2_per_kg,
-               mci.energy_consumption_mj, mci.water_usage_liters
-        FROM materials m
-        JOIN material_climatic_impact mci ON m.material_id = mci.material_id
-    """)
-    impacts = {}
-    for row in cur.fetchall():
-        impacts[row['material_name']] = {
-            'co2': float(row['emission_factor_kg_co2_per_kg']),
-            'energy': float(row['energy_consumption_mj'] or 0),
-            'water': float(row['water_usage_liters'] or 0)
-        }
-    cur.close()
-    conn.close()
-    return impacts
+    """Get climate impact factors (from the cached catalog snapshot)"""
+    return get_catalog().climate
 
 def estimate_material_quantities(project_data):
     """
     Estimate material quantities based on project specs
     Returns quantities in their billing units (MT, bags, kg, cft, etc.)
+    The rules live in backend/utils/quantity_estimator.py; use
+    estimate_quantities_batch() there to evaluate many projects at once.
     """
-    area_sqm = project_data.road_length_km * 1000 * project_data.road_width_m
-    length_km = project_data.road_length_km
-    
-    # Road type multipliers
-    multipliers = {
-        "rural_road": {"cement": 0.35, "bitumen": 0.40, "steel": 0.25, "aggregate": 0.50, "sand": 0.50},
-        "urban_road": {"cement": 0.70, "bitumen": 0.75, "steel": 0.60, "aggregate": 0.80, "sand": 0.80},
-        "highway": {"cement": 1.0, "bitumen": 1.0, "steel": 1.0, "aggregate": 1.0, "sand": 1.0},
-        "expressway": {"cement": 1.40, "bitumen": 1.35, "steel": 1.50, "aggregate": 1.30, "sand": 1.20}
-    }
-    mult = multipliers.get(project_data.project_type.lower().strip(), multipliers["highway"])
-    
-    materials = {}
-    
-    # INCREASED BASE QUANTITIES for more realistic expressway costs
-    # Bitumen (Metric Tons) - Increased from 8kg/m² to 12kg/m² for thicker asphalt
-    materials["Bitumen 60/70"] = area_sqm * 0.012 * mult["bitumen"]  # Was 0.008
-    materials["Bitumen 80/100"] = area_sqm * 0.003 * mult["bitumen"]  # Was 0.002
-    
-    # Asphalt mixes (Metric Tons) - Increased for thicker wearing course
-    materials["Asphaltic Concrete (Mix)"] = area_sqm * 0.150 * mult["bitumen"]  # Was 0.100
-    materials["Premix Carpet (Mix)"] = area_sqm * 0.075 * mult["bitumen"]  # Was 0.050
-    
-    # Cement (50 kg bags) - Increased from 35kg/m² to 50kg/m² for stronger base
-    cement_kg_per_sqm = 50 * mult["cement"]  # Was 35
-    materials["Cement OPC Grade 53"] = (area_sqm * cement_kg_per_sqm) / 50
-    materials["Cement PPC"] = (area_sqm * cement_kg_per_sqm * 0.3) / 50
-    
-    # Steel (kg) - Increased for heavy-duty reinforcement
-    materials["Steel Bar 10mm"] = area_sqm * 4.5 * mult["steel"]  # Was 3
-    materials["Steel Bar 16mm"] = area_sqm * 3.0 * mult["steel"]  # Was 2
-    materials["Steel Mesh"] = area_sqm * 0.4 * mult["steel"]  # Was 0.3
-    
-    # Aggregates (cft) - Increased layer thickness
-    base_thickness_m = 0.20  # Was 0.15 (200mm instead of 150mm)
-    subbase_thickness_m = 0.30  # Was 0.25 (300mm instead of 250mm)
-    
-    base_volume_m3 = area_sqm * base_thickness_m
-    subbase_volume_m3 = area_sqm * subbase_thickness_m
-    
-    materials["Crushed Stone 20mm"] = base_volume_m3 * 35.315 * 0.5 * mult["aggregate"]
-    materials["Crushed Stone 40mm"] = subbase_volume_m3 * 35.315 * 0.4 * mult["aggregate"]
-    materials["Bajri (Sargodha/Deena)"] = subbase_volume_m3 * 35.315 * 0.3 * mult["aggregate"]
-    materials["Brick Ballast (Rora)"] = subbase_volume_m3 * 35.315 * 0.2 * mult["aggregate"]
-    materials["Kankar"] = subbase_volume_m3 * 35.315 * 0.1 * mult["aggregate"]
-    
-    # Sand (cft) - Increased leveling layer
-    sand_volume_m3 = area_sqm * 0.075  # Was 0.05 (75mm instead of 50mm)
-    materials["Ravi Sand"] = sand_volume_m3 * 35.315 * 0.6 * mult["sand"]
-    materials["Chenab Sand"] = sand_volume_m3 * 35.315 * 0.4 * mult["sand"]
-    
-    # Additives (Metric Tons) - Increased for better soil stabilization
-    materials["Hydrated Lime"] = area_sqm * 0.0015 * mult["cement"]  # Was 0.001
-    materials["Fly Ash"] = area_sqm * 0.003 * mult["cement"]  # Was 0.002
-    
-    # Road furniture and accessories - Increased for expressway standards
-    materials["Thermoplastic Paint"] = length_km * 200  # Was 150
-    materials["Glass Beads"] = length_km * 20  # Was 15
-    materials["RCC Pipe 300mm"] = length_km * 150  # Was 100
-    materials["PVC Pipe 200mm"] = length_km * 75  # Was 50
-    materials["W-Beam Guardrail"] = length_km * 300 * mult["steel"]  # Was 200
-    materials["Road Sign (Aluminum)"] = length_km * 15  # Was 10
-    
-    # Terrain adjustment
-    if project_data.location_type.lower().strip() == "mountainous":
-        for key in ["Cement OPC Grade 53", "Steel Bar 10mm", "Steel Bar 16mm",
-                   "Crushed Stone 20mm", "Bitumen 60/70", "W-Beam Guardrail"]:
-            if key in materials:
-                materials[key] *= 1.25
-    
-    # Traffic adjustment
-    traffic_mult = {"low": 0.85, "medium": 1.0, "high": 1.20}.get(
-        project_data.traffic_volume.lower().strip(), 1.0
-    )
-    for key in ["Bitumen 60/70", "Asphaltic Concrete (Mix)", "Cement OPC Grade 53",
-               "Steel Bar 10mm", "Thermoplastic Paint"]:
-        if key in materials:
-            materials[key] *= traffic_mult
-    
-    return materials
-
-@app.post("/api/predict")
-async def predict_project(project_data: ProjectInput, user_id: int):
-    """Predict project cost and generate report"""
+    return quantities_to_dict(estimate_quantities_batch([project_data])[0])
+
+def _ml_estimates(projects, quantities):
+    """ML cost estimate per project from the resident model (None when no model is loaded)"""
+    server = get_model_server()
+    # Polled here, not only in predict_records: a worker without a model must still find one published later
+    server.check_for_update()
+    if not server.ready:
+        return [None] * len(projects)
     try:
-        # Get prices and climate impacts from database
-        prices = get_material_prices_dict()
-        climate_impacts = get_material_climate_impacts_dict()
-
-        # Estimate materials
-        materials_qty = estimate_material_quantities(project_data)
-
-        # Calculate costs and climate impact
-        total_cost = 0
-        total_co2_kg = 0
-        total_energy = 0
-        total_water = 0
-        boq_list = []
-        climate_list = []
-
-        conn = get_conn()
-        cur = conn.cursor()
+        return server.predict_projects(projects, quantities)
+    except Exception as e:
+        # The BOQ total is the primary figure; a scoring failure should not fail the request
+        print(f"[WARN] ML estimate failed: {e}")
+        return [None] * len(projects)
+
+def _ml_summary(priced):
+    ml = priced.get('ml')
+    if not ml:
+        return None
+    return {
+        "predicted_cost": ml['estimate_pkr'],
+        "difference_from_boq": ml['estimate_pkr'] - priced['total_cost'],
+        "model_version": ml['model_version'],
+        "inference_ms": ml['inference_ms']
+    }
 
-        # Get material IDs and categories
-        cur.execute("""
-            SELECT m.material_id, m.material_name, m.unit, mc.category_name
-            FROM materials m
-            LEFT JOIN material_categories mc ON m.category_id = mc.category_id
-        """)
-        material_info = {row['material_name']: row for row in cur.fetchall()}
-
-        for mat_name, qty_in_correct_unit in materials_qty.items():
-            if qty_in_correct_unit < 0.01:
-                continue
-
-            mat_info = material_info.get(mat_name)
-            if not mat_info:
-                continue
-
-            unit_price = prices.get(mat_name, 0)
-            cost = qty_in_correct_unit * unit_price
-            total_cost += cost
-
-            # Climate impact calculation
-            impact = climate_impacts.get(mat_name, {})
-            
-            # For climate, we need kg - convert if necessary
-            if "Metric Ton" in mat_info['unit']:
-                qty_kg = qty_in_correct_unit * 1000
-            elif "50 kg Bag" in mat_info['unit']:
-                qty_kg = qty_in_correct_unit * 50
-            elif mat_info['unit'] in ['Cubic Foot (cft)', 'Running Meter (RM)', 'Square Foot (ft²)', 'Square Meter (m²)']:
-                # For volume/area units, estimate weight (varies by material)
-                # Rough estimates: 1 cft stone = 45kg, 1 RM pipe = 50kg, 1 m² mesh = 5kg
-                if 'Stone' in mat_name or 'Bajri' in mat_name or 'Ballast' in mat_name:
-                    qty_kg = qty_in_correct_unit * 45  # 45 kg per cft
-                elif 'Sand' in mat_name:
-                    qty_kg = qty_in_correct_unit * 40  # 40 kg per cft
-                elif 'Pipe' in mat_name:
-                    qty_kg = qty_in_correct_unit * 50  # 50 kg per RM
-                elif 'Mesh' in mat_name:
-                    qty_kg = qty_in_correct_unit * 5  # 5 kg per m²
-                else:
-                    qty_kg = qty_in_correct_unit  # Default: assume kg
-            else:
-                qty_kg = qty_in_correct_unit  # Already in kg
-            
-            co2_kg = qty_kg * impact.get('co2', 0)
-            energy_mj = qty_kg * impact.get('energy', 0)
-            water_l = qty_kg * impact.get('water', 0)
-
-            total_co2_kg += co2_kg
-            total_energy += energy_mj
-            total_water += water_l
-
-            # Store BOQ
-            boq_list.append({
-                'material_id': mat_info['material_id'],
-                'material_name': mat_name,
-                'quantity': qty_in_correct_unit,
-                'unit': mat_info['unit'],
-                'unit_price': unit_price,
-                'total_cost': cost,
-                'category': mat_info['category_name']
-            })
-
-            # Store climate impact
-            climate_list.append({
-                'material_id': mat_info['material_id'],
-                'quantity_kg': qty_kg,
-                'co2_kg': co2_kg,
-                'energy_mj': energy_mj,
-                'water_l': water_l
-            })
-                
-        db_boq = cur.fetchall()
-        print("First 10 items retrieved from database:")
-        for row in db_boq:
-            print(f"  {row['material_name']:40s}: {row['quantity']:>12,.2f} {row['unit']:20s} "
-                  f"× PKR {row['unit_price_pkr']:>10,.0f} = PKR {row['total_cost_pkr']:>15,.0f}")
-        
-        print("="*100 + "\n")
+def _price_project(project_data, catalog):
+    """Estimate materials and calculate costs and climate impact for one project (cached per input)"""
+    server = get_model_server()
+    cache = get_prediction_cache()
+    cache.check_versions(catalog.version, server.version)
+    key = prediction_key(project_data, catalog.version, server.version)
+
+    priced = cache.get(key)
+    cache_hit = priced is not None
+    if not cache_hit:
+        quantities = estimate_quantities_batch([project_data])
+        priced = project_breakdown(price_quantities(quantities, catalog), 0, catalog, project_data.max_budget_pkr)
+        priced['ml'] = _ml_estimates([project_data], quantities)[0]
+        # Don't pin a failed ML estimate for the cache TTL
+        if priced['ml'] is not None or not server.ready:
+            cache.put(key, priced)
+
+    # Budget fields depend on this request's budget, not on the cached inputs
+    return {**priced, **budget_summary(priced['total_cost'], project_data.max_budget_pkr), 'cache_hit': cache_hit}
+
+def _cost_range(project_data, catalog, simulations):
+    """Monte Carlo P10/P50/P90 cost and overrun probability from observed price spread"""
+    quantities = estimate_quantities_batch([project_data])
+    return simulate_costs(quantities, catalog, [project_data.max_budget_pkr], simulations)[0]
+
+def _check_simulations(simulations):
+    if not 0 <= simulations <= MAX_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"simulations must be between 0 and {MAX_SAMPLES}")
+
+def _run_prediction(project_data, user_id, simulations=0):
+    """Blocking part of /api/predict: reads the catalog, prices the BOQ and persists it"""
+    # Prices, climate factors and material info all come from one catalog snapshot
+    catalog = get_catalog()
+    priced = _price_project(project_data, catalog)
+
+    total_cost = priced['total_cost']
+    total_co2_kg = priced['total_co2_kg']
+
+    # Calculate budget status
+    within_budget = priced['within_budget']
+    budget_status = priced['budget_status']
+
+    # Insert project, prediction, BOQ and climate rows (multi-row batches, one transaction)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            project_id = insert_predicted_projects(cur, user_id, [(project_data, priced)])[0]
+        conn.commit()
 
-        # Calculate budget status
-        within_budget = total_cost <= project_data.max_budget_pkr
-        budget_status = "Within Budget" if within_budget else "Over Budget"
-        budget_diff = project_data.max_budget_pkr - total_cost
-        budget_util = (total_cost / project_data.max_budget_pkr) * 100
+    result = {
+        "project_id": project_id,
+        "project_name": project_data.project_name,
+        "predicted_cost": total_cost,
+        "co2_emissions_tons": total_co2_kg / 1000,
+        "budget_status": budget_status,
+        "within_budget": within_budget,
+        "ml_estimate": _ml_summary(priced),
+        "cache_hit": priced['cache_hit'],
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+    if simulations:
+        result["cost_uncertainty"] = _cost_range(project_data, catalog, simulations)
+    return result
 
-        # Insert project
-        area_hectares = (project_data.road_length_km * 1000 * project_data.road_width_m) / 10000
-        cur.execute("""
-            INSERT INTO projects
-            (user_id, project_name, location, location_type, parent_company,
-             road_length_km, road_width_m, area_hectares, project_type,
-             traffic_volume, soil_type, max_budget_pkr)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (user_id, project_data.project_name, project_data.location,
-              project_data.location_type, project_data.parent_company,
-              project_data.road_length_km, project_data.road_width_m, area_hectares,
-              project_data.project_type, project_data.traffic_volume,
-              project_data.soil_type, project_data.max_budget_pkr))
-
-        project_id = cur.lastrowid
-
-        # Insert prediction
-        cur.execute("""
-            INSERT INTO project_predictions
-            (project_id, predicted_cost_pkr, total_co2_emissions_tons,
-             total_energy_mj, total_water_liters, budget_status,
-             budget_difference_pkr, budget_utilization_percent, model_version)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'v2.0')
-        """, (project_id, total_cost, total_co2_kg/1000, total_energy, total_water,
-              budget_status, budget_diff, budget_util))
-
-        # Insert BOQ items
-        for item in boq_list:
-            cur.execute("""
-                INSERT INTO project_boq
-                (project_id, material_id, quantity, unit, unit_price_pkr, total_cost_pkr, category_name)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (project_id, item['material_id'], item['quantity'], item['unit'],
-                  item['unit_price'], item['total_cost'], item['category']))
-
-        # Insert climate impact
-        for item in climate_list:
-            cur.execute("""
-                INSERT INTO project_climate_impact
-                (project_id, material_id, quantity_kg, co2_emissions_kg,
-                 energy_consumption_mj, water_usage_liters)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (project_id, item['material_id'], item['quantity_kg'],
-                  item['co2_kg'], item['energy_mj'], item['water_l']))
+@app.post("/api/predict")
+async def predict_project(project_data: ProjectInput, user_id: int, simulations: int = 0):
+    """Predict project cost and generate report (simulations > 0 adds a Monte Carlo cost range)"""
+    _check_simulations(simulations)
+    try:
+        return await run_db(_run_prediction, project_data, user_id, simulations)
+    except Exception as e:
+        print(f"[ERROR] Prediction failed: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
 
-        conn.commit()
-        cur.close()
-        conn.close()
+MAX_BATCH_SIZE = 1000
+
+# ENUM columns of projects (sql/schema.sql); one bad value would fail the whole batch INSERT
+PROJECT_ENUMS = {
+    "location_type": LOCATION_TYPES,
+    "project_type": PROJECT_TYPES,
+    "traffic_volume": TRAFFIC_LEVELS,
+    "soil_type": SOIL_TYPES,
+}
+
+def _validate_project_input(project_data):
+    """Per-item checks for batch requests; returns an error message or None (normalizes ENUM fields)"""
+    if project_data.road_length_km <= 0:
+        return "road_length_km must be greater than 0"
+    if project_data.road_width_m <= 0:
+        return "road_width_m must be greater than 0"
+    if project_data.max_budget_pkr <= 0:
+        return "max_budget_pkr must be greater than 0"
+    for field, allowed in PROJECT_ENUMS.items():
+        value = (getattr(project_data, field) or "").lower().strip()
+        if value not in allowed:
+            return f"{field} must be one of {', '.join(allowed)} (got {getattr(project_data, field)!r})"
+        setattr(project_data, field, value)
+    return None
+
+def _run_batch_prediction(projects, user_id):
+    """Price every valid project against one catalog snapshot and persist them in one transaction"""
+    catalog = get_catalog()
+    results = [None] * len(projects)
+
+    valid = []
+    for i, project_data in enumerate(projects):
+        error = _validate_project_input(project_data)
+        if error:
+            results[i] = {"index": i, "project_name": project_data.project_name, "error": error}
+        else:
+            valid.append(i)
+
+    entries = []
+    if valid:
+        valid_projects = [projects[i] for i in valid]
+        quantities = estimate_quantities_batch(valid_projects)
+        priced = price_quantities(quantities, catalog)
+        ml = _ml_estimates(valid_projects, quantities)
+        for row, i in enumerate(valid):
+            breakdown = project_breakdown(priced, row, catalog, projects[i].max_budget_pkr)
+            breakdown['ml'] = ml[row]
+            entries.append((i, projects[i], breakdown))
+
+    project_ids = []
+    if entries:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                project_ids = insert_predicted_projects(cur, user_id, [(p, r) for _, p, r in entries])
+            conn.commit()
 
-        return {
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+    for (i, project_data, r), project_id in zip(entries, project_ids):
+        results[i] = {
+            "index": i,
             "project_id": project_id,
             "project_name": project_data.project_name,
-            "predicted_cost": total_cost,
-            "co2_emissions_tons": total_co2_kg / 1000,
-            "budget_status": budget_status,
-            "within_budget": within_budget,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M")
+            "predicted_cost": r['total_cost'],
+            "co2_emissions_tons": r['total_co2_kg'] / 1000,
+            "budget_status": r['budget_status'],
+            "within_budget": r['within_budget'],
+            "ml_predicted_cost": r['ml']['estimate_pkr'] if r['ml'] else None,
+            "created_at": created_at
         }
 
+    ml = entries[0][2]['ml'] if entries else None
+    return {
+        "total": len(projects),
+        "succeeded": len(entries),
+        "failed": len(projects) - len(entries),
+        "model_version": ml['model_version'] if ml else None,
+        "ml_inference_ms": ml['inference_ms'] if ml else None,
+        "results": results
+    }
+
+@app.post("/api/predict/batch")
+async def predict_project_batch(projects: List[ProjectInput], user_id: int):
+    """Predict and save many projects (e.g. corridor segments) in one request"""
+    if not projects:
+        raise HTTPException(status_code=400, detail="No projects supplied")
+    if len(projects) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {len(projects)} projects (max {MAX_BATCH_SIZE})")
+
+    try:
+        return await run_db(_run_batch_prediction, projects, user_id)
     except Exception as e:
-        print(f"[ERROR] Prediction failed: {e}")
+        print(f"[ERROR] Batch prediction failed: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================================================
+# SCENARIO SWEEPS (what-if grids, nothing is saved)
+# ============================================================================
+
+def _run_scenario_sweep(sweep):
+    base = sweep.base.dict()
+    # Ranges arrive as {"start", "stop", "steps"} dicts: .dict() converts nested models
+    grid = sweep.dict(exclude={"base", "include_cells"}, exclude_none=True)
+    axes = build_axes(base, grid)
+    catalog = get_catalog()
+    return {
+        "project_name": base["project_name"],
+        "max_budget_pkr": base["max_budget_pkr"],
+        **run_sweep(base, axes, catalog, include_cells=sweep.include_cells)
+    }
+
+@app.post("/api/predict/scenarios")
+async def predict_scenarios(sweep: ScenarioSweep):
+    """Cost / CO2 / budget status over a grid of lengths, widths, types, traffic and terrain"""
+    try:
+        return await run_db(_run_scenario_sweep, sweep)
+    except SweepError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] Scenario sweep failed: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================================================
+# QUOTES (estimate without saving)
+# ============================================================================
+
+def _run_quote(project_data, simulations=0):
+    """Price a project in memory only and sign a token that can save it later"""
+    catalog = get_catalog()
+    priced = _price_project(project_data, catalog)
+
+    result = {
+        "project_name": project_data.project_name,
+        "predicted_cost": priced['total_cost'],
+        "co2_emissions_tons": priced['total_co2_kg'] / 1000,
+        "total_energy_mj": priced['total_energy_mj'],
+        "total_water_liters": priced['total_water_l'],
+        "budget_status": priced['budget_status'],
+        "within_budget": priced['within_budget'],
+        "budget_difference": priced['budget_difference'],
+        "budget_utilization": priced['budget_utilization'],
+        "boq": [{k: v for k, v in item.items() if k != 'material_id'} for item in priced['boq']],
+        "climate_impact": [{k: v for k, v in item.items() if k != 'material_id'} for item in priced['climate']],
+        "ml_estimate": _ml_summary(priced),
+        "cache_hit": priced['cache_hit'],
+        "quote_token": issue_quote_token(project_data.dict(), catalog.version),
+        "persisted": False
+    }
+    if simulations:
+        result["cost_uncertainty"] = _cost_range(project_data, catalog, simulations)
+    return result
+
+def _save_quote(quote_token, user_id):
+    project, catalog_version = read_quote_token(quote_token)
+    catalog = get_catalog()
+    if catalog.version != catalog_version:
+        raise HTTPException(
+            status_code=409,
+            detail="Material prices changed since this quote was issued; request a new quote"
+        )
+    # Same input + same catalog version reproduces the quoted numbers exactly
+    return _run_prediction(ProjectInput(**project), user_id)
+
+@app.post("/api/quote")
+async def quote_project(project_data: ProjectInput, simulations: int = 0):
+    """Full BOQ and climate breakdown without writing anything to the database"""
+    _check_simulations(simulations)
+    try:
+        return await run_db(_run_quote, project_data, simulations)
+    except Exception as e:
+        print(f"[ERROR] Quote failed: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/quote/save")
+async def save_quote(quote: QuoteSave, user_id: int):
+    """Persist a previously returned quote as a project"""
+    try:
+        return await run_db(_save_quote, quote.quote_token, user_id)
+    except InvalidQuoteToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[ERROR] Saving quote failed: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 def generate_project_report_text(project, boq, climate, recommendations):
     """Generate formatted text report for PDF"""
     
@@ -719,17 +675,13 @@ def generate_project_report_text(project, boq, climate, recommendations):
     return "\n".join(report)
 
 
-@app.get("/api/project/{project_id}/download-report")
-async def download_project_report(project_id: int):
-    """Generate and download PDF report for a project"""
-    try:
-        # Import PDF library
-        from backend.utils.pdf_output import generate_output_pdf
-        
-        # Get project details
-        conn = get_conn()
-        cur = conn.cursor()
-        
+def _build_project_report(project_id):
+    """Blocking part of the report download: loads the project and renders the PDF"""
+    # Import PDF library
+    from backend.utils.pdf_output import generate_output_pdf
+    
+    # Get project details
+    with connection() as conn, conn.cursor() as cur:
         # Get project info
         cur.execute("""
             SELECT p.*, pp.predicted_cost_pkr, pp.total_co2_emissions_tons,
@@ -739,12 +691,10 @@ async def download_project_report(project_id: int):
             WHERE p.project_id = %s
         """, (project_id,))
         project = cur.fetchone()
-        
+    
         if not project:
-            cur.close()
-            conn.close()
             raise HTTPException(status_code=404, detail="Project not found")
-        
+    
         # Get BOQ
         cur.execute("""
             SELECT pb.*, m.material_name
@@ -754,63 +704,68 @@ async def download_project_report(project_id: int):
             ORDER BY pb.category_name, m.material_name
         """, (project_id,))
         boq = cur.fetchall()
-        
+    
         # Get recommendations
         cur.execute("SELECT * FROM climate_recommendations ORDER BY priority DESC")
         recommendations = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        # Convert to dict format for report generation
-        project_dict = {
-            'project_id': project['project_id'],
-            'project_name': project['project_name'],
-            'location': project['location'],
-            'location_type': project['location_type'],
-            'parent_company': project['parent_company'],
-            'road_length_km': float(project['road_length_km']),
-            'road_width_m': float(project['road_width_m']),
-            'area_hectares': float(project['area_hectares'] or 0),
-            'project_type': project['project_type'],
-            'traffic_volume': project['traffic_volume'],
-            'soil_type': project['soil_type'],
-            'max_budget_pkr': float(project['max_budget_pkr']),
-            'predicted_cost_pkr': float(project['predicted_cost_pkr'] or 0),
-            'co2_emissions_tons': float(project['total_co2_emissions_tons'] or 0),
-            'budget_status': project['budget_status'],
-            'budget_difference': float(project['budget_difference_pkr'] or 0),
-            'budget_utilization': float(project['budget_utilization_percent'] or 0)
-        }
-        
-        boq_list = [{
-            'material_name': b['material_name'],
-            'quantity': float(b['quantity']),
-            'unit': b['unit'],
-            'unit_price': float(b['unit_price_pkr']),
-            'total_cost': float(b['total_cost_pkr']),
-            'category': b['category_name']
-        } for b in boq]
-        
-        rec_list = [{
-            'group': r['group_name'],
-            'text': r['recommendation_text'],
-            'reduction_percent': float(r['potential_reduction_percent'] or 0)
-        } for r in recommendations]
-        
-        # Generate report text
-        report_text = generate_project_report_text(project_dict, boq_list, [], rec_list)
-        
-        # Create downloads directory if it doesn't exist
-        os.makedirs("downloads", exist_ok=True)
-        
-        # Generate PDF filename
-        pdf_filename = f"project_{project_id}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join("downloads", pdf_filename)
-        
-        # Generate PDF
-        generate_output_pdf(pdf_path, project_dict, report_text)
-        
+    
+    # Convert to dict format for report generation
+    project_dict = {
+        'project_id': project['project_id'],
+        'project_name': project['project_name'],
+        'location': project['location'],
+        'location_type': project['location_type'],
+        'parent_company': project['parent_company'],
+        'road_length_km': float(project['road_length_km']),
+        'road_width_m': float(project['road_width_m']),
+        'area_hectares': float(project['area_hectares'] or 0),
+        'project_type': project['project_type'],
+        'traffic_volume': project['traffic_volume'],
+        'soil_type': project['soil_type'],
+        'max_budget_pkr': float(project['max_budget_pkr']),
+        'predicted_cost_pkr': float(project['predicted_cost_pkr'] or 0),
+        'co2_emissions_tons': float(project['total_co2_emissions_tons'] or 0),
+        'budget_status': project['budget_status'],
+        'budget_difference': float(project['budget_difference_pkr'] or 0),
+        'budget_utilization': float(project['budget_utilization_percent'] or 0)
+    }
+    
+    boq_list = [{
+        'material_name': b['material_name'],
+        'quantity': float(b['quantity']),
+        'unit': b['unit'],
+        'unit_price': float(b['unit_price_pkr']),
+        'total_cost': float(b['total_cost_pkr']),
+        'category': b['category_name']
+    } for b in boq]
+    
+    rec_list = [{
+        'group': r['group_name'],
+        'text': r['recommendation_text'],
+        'reduction_percent': float(r['potential_reduction_percent'] or 0)
+    } for r in recommendations]
+    
+    # Generate report text
+    report_text = generate_project_report_text(project_dict, boq_list, [], rec_list)
+    
+    # Create downloads directory if it doesn't exist
+    os.makedirs("downloads", exist_ok=True)
+    
+    # Generate PDF filename
+    pdf_filename = f"project_{project_id}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    pdf_path = os.path.join("downloads", pdf_filename)
+    
+    # Generate PDF
+    generate_output_pdf(pdf_path, project_dict, report_text)
+
+    return pdf_path, pdf_filename
+
+@app.get("/api/project/{project_id}/download-report")
+async def download_project_report(project_id: int):
+    """Generate and download PDF report for a project"""
+    try:
+        pdf_path, pdf_filename = await run_db(_build_project_report, project_id)
+
         # Return file
         return FileResponse(
             path=pdf_path,
@@ -836,9 +791,6 @@ async def download_project_report(project_id: int):
 async def get_user_projects(user_id: int, location_type: Optional[str] = None,
                           min_budget: Optional[float] = None, max_budget: Optional[float] = None):
     """Get user's projects with filters"""
-    conn = get_conn()
-    cur = conn.cursor()
-
     query = """
         SELECT p.project_id, p.project_name, p.location, p.location_type,
                p.max_budget_pkr, p.created_at,
@@ -863,10 +815,7 @@ async def get_user_projects(user_id: int, location_type: Optional[str] = None,
 
     query += " ORDER BY p.created_at DESC"
 
-    cur.execute(query, tuple(params))
-    projects = cur.fetchall()
-    cur.close()
-    conn.close()
+    projects = await fetch_all(query, tuple(params))
 
     return [{
         "project_id": p['project_id'],
@@ -884,17 +833,7 @@ async def get_user_projects(user_id: int, location_type: Optional[str] = None,
 async def get_all_projects(admin_id: int, location_type: Optional[str] = None,
                           min_budget: Optional[float] = None, max_budget: Optional[float] = None):
     """Admin gets all projects with filters"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    await require_admin(admin_id)
 
     query = """
         SELECT p.project_id, p.project_name, p.location, p.location_type,
@@ -921,10 +860,7 @@ async def get_all_projects(admin_id: int, location_type: Optional[str] = None,
 
     query += " ORDER BY p.created_at DESC"
 
-    cur.execute(query, tuple(params))
-    projects = cur.fetchall()
-    cur.close()
-    conn.close()
+    projects = await fetch_all(query, tuple(params))
 
     return [{
         "project_id": p['project_id'],
@@ -939,54 +875,60 @@ async def get_all_projects(admin_id: int, location_type: Optional[str] = None,
         "created_at": p['created_at'].strftime("%Y-%m-%d %H:%M")
     } for p in projects]
 
+def _load_project_details(project_id):
+    """Project header, BOQ, climate rows and recommendations on one pooled connection"""
+    with connection() as conn:
+        cur = conn.cursor()
+
+        # Get project info
+        cur.execute("""
+            SELECT p.*, pp.predicted_cost_pkr, pp.total_co2_emissions_tons,
+                   pp.total_energy_mj, pp.total_water_liters, pp.budget_status,
+                   pp.budget_difference_pkr, pp.budget_utilization_percent
+            FROM projects p
+            LEFT JOIN project_predictions pp ON p.project_id = pp.project_id
+            WHERE p.project_id = %s
+        """, (project_id,))
+        project = cur.fetchone()
+
+        if not project:
+            cur.close()
+            return None, [], [], []
+
+        # Get BOQ
+        cur.execute("""
+            SELECT pb.*, m.material_name
+            FROM project_boq pb
+            JOIN materials m ON pb.material_id = m.material_id
+            WHERE pb.project_id = %s
+            ORDER BY pb.category_name, m.material_name
+        """, (project_id,))
+        boq = cur.fetchall()
+
+        # Get climate impact
+        cur.execute("""
+            SELECT pci.*, m.material_name
+            FROM project_climate_impact pci
+            JOIN materials m ON pci.material_id = m.material_id
+            WHERE pci.project_id = %s
+        """, (project_id,))
+        climate = cur.fetchall()
+
+        # Get recommendations
+        cur.execute("SELECT * FROM climate_recommendations ORDER BY priority DESC, group_name")
+        recommendations = cur.fetchall()
+
+        cur.close()
+        return project, boq, climate, recommendations
+
 @app.get("/api/project/{project_id}/details")
 async def get_project_details(project_id: int):
     """Get complete project details"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Get project info
-    cur.execute("""
-        SELECT p.*, pp.predicted_cost_pkr, pp.total_co2_emissions_tons,
-               pp.total_energy_mj, pp.total_water_liters, pp.budget_status,
-               pp.budget_difference_pkr, pp.budget_utilization_percent
-        FROM projects p
-        LEFT JOIN project_predictions pp ON p.project_id = pp.project_id
-        WHERE p.project_id = %s
-    """, (project_id,))
-    project = cur.fetchone()
+    project, boq, climate, recommendations = await run_db(_load_project_details, project_id)
 
     if not project:
-        cur.close()
-        conn.close()
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Get BOQ
-    cur.execute("""
-        SELECT pb.*, m.material_name
-        FROM project_boq pb
-        JOIN materials m ON pb.material_id = m.material_id
-        WHERE pb.project_id = %s
-        ORDER BY pb.category_name, m.material_name
-    """, (project_id,))
-    boq = cur.fetchall()
-
-    # Get climate impact
-    cur.execute("""
-        SELECT pci.*, m.material_name
-        FROM project_climate_impact pci
-        JOIN materials m ON pci.material_id = m.material_id
-        WHERE pci.project_id = %s
-    """, (project_id,))
-    climate = cur.fetchall()
-
-    # Get recommendations
-    cur.execute("SELECT * FROM climate_recommendations ORDER BY priority DESC, group_name")
-    recommendations = cur.fetchall()
-
-    cur.close()
-    conn.close()
-
     return {
         "project": {
             "project_id": project['project_id'],
@@ -1033,28 +975,17 @@ async def get_project_details(project_id: int):
 @app.delete("/api/project/{project_id}")
 async def delete_project(project_id: int, user_id: int):
     """Delete project (CASCADE deletes all related data)"""
-    conn = get_conn()
-    cur = conn.cursor()
-
     # Verify project ownership
-    cur.execute("SELECT user_id FROM projects WHERE project_id=%s", (project_id,))
-    project = cur.fetchone()
+    project = await fetch_one("SELECT user_id FROM projects WHERE project_id=%s", (project_id,))
 
     if not project:
-        cur.close()
-        conn.close()
         raise HTTPException(status_code=404, detail="Project not found")
 
     if project['user_id'] != user_id:
-        cur.close()
-        conn.close()
         raise HTTPException(status_code=403, detail="Not authorized to delete this project")
 
     # Delete project (CASCADE will delete predictions, BOQ, climate impact)
-    cur.execute("DELETE FROM projects WHERE project_id=%s", (project_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    await execute("DELETE FROM projects WHERE project_id=%s", (project_id,))
 
     return {"message": "Project deleted successfully"}
 
@@ -1062,79 +993,71 @@ async def delete_project(project_id: int, user_id: int):
 # ADMIN: ADD TRAINING DATA
 # ============================================================================
 
+def _insert_training_tender(cur, tender_data, prices):
+    # Insert tender
+    cur.execute("""
+        INSERT INTO tenders 
+        (tender_no, organization, project_name, location, location_type,
+         parent_company, road_length_km, road_width_m, project_type,
+         traffic_volume, soil_type, actual_cost_pkr, boq_json, used_for_training)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, TRUE)
+    """, (tender_data.tender_no, tender_data.organization, tender_data.project_name,
+          tender_data.location, tender_data.location_type, tender_data.parent_company,
+          tender_data.road_length_km, tender_data.road_width_m, tender_data.project_type,
+          tender_data.traffic_volume, tender_data.soil_type, tender_data.actual_cost_pkr,
+          json.dumps(tender_data.boq_items)))
+    
+    tender_id = cur.lastrowid
+    
+    # Prepare ML features (same as prediction logic)
+    area_sqm = tender_data.road_length_km * 1000 * tender_data.road_width_m
+    
+    # Calculate material totals from BOQ
+    cement_qty = sum([item['quantity'] for item in tender_data.boq_items 
+                     if 'cement' in item['material_name'].lower()]) / 1000  # tons
+    bitumen_qty = sum([item['quantity'] for item in tender_data.boq_items 
+                      if 'bitumen' in item['material_name'].lower()]) / 1000
+    steel_qty = sum([item['quantity'] for item in tender_data.boq_items 
+                    if 'steel' in item['material_name'].lower()]) / 1000
+    
+    # Get average prices
+    cement_price = prices.get('Cement OPC Grade 53', 1550)
+    bitumen_price = prices.get('Bitumen 60/70', 175000)
+    steel_price = prices.get('Steel Bar 10mm', 255)
+    
+    features = {
+        "road_length_km": tender_data.road_length_km,
+        "road_width_km": tender_data.road_width_m / 1000,
+        "cement_qty_ton": cement_qty,
+        "bitumen_qty_ton": bitumen_qty,
+        "steel_qty_ton": steel_qty,
+        "cement_price": cement_price,
+        "bitumen_price": bitumen_price,
+        "steel_price": steel_price,
+        "materials_total": (cement_qty * cement_price * 20) + (bitumen_qty * bitumen_price) + (steel_qty * steel_price * 1000),
+        "project_type": tender_data.project_type,
+        "location_type": tender_data.location_type,
+        "traffic_volume": tender_data.traffic_volume
+    }
+    
+    # Insert ML training data
+    cur.execute("""
+        INSERT INTO ml_training_data 
+        (tender_id, features_json, label_cost_pkr, data_quality)
+        VALUES (%s, %s, %s, 'High')
+    """, (tender_id, json.dumps(features), tender_data.actual_cost_pkr))
+
+    return tender_id
+
 @app.post("/api/admin/add-training-data")
 async def add_training_data(admin_id: int, tender_data: TenderTrainingData):
     """Admin adds historical project data for ML training"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    await require_admin(admin_id)
 
     try:
-        # Insert tender
-        cur.execute("""
-            INSERT INTO tenders 
-            (tender_no, organization, project_name, location, location_type,
-             parent_company, road_length_km, road_width_m, project_type,
-             traffic_volume, soil_type, actual_cost_pkr, boq_json, used_for_training)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, TRUE)
-        """, (tender_data.tender_no, tender_data.organization, tender_data.project_name,
-              tender_data.location, tender_data.location_type, tender_data.parent_company,
-              tender_data.road_length_km, tender_data.road_width_m, tender_data.project_type,
-              tender_data.traffic_volume, tender_data.soil_type, tender_data.actual_cost_pkr,
-              json.dumps(tender_data.boq_items)))
-        
-        tender_id = cur.lastrowid
-        
-        # Prepare ML features (same as prediction logic)
-        area_sqm = tender_data.road_length_km * 1000 * tender_data.road_width_m
-        
-        # Calculate material totals from BOQ
-        cement_qty = sum([item['quantity'] for item in tender_data.boq_items 
-                         if 'cement' in item['material_name'].lower()]) / 1000  # tons
-        bitumen_qty = sum([item['quantity'] for item in tender_data.boq_items 
-                          if 'bitumen' in item['material_name'].lower()]) / 1000
-        steel_qty = sum([item['quantity'] for item in tender_data.boq_items 
-                        if 'steel' in item['material_name'].lower()]) / 1000
-        
-        # Get average prices
-        prices = get_material_prices_dict()
-        cement_price = prices.get('Cement OPC Grade 53', 1550)
-        bitumen_price = prices.get('Bitumen 60/70', 175000)
-        steel_price = prices.get('Steel Bar 10mm', 255)
-        
-        features = {
-            "road_length_km": tender_data.road_length_km,
-            "road_width_km": tender_data.road_width_m / 1000,
-            "cement_qty_ton": cement_qty,
-            "bitumen_qty_ton": bitumen_qty,
-            "steel_qty_ton": steel_qty,
-            "cement_price": cement_price,
-            "bitumen_price": bitumen_price,
-            "steel_price": steel_price,
-            "materials_total": (cement_qty * cement_price * 20) + (bitumen_qty * bitumen_price) + (steel_qty * steel_price * 1000),
-            "project_type": tender_data.project_type,
-            "location_type": tender_data.location_type,
-            "traffic_volume": tender_data.traffic_volume
-        }
-        
-        # Insert ML training data
-        cur.execute("""
-            INSERT INTO ml_training_data 
-            (tender_id, features_json, label_cost_pkr, data_quality)
-            VALUES (%s, %s, %s, 'High')
-        """, (tender_id, json.dumps(features), tender_data.actual_cost_pkr))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Read prices first so the transaction holds a single pooled connection
+        prices = await run_db(get_material_prices_dict)
+        tender_id = await run_in_transaction(_insert_training_tender, tender_data, prices)
         
         return {
             "message": "Training data added successfully",
@@ -1143,9 +1066,6 @@ async def add_training_data(admin_id: int, tender_data: TenderTrainingData):
         }
         
     except Exception as e:
-        conn.rollback()
-        cur.close()
-        conn.close()
         print(f"[ERROR] Failed to add training data: {e}")
         import traceback
         traceback.print_exc()
@@ -1154,22 +1074,9 @@ async def add_training_data(admin_id: int, tender_data: TenderTrainingData):
 @app.get("/api/admin/training-data-count")
 async def get_training_data_count(admin_id: int):
     """Get count of training data entries"""
-    conn = get_conn()
-    cur = conn.cursor()
+    await require_admin(admin_id)
 
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
-
-    cur.execute("SELECT COUNT(*) as count FROM ml_training_data")
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
+    result = await fetch_one("SELECT COUNT(*) as count FROM ml_training_data")
 
     return {
         "training_data_count": result['count'],
@@ -1177,201 +1084,247 @@ async def get_training_data_count(admin_id: int):
         "can_retrain": result['count'] >= 50
     }
 
+# ============================================================================
+# STARTUP / READINESS
+# ============================================================================
+
+warmup = Warmup(retry_interval=(cfg.get("startup") or {}).get("warmup_retry_interval", 5))
+warmup.mark("import_s", time.perf_counter() - _import_started)
+
+def _warm_db_pool():
+    with connection() as conn:
+        conn.ping(reconnect=True)
+
+def _warm_cost_model():
+    server = get_model_server()
+    if not server.ready:
+        raise RuntimeError(server.load_error)
+
+def _warm_pdf():
+    import fitz  # noqa: F401  (PyMuPDF, used for reports)
+
+warmup.register("db_pool", _warm_db_pool, required=True)
+warmup.register("material_catalog", get_catalog, required=True)
+warmup.register("cost_model", _warm_cost_model)
+warmup.register("pdf", _warm_pdf)
+
+@app.on_event("startup")
+async def start_warmup():
+    """Accept requests right away; load the heavy components on a background thread"""
+    age = process_age_seconds()
+    if age is not None:
+        warmup.mark("process_to_startup_s", age)
+    warmup.start()
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "message": "API is running"}
 
-@app.post("/api/admin/retrain-model")
-async def retrain_model(admin_id: int):
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the database and catalog are warm, 503 before that"""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime metrics for this worker process"""
+    return {
+        "db_pool": get_pool_stats(),
+        "material_catalog": get_catalog_stats(),
+        "prediction_writes": get_prediction_write_stats(),
+        "cost_model": get_model_stats(),
+        "prediction_cache": get_prediction_cache_stats(),
+        "startup": warmup.timings
+    }
+
+def _reload_cost_model():
+    """Serve the freshly trained artifacts from this worker right away"""
+    server = get_model_server()
+    server.load()
+    training = (server.current.schema.get("training") or {}) if server.current else {}
+    return {
+        "model_version": server.version,
+        "feature_snapshot_hash": training.get("feature_snapshot_hash"),
+    }
+
+training_jobs = training_runner(_reload_cost_model)
+
+@app.post("/api/admin/retrain-model", status_code=202)
+async def retrain_model(admin_id: int, mode: str = "full"):
     """
     Admin triggers ML model retraining
-    This runs the train_model.py script and updates the model
+    mode=incremental adds trees for new tenders to the current model (falls back
+    to a full retrain when the data changed too much).
+    Training runs in a separate process; poll /api/admin/training-status or
+    /api/admin/training-jobs/{log_id} for progress
     """
-    import sys  # Add this import at the top
-    
-    conn = get_conn()
-    cur = conn.cursor()
+    await require_admin(admin_id)
 
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
+    if mode not in ("full", "incremental"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'incremental'")
 
     # Check if enough training data exists
-    cur.execute("SELECT COUNT(*) as count FROM ml_training_data WHERE label_cost_pkr > 0")
-    result = cur.fetchone()
+    result = await fetch_one("SELECT COUNT(*) as count FROM ml_training_data WHERE label_cost_pkr > 0")
     training_count = result['count']
 
     if training_count < 50:
-        cur.close()
-        conn.close()
         raise HTTPException(
             status_code=400, 
             detail=f"Insufficient training data. Need at least 50 records, have {training_count}"
         )
 
-    # Log the retraining start
-    cur.execute("""
-        INSERT INTO model_training_logs (admin_id, status, training_data_count, started_at)
-        VALUES (%s, 'in_progress', %s, NOW())
-    """, (admin_id, training_count))
-    log_id = cur.lastrowid
-    conn.commit()
+    try:
+        log_id = await run_db(training_jobs.submit, admin_id, training_count, mode)
+    except TrainingAlreadyRunning as e:
+        raise HTTPException(status_code=409, detail={
+            "message": "A training job is already running",
+            "log_id": e.args[0] if e.args else None
+        })
+    except Exception as e:
+        print(f"[ERROR] Could not start model retraining: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "message": "Model retraining started",
+        "training_data_count": training_count,
+        "log_id": log_id,
+        "mode": mode,
+        "status": "in_progress"
+    }
+
+def _training_log_dict(log):
+    if not log:
+        return None
+    return {
+        "log_id": log['log_id'],
+        "status": log['status'],
+        "training_data_count": log['training_data_count'],
+        "model_version": log['model_version'],
+        "feature_snapshot_hash": log.get('feature_snapshot_hash'),
+        "progress": progress_line(log.get('log_output')),
+        "error_message": log.get('error_message'),
+        "started_at": log['started_at'].strftime("%Y-%m-%d %H:%M:%S") if log['started_at'] else None,
+        "completed_at": log['completed_at'].strftime("%Y-%m-%d %H:%M:%S") if log['completed_at'] else None
+    }
+
+@app.get("/api/admin/training-jobs/{log_id}")
+async def get_training_job(log_id: int, admin_id: int, log_lines: int = 50):
+    """One training job with the tail of its output"""
+    await require_admin(admin_id)
+
+    log = await fetch_one("SELECT * FROM model_training_logs WHERE log_id = %s", (log_id,))
+    if not log:
+        raise HTTPException(status_code=404, detail="Training job not found")
+
+    lines = (log['log_output'] or "").splitlines()
+    return {
+        **_training_log_dict(log),
+        "log_tail": lines[-log_lines:] if log_lines > 0 else []
+    }
+
+def _activate_model(version, reason):
+    """Point the registry at version and serve it from this worker now (others follow on their next poll)"""
+    previous = model_registry.set_current(version, reason=reason)
+    server = get_model_server()
+    if not server.load() or server.version != version:
+        # Leave the pointer where it was rather than have workers chase a broken version
+        if previous:
+            model_registry.set_current(previous, reason=f"revert failed {reason}")
+        raise model_registry.RegistryError(f"Model version {version} could not be loaded: {server.load_error}")
+    return previous
+
+def _rollback_model():
+    """Blocking part of the rollback: reads history.jsonl for the target, then activates it"""
+    target = model_registry.previous_version()
+    if not target:
+        raise HTTPException(status_code=400, detail="No previous model version to roll back to")
+    return target, _activate_model(target, "rollback")
+
+def _load_model_listing():
+    """Registry listing for the admin page (metadata files, CURRENT and history.jsonl)"""
+    return {
+        "current_version": model_registry.current_version(),
+        "serving_version": get_model_server().version,
+        "previous_version": model_registry.previous_version(),
+        "versions": model_registry.list_versions()
+    }
+
+@app.get("/api/admin/models")
+async def list_models(admin_id: int):
+    """Registered model versions (newest first) with metrics and the one being served"""
+    await require_admin(admin_id)
+
+    return await run_db(_load_model_listing)
+
+@app.post("/api/admin/models/{version}/activate")
+async def activate_model(version: str, admin_id: int):
+    """Serve a specific registered version (also used to roll forward again)"""
+    await require_admin(admin_id)
 
     try:
-        # Run the training script
-        print(f"[INFO] Starting model retraining with {training_count} records...")
-        
-        # FIXED: Use sys.executable to use the current Python interpreter (from venv)
-        result = subprocess.run(
-            [sys.executable, "backend/ml/train_model.py"],  # Changed from "python"
-            capture_output=True,
-            text=True,
-            timeout=600,  # 10 minute timeout
-            cwd=os.path.dirname(os.path.dirname(__file__))  # Set working directory to project root
-        )
+        previous = await run_db(_activate_model, version, "activate")
+    except model_registry.RegistryError as e:
+        raise HTTPException(status_code=404 if "not found" in str(e) else 500, detail=str(e))
 
-        if result.returncode == 0:
-            # Training successful
-            print("[SUCCESS] Model retrained successfully!")
-            print(result.stdout)
-            
-            # Close existing connection and create fresh one for success update
-            try:
-                cur.close()
-                conn.close()
-            except:
-                pass
-            
-            # Create fresh connection for success update
-            conn = get_conn()
-            cur = conn.cursor()
-            
-            # Update log (note: %% escapes % for Python string formatting)
-            cur.execute("""
-                UPDATE model_training_logs 
-                SET status='completed', completed_at=NOW(), 
-                    model_version=CONCAT('v', DATE_FORMAT(NOW(), '%%Y%%m%%d_%%H%%i%%s')),
-                    log_output=%s
-                WHERE log_id=%s
-            """, (result.stdout, log_id))
-            conn.commit()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                "message": "Model retrained successfully!",
-                "training_data_count": training_count,
-                "log_id": log_id,
-                "status": "completed"
-            }
-        else:
-            # Training failed
-            print("[ERROR] Model retraining failed!")
-            print(result.stderr)
-            
-            # Create a fresh connection for error handling
-            conn = get_conn()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                UPDATE model_training_logs 
-                SET status='failed', completed_at=NOW(), error_message=%s
-                WHERE log_id=%s
-            """, (result.stderr, log_id))
-            conn.commit()
-            
-            cur.close()
-            conn.close()
-            
-            raise HTTPException(status_code=500, detail=f"Model training failed: {result.stderr}")
+    print(f"[INFO] Admin {admin_id} activated model {version} (was {previous})")
+    return {"message": f"Model {version} is now serving", "model_version": version, "previous_version": previous}
 
-    except subprocess.TimeoutExpired:
-        # Create a fresh connection for error handling
-        conn = get_conn()
+@app.post("/api/admin/models/rollback")
+async def rollback_model(admin_id: int):
+    """Go back to the version that was serving before the current one"""
+    await require_admin(admin_id)
+
+    try:
+        target, previous = await run_db(_rollback_model)
+    except model_registry.RegistryError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    print(f"[INFO] Admin {admin_id} rolled model back to {target} (was {previous})")
+    return {"message": f"Rolled back to model {target}", "model_version": target, "previous_version": previous}
+
+def _load_training_status():
+    with connection() as conn:
         cur = conn.cursor()
-        
+
+        # Get training data count
+        cur.execute("SELECT COUNT(*) as count FROM ml_training_data WHERE label_cost_pkr > 0")
+        data_count = cur.fetchone()['count']
+
+        # Get latest training log
         cur.execute("""
-            UPDATE model_training_logs 
-            SET status='failed', completed_at=NOW(), error_message='Training timeout (>10 minutes)'
-            WHERE log_id=%s
-        """, (log_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=500, detail="Model training timeout")
+            SELECT * FROM model_training_logs 
+            ORDER BY started_at DESC 
+            LIMIT 1
+        """)
+        latest_log = cur.fetchone()
 
-    except Exception as e:
-        # Create a fresh connection for error handling
-        conn = get_conn()
-        cur = conn.cursor()
-        
+        # Get training history
         cur.execute("""
-            UPDATE model_training_logs 
-            SET status='failed', completed_at=NOW(), error_message=%s
-            WHERE log_id=%s
-        """, (str(e), log_id))
-        conn.commit()
+            SELECT log_id, admin_id, status, training_data_count, model_version,
+                   started_at, completed_at
+            FROM model_training_logs 
+            ORDER BY started_at DESC 
+            LIMIT 10
+        """)
+        history = cur.fetchall()
+
         cur.close()
-        conn.close()
-        raise HTTPException(status_code=500, detail=str(e))
+        return data_count, latest_log, history
 
 @app.get("/api/admin/training-status")
 async def get_training_status(admin_id: int):
     """Get current training status and history"""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify admin
-    cur.execute("SELECT role FROM users WHERE user_id=%s", (admin_id,))
-    admin = cur.fetchone()
-
-    if not admin or admin['role'] != 'admin':
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=403, detail="Admin access required")
-
-    # Get training data count
-    cur.execute("SELECT COUNT(*) as count FROM ml_training_data WHERE label_cost_pkr > 0")
-    data_count = cur.fetchone()['count']
-
-    # Get latest training log
-    cur.execute("""
-        SELECT * FROM model_training_logs 
-        ORDER BY started_at DESC 
-        LIMIT 1
-    """)
-    latest_log = cur.fetchone()
-
-    # Get training history
-    cur.execute("""
-        SELECT log_id, admin_id, status, training_data_count, model_version,
-               started_at, completed_at
-        FROM model_training_logs 
-        ORDER BY started_at DESC 
-        LIMIT 10
-    """)
-    history = cur.fetchall()
+    await require_admin(admin_id)
 
-    cur.close()
-    conn.close()
+    data_count, latest_log, history = await run_db(_load_training_status)
 
     return {
         "training_data_count": data_count,
         "min_required": 50,
         "can_retrain": data_count >= 50,
-        "latest_training": {
-            "status": latest_log['status'] if latest_log else None,
-            "training_data_count": latest_log['training_data_count'] if latest_log else 0,
-            "model_version": latest_log['model_version'] if latest_log else None,
-            "started_at": latest_log['started_at'].strftime("%Y-%m-%d %H:%M:%S") if latest_log and latest_log['started_at'] else None,
-            "completed_at": latest_log['completed_at'].strftime("%Y-%m-%d %H:%M:%S") if latest_log and latest_log['completed_at'] else None
-        } if latest_log else None,
+        "latest_training": _training_log_dict(latest_log),
+        "running_job": training_jobs.stats(),
         "training_history": [{
             "log_id": log['log_id'],
             "status": log['status'],
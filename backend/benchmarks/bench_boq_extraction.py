@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_boq_extraction.py
+"""
+BOQ line extraction: line regexes only against the layout-aware table extractor.
+
+Writes a fixture corpus of synthetic BOQ PDFs with known rows - half laid out as
+tables (cells in columns, wrapped descriptions), half as one line of text per
+item with no header, where the layout extractor finds no table and falls back to
+the regexes - then extracts and parses every file both ways:
+
+    python -m backend.benchmarks.bench_boq_extraction --files 20 --pages 20
+
+Reports BOQ lines per second, precision (extracted rows that match a fixture row
+exactly: item no, description, unit, quantity, rate, amount) and recall, per style.
+
+Then one table of --long-pages pages with its header on the first page only goes
+through extract_pages in-process and with the process pool (--workers, ranges of
+--pages-per-task pages): every worker count has to find the same rows, since
+ranges after the first continue the table without seeing its header.
+No database needed.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.benchmarks.bench_pdf_extraction import write_boq_pdf, write_corpus
+
+STYLES = ("table", "inline")
+
+
+def _key(row):
+    # Description compared without spacing differences; amounts to the cent
+    return (
+        row["item_no"],
+        " ".join((row["description"] or "").split()).lower(),
+        (row["unit"] or "").lower(),
+        round(row["quantity"] or 0, 2),
+        round(row["unit_price"] or 0, 2),
+        round(row["total_price"] or 0, 2),
+    )
+
+def score(found, truth):
+    expected = {_key(row) for row in truth}
+    correct = sum(1 for row in found if _key(row) in expected)
+    return correct, len(found), len(truth)
+
+def run(corpus, layout):
+    from backend.utils.pdf_parser import iter_pdf_pages, parse_boq_pages
+
+    totals = {style: [0, 0, 0] for style in STYLES}
+    started = time.perf_counter()
+    for i, (path, truth) in enumerate(sorted(corpus.items())):
+        pages = ((text, rows) for _, text, rows in iter_pdf_pages(path, layout=layout))
+        found = parse_boq_pages(pages)
+        for k, value in enumerate(score(found, truth)):
+            totals[STYLES[i % len(STYLES)]][k] += value
+    wall = time.perf_counter() - started
+    lines = sum(len(rows) for rows in corpus.values())
+    print(f"{'layout' if layout else 'regex':<8} {lines / wall:9.0f} lines/s ({wall:.2f}s)")
+    for style, (correct, extracted, expected) in totals.items():
+        precision = correct / extracted if extracted else 0.0
+        print(f"    {style:<7} precision {precision:6.1%}  recall {correct / expected:6.1%}  "
+              f"({extracted} extracted, {expected} in fixtures)")
+
+def run_pool(path, truth, workers, pages_per_task):
+    from backend.utils.pdf_parser import parse_boq_pdfs
+
+    for count in sorted({1, workers}):
+        started = time.perf_counter()
+        [(_, found)] = parse_boq_pdfs([path], count, pages_per_task)
+        correct, extracted, expected = score(found, truth)
+        print(f"continued table, workers={count:<3} {len(truth) / (time.perf_counter() - started):9.0f} lines/s  "
+              f"precision {correct / extracted if extracted else 0.0:6.1%}  recall {correct / expected:6.1%}  "
+              f"({extracted} extracted, {expected} in fixture)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--long-pages", type=int, default=120, help="pages of the single continued table")
+    parser.add_argument("--workers", type=int, default=max(os.cpu_count() or 1, 2))
+    parser.add_argument("--pages-per-task", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = write_corpus(folder, args.files, args.pages, styles=STYLES)
+        for layout in (False, True):
+            run(corpus, layout)
+
+        path = os.path.join(folder, "continued.pdf")
+        truth = write_boq_pdf(path, args.long_pages, style="continued")
+        run_pool(path, truth, args.workers, args.pages_per_task)
+
+if __name__ == "__main__":
+    main()
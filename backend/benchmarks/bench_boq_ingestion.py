@@ -0,0 +1,203 @@
+# backend/benchmarks/bench_boq_ingestion.py
+"""
+BOQ ingestion throughput: one INSERT + COMMIT per line against store_boq_file
+(one transaction, batched multi-row INSERTs) on a --lines line document.
+
+Live mode (needs MySQL and an existing tender to attach the rows to; the rows
+written are deleted afterwards):
+
+    python -m backend.benchmarks.bench_boq_ingestion --tender-id 1 --lines 10000
+
+Simulated mode (no MySQL): the same code paths run against a connection that
+charges --rtt-ms per statement and --commit-ms per commit, so it measures round
+trips rather than server work.
+
+    python -m backend.benchmarks.bench_boq_ingestion --simulate
+"""
+import argparse
+import random
+import re
+import time
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.cursors import DictCursor
+
+from backend.benchmarks.bench_pdf_extraction import DESCRIPTIONS, UNITS
+
+
+def boq_items(lines, seed=0):
+    """Synthetic parsed BOQ lines, shaped like pdf_parser.parse_boq_pages output"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(lines):
+        quantity = round(rng.uniform(1, 20000), 2)
+        unit_price = round(rng.uniform(10, 50000), 2)
+        item = {
+            "item_no": f"{i // 100 + 1}.{i % 100 + 1:02d}",
+            "description": rng.choice(DESCRIPTIONS),
+            "unit": rng.choice(UNITS),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_price": round(quantity * unit_price, 2),
+        }
+        item["raw"] = (f"{item['item_no']} {item['description']} {quantity:,.2f} {item['unit']} "
+                       f"{unit_price:,.2f} {item['total_price']:,.2f}")
+        items.append(item)
+    return items
+
+
+_FILE_INSERT = re.compile(r"INSERT INTO boq_files .*?VALUES \((\d+), '([^']*)', '([^']*)', .*?, (\d+), NOW\(\)\)", re.S)
+_FILE_SELECT = re.compile(r"FROM boq_files WHERE tender_id=(\d+) AND file_path='([^']*)'")
+
+
+class _Result:
+    def __init__(self, insert_id=0, affected_rows=0, rows=()):
+        self.insert_id = insert_id
+        self.affected_rows = affected_rows
+        self.rows = rows  # already dicts, so DictCursor leaves them as they are
+        self.description = None
+        self.warning_count = 0
+        self.has_next = False
+
+
+class SimulatedConnection:
+    """Just enough of a pymysql connection for the BOQ writers, with a latency model"""
+
+    encoding = "utf8"
+    charset = "utf8mb4"
+    server_status = 0
+    def escape(self, obj, mapping=None):
+        return pymysql.converters.escape_item(obj, self.charset, mapping or pymysql.converters.encoders)
+
+    literal = escape
+
+    def __init__(self, rtt_ms, commit_ms):
+        self.rtt = rtt_ms / 1000
+        self.commit_cost = commit_ms / 1000
+        self.statements = 0
+        self.commits = 0
+        self.rows_written = 0
+        self._next_id = 1
+        self._files = {}
+        self._result = None
+
+    def query(self, sql, unbuffered=False):
+        time.sleep(self.rtt)
+        self.statements += 1
+        if isinstance(sql, (bytes, bytearray)):
+            sql = sql.decode(self.encoding)
+        head = sql.lstrip()[:6].upper()
+        select = _FILE_SELECT.search(sql)
+        insert = _FILE_INSERT.search(sql)
+        if select:
+            found = self._files.get((select.group(1), select.group(2)))
+            self._result = _Result(rows=(found,) if found else ())
+        elif insert:
+            key = (insert.group(1), insert.group(2))
+            boq_id = self._files[key]["boq_id"] if key in self._files else self._next_id
+            self._files[key] = {"boq_id": boq_id, "file_sha256": insert.group(3),
+                                "line_count": int(insert.group(4))}
+            self._result = _Result(insert_id=boq_id, affected_rows=1)
+            self._next_id += 1
+        elif head == "INSERT":
+            rows = sql.count("),(") + 1
+            self.rows_written += rows
+            self._result = _Result(insert_id=self._next_id, affected_rows=rows)
+            self._next_id += rows
+        else:
+            self._result = _Result()
+
+    def cursor(self):
+        return DictCursor(self)
+
+    def commit(self):
+        time.sleep(self.rtt + self.commit_cost)
+        self.commits += 1
+
+    def rollback(self):
+        time.sleep(self.rtt)
+
+    def close(self):
+        pass
+
+
+class _SimulatedPool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get(self):
+        return self.conn
+
+    @contextmanager
+    def connection(self):
+        yield self.conn
+
+
+def run_per_line(tender_id, path, items, conn):
+    """The old path: a file record, then an INSERT and a COMMIT per line"""
+    from backend.database import insert_boq_file, insert_boq_line
+
+    boq_id = insert_boq_file(tender_id, path, "", db=conn)
+    for it in items:
+        insert_boq_line(tender_id, boq_id, it["item_no"], it["description"], it["unit"], it["quantity"],
+                        it["unit_price"], it["total_price"], raw_line=it["raw"], db=conn)
+    return boq_id
+
+def _report(label, lines, wall, conn=None):
+    counts = f"   {conn.statements} statements, {conn.commits} commits" if conn else ""
+    print(f"{label:<24} {lines / wall:10.0f} lines/s   {wall:7.2f}s{counts}")
+
+def main():
+    from backend import database
+    from backend.database import store_boq_file
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--batch-sizes", default="100,1000,5000", help="comma-separated store_boq_file batch sizes")
+    parser.add_argument("--tender-id", type=int, help="live mode: tender the benchmark rows are attached to")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="simulated round trip per statement")
+    parser.add_argument("--commit-ms", type=float, default=1.0, help="simulated extra cost of a commit (log flush)")
+    args = parser.parse_args()
+    if not args.simulate and args.tender_id is None:
+        parser.error("--tender-id is required unless --simulate is given")
+
+    items = boq_items(args.lines)
+    tender_id = args.tender_id or 1
+    path = f"bench_boq_ingestion/{time.time_ns()}.pdf"
+    mode = f"simulated, {args.rtt_ms} ms/statement + {args.commit_ms} ms/commit" if args.simulate else "live MySQL"
+    print(f"{args.lines} BOQ lines ({mode})")
+
+    def new_conn():
+        if not args.simulate:
+            return database.get_conn()
+        conn = SimulatedConnection(args.rtt_ms, args.commit_ms)
+        database.get_pool = lambda: _SimulatedPool(conn)
+        return conn
+
+    conn = new_conn()
+    started = time.perf_counter()
+    try:
+        run_per_line(tender_id, f"{path}-per-line", items, conn)
+        _report("per line", args.lines, time.perf_counter() - started, conn if args.simulate else None)
+    finally:
+        conn.close()
+
+    try:
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            conn = new_conn() if args.simulate else None
+            result = store_boq_file(tender_id, f"{path}-{batch_size}", "", items, file_sha256="0" * 64,
+                                    batch_size=batch_size)
+            _report(f"batched ({batch_size}/INSERT)", result["lines"], result["seconds"], conn)
+
+        # Same file and hash again: nothing is re-written
+        result = store_boq_file(tender_id, f"{path}-{batch_size}", "", items, file_sha256="0" * 64)
+        print(f"re-run of unchanged file skipped={result['skipped']} in {result['seconds']:.3f}s")
+    finally:
+        if not args.simulate:
+            database._execute("DELETE FROM boq_files WHERE tender_id=%s AND file_path LIKE %s",
+                              (tender_id, f"{path}-%"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_model_inference.py
+"""
+Cost model inference latency: the original path against the native fast path.
+
+  sklearn   per-row feature list -> StandardScaler.transform -> XGBRegressor.predict
+            (what inference.predict_cost used to do; builds a DMatrix per call)
+  inplace   FeatureVectorizer (float32, scaler fused in when the model has one)
+            -> Booster.inplace_predict with --nthread threads
+
+Uses the served model (registry CURRENT, else models/; no database needed); feature rows are random
+projects. Reports single-row p50/p95 and 1k-row batch latency, and checks that
+both paths give the same predictions.
+
+    python -m backend.benchmarks.bench_model_inference --nthread 1
+"""
+import argparse
+import statistics
+import time
+import warnings
+
+import numpy as np
+
+from backend.ml.model_server import ModelServer, joblib_load, MODEL_FILE, SCALER_FILE
+from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+from backend.utils.quantity_estimator import PROJECT_TYPES, TRAFFIC_LEVELS, LOCATION_TYPES
+
+SOIL_TYPES = ("normal", "sandy", "clayey", "rocky")
+
+
+def random_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n):
+        record = {name: float(rng.uniform(0, 5000)) for name in NUMERIC_FEATURES}
+        record["road_length_km"] = float(rng.uniform(1, 80))
+        record["road_width_m"] = float(rng.uniform(4, 15))
+        record["location_type"] = str(rng.choice(LOCATION_TYPES))
+        record["project_type"] = str(rng.choice(PROJECT_TYPES))
+        record["traffic_volume"] = str(rng.choice(TRAFFIC_LEVELS))
+        record["soil_type"] = str(rng.choice(SOIL_TYPES))
+        records.append(record)
+    return records
+
+
+class SklearnPath:
+    """The pre-fast-path pipeline, kept here for comparison only"""
+
+    def __init__(self, models_folder, columns):
+        self.model = joblib_load(f"{models_folder}/{MODEL_FILE}")
+        self.scaler = joblib_load(f"{models_folder}/{SCALER_FILE}")
+        self.columns = columns
+
+    def _vector(self, record):
+        row = []
+        for column in self.columns:
+            if column in record:
+                row.append(float(record[column]) if record[column] is not None else 0.0)
+            else:
+                name, _, value = next(
+                    ((c, "_", column[len(c) + 1:]) for c in CATEGORICAL_FEATURES if column.startswith(c + "_")),
+                    (None, None, None)
+                )
+                row.append(1.0 if name and str(record.get(name)).lower() == value else 0.0)
+        return row
+
+    def predict(self, records):
+        X = np.array([self._vector(r) for r in records], dtype=float)
+        return self.model.predict(self.scaler.transform(X))
+
+
+def _time(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--nthread", type=int, default=1)
+    parser.add_argument("--single-repeats", type=int, default=500)
+    parser.add_argument("--batch-repeats", type=int, default=30)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    server = ModelServer(args.models, nthread=args.nthread)
+    if not server.load():
+        raise SystemExit("No model in models/ - train one first")
+    fast = server.current
+
+    records = random_records(1000)
+    fast_preds = fast.predict(records)
+
+    paths = [("inplace", fast.predict)]
+    if fast.scaled:
+        slow = SklearnPath(server.folder, fast.feature_columns)
+        slow_preds = slow.predict(records)
+        print(f"max |sklearn - inplace| = {np.abs(slow_preds - fast_preds).max():.6g}")
+        paths.insert(0, ("sklearn", slow.predict))
+    else:
+        print("model has no scaler; sklearn path not applicable")
+
+    print(f"{'path':<10} {'1 row p50':>11} {'1 row p95':>11} {'1k rows p50':>13} {'per row':>10}")
+    for label, predict in paths:
+        one = records[:1]
+        p50, p95 = _time(lambda: predict(one), args.single_repeats)
+        b50, _ = _time(lambda: predict(records), args.batch_repeats)
+        print(f"{label:<10} {p50:9.3f}ms {p95:9.3f}ms {b50:11.2f}ms {b50 / len(records) * 1000:8.1f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_out_of_core.py
+"""
+Peak memory of in-memory against out-of-core (external memory) training, and of
+the feature snapshot refresh that precedes it, as the tender history grows.
+
+For each size in --rows a synthetic feature snapshot is written to a temporary
+store, then each mode runs once on it in a fresh process:
+
+  in-memory    train_model.native_table: the full float32 matrix, then XGBoost
+  out-of-core  out_of_core.fit_external: --chunk-rows at a time into a disk cache
+  refresh      update_snapshot's on-disk merge and hash, with the newest tenth of
+               the rows as the fresh ones (no MySQL: the fetch is not measured)
+
+    python -m backend.benchmarks.bench_out_of_core --rows 1000000,2000000,4000000 --trees 20
+
+Prints one JSON line per run, then per mode how much the peak RSS grew per extra
+row between the two largest sizes (the smaller ones carry start-up effects).
+In-memory that is the matrix and its copies (~190 bytes/row at 2M-4M rows);
+refresh stays near flat, its peak being one merge block's working set (~7);
+out-of-core grows only by XGBoost's own per-row state, labels, gradients and
+predictions (~67), which is the figure to budget RAM with.
+No database needed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.bench_training_memory import ROOT, write_snapshot
+
+MODES = ("in-memory", "out-of-core", "refresh")
+
+
+def run_worker(mode, store_dir, trees, chunk_rows, nthread):
+    from backend.ml import feature_store
+    from backend.ml.feature_schema import native_schema
+    from backend.ml.feature_store import load_snapshot
+    from backend.ml.out_of_core import fit_external
+    from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from backend.ml.train_model import native_table, holdout_mask, peak_rss_mb
+    import xgboost as xgb
+
+    baseline = peak_rss_mb()
+    snapshot = load_snapshot(store_dir)
+    params = {"tree_method": "hist", "n_estimators": trees, "max_depth": 8, "n_jobs": nthread,
+              "enable_categorical": True,
+              "feature_types": ["q"] * len(NUMERIC_FEATURES) + ["c"] * len(CATEGORICAL_FEATURES)}
+    started = time.perf_counter()
+    if mode == "in-memory":
+        X, y, _, _ = native_table(snapshot)
+        test = holdout_mask(snapshot.columns["tender_id"])
+        xgb.XGBRegressor(**params).fit(X[~test], y[~test])
+        extra = {"matrix_mb": round(X.nbytes / 1e6, 1)}
+    elif mode == "refresh":
+        columns, fresh_from = snapshot.columns, snapshot.rows - snapshot.rows // 10
+        with tempfile.TemporaryDirectory(dir=store_dir) as out:
+            feature_store._merge(columns, {name: array[fresh_from:] for name, array in columns.items()},
+                                 columns["tender_id"], out, chunk_rows)
+            merged = feature_store._load_columns(out, list(columns))
+            feature_store._content_hash(merged, snapshot.manifest["vocab"])
+        extra = {"fresh_rows": snapshot.rows - fresh_from, "block_rows": chunk_rows}
+    else:
+        vocab = {name: list(snapshot.manifest["vocab"][name]) for name in CATEGORICAL_FEATURES}
+        _, metrics = fit_external(snapshot, native_schema(NUMERIC_FEATURES, vocab), params, holdout_mask,
+                                  chunk_rows=chunk_rows)
+        extra = {"chunk_rows": chunk_rows, "cache_mb": metrics["cache_mb"]}
+    print(json.dumps({
+        "mode": mode,
+        "rows": snapshot.rows,
+        **extra,
+        "seconds": round(time.perf_counter() - started, 2),
+        "rss_before_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000000,2000000,4000000", help="comma-separated snapshot sizes")
+    parser.add_argument("--trees", type=int, default=20)
+    parser.add_argument("--chunk-rows", type=int, default=100000)
+    parser.add_argument("--nthread", type=int, default=0, help="XGBoost threads; 0 = all cores")
+    parser.add_argument("--worker", choices=("write",) + MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    nthread = args.nthread or os.cpu_count()
+
+    if args.worker == "write":
+        write_snapshot(args.store, int(args.rows))
+        return
+    if args.worker:
+        run_worker(args.worker, args.store, args.trees, args.chunk_rows, nthread)
+        return
+
+    command = [sys.executable, "-m", "backend.benchmarks.bench_out_of_core"]
+    results = {mode: [] for mode in MODES}
+    for rows in args.rows.split(","):
+        with tempfile.TemporaryDirectory() as store:
+            # Generated in its own process too: peak RSS is inherited across fork
+            subprocess.run(command + ["--worker", "write", "--store", store, "--rows", rows], cwd=ROOT, check=True)
+            for mode in MODES:
+                out = subprocess.run(
+                    command + ["--worker", mode, "--store", store, "--trees", str(args.trees),
+                               "--chunk-rows", str(args.chunk_rows), "--nthread", str(nthread)],
+                    cwd=ROOT, check=True, capture_output=True, text=True
+                ).stdout
+                print(out.strip().splitlines()[-1], flush=True)
+                results[mode].append(json.loads(out.strip().splitlines()[-1]))
+
+    for mode, runs in results.items():
+        runs = sorted(runs, key=lambda run: run["rows"])[-2:]
+        if len(runs) == 2 and runs[1]["rows"] > runs[0]["rows"]:
+            growth = (runs[1]["peak_rss_mb"] - runs[0]["peak_rss_mb"]) * 2 ** 20
+            print(json.dumps({"mode": mode, "rss_growth_bytes_per_row":
+                              round(growth / (runs[1]["rows"] - runs[0]["rows"]), 1)}))
+
+if __name__ == "__main__":
+    main()
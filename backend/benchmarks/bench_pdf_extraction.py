@@ -0,0 +1,133 @@
+# backend/benchmarks/bench_pdf_extraction.py
+"""
+BOQ PDF text extraction throughput: sequential against the process pool.
+
+Writes --files synthetic BOQ PDFs of --pages pages each (a table of item no,
+description, unit, quantity, rate and amount per page), then extracts and parses
+them with pdf_parser.parse_boq_pdfs once per worker count:
+
+    python -m backend.benchmarks.bench_pdf_extraction --files 40 --pages 50 --workers 1,2,4
+
+Prints pages/s per run. With --pages-per-task a single large file is split into
+page ranges instead of being extracted by one worker. No database needed.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import fitz
+
+DESCRIPTIONS = [
+    "Excavation in ordinary soil for road formation",
+    "Compaction of natural ground to 95% modified AASHO density",
+    "Granular sub-base course laid and compacted",
+    "Water bound macadam base course with crushed stone aggregate",
+    "Bituminous prime coat using cut-back asphalt MC-70",
+    "Asphaltic concrete wearing course 50 mm thick including tack coat, laying and rolling with approved pavers",
+    "Cement concrete 1:2:4 in kerbs and channels",
+    "Steel bar reinforcement grade 60 including cutting, bending and placing in position as directed",
+    "Ravi sand filling under foundations",
+    "Road marking with thermoplastic paint",
+    "Supply and fixing of road signs on steel posts",
+    "Stone pitching on embankment slopes",
+]
+UNITS = ["m3", "m2", "cft", "rm", "kg", "mt", "nos", "bag"]
+# x of each column on an A4 page
+COLUMNS = {"item": 40, "description": 85, "unit": 330, "quantity": 370, "rate": 440, "amount": 510}
+DESCRIPTION_CHARS = 48
+
+
+def _wrap(text, width):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + [line]
+
+def write_boq_pdf(path, pages, rows_per_page=30, seed=0, style="table"):
+    """
+    Synthetic BOQ PDF; returns the rows written (the ground truth). style "table"
+    puts every cell in its column under a header row (descriptions wrap);
+    "continued" is one table whose header is only on the first page;
+    "inline" writes each item as one line of text with no header.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    truth = []
+    for p in range(pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((40, 40), f"BILL OF QUANTITIES - Schedule {p + 1}", fontsize=11)
+        y = 70
+        if style == "table" or (style == "continued" and p == 0):
+            for name, x in COLUMNS.items():
+                page.insert_text((x, y), name.title(), fontsize=8)
+            y += 16
+        for r in range(rows_per_page):
+            row = {
+                "item_no": f"{p + 1}.{r + 1:02d}",
+                "description": rng.choice(DESCRIPTIONS),
+                "unit": rng.choice(UNITS),
+                "quantity": round(rng.uniform(1, 20000), 2),
+                "unit_price": round(rng.uniform(10, 50000), 2),
+            }
+            row["total_price"] = round(row["quantity"] * row["unit_price"], 2)
+            if style == "inline":
+                if y > 810:
+                    break
+                page.insert_text((COLUMNS["item"], y), f"{row['item_no']} {row['description']} {row['quantity']:,.2f} "
+                                 f"{row['unit']} {row['unit_price']:,.2f} {row['total_price']:,.2f}", fontsize=6)
+                truth.append(row)
+                y += 12
+                continue
+            lines = _wrap(row["description"], DESCRIPTION_CHARS)
+            if y + 11 * len(lines) > 810:
+                break
+            page.insert_text((COLUMNS["item"], y), row["item_no"], fontsize=8)
+            for k, line in enumerate(lines):
+                page.insert_text((COLUMNS["description"], y + 10 * k), line, fontsize=8)
+            page.insert_text((COLUMNS["unit"], y), row["unit"], fontsize=8)
+            page.insert_text((COLUMNS["quantity"], y), f"{row['quantity']:,.2f}", fontsize=8)
+            page.insert_text((COLUMNS["rate"], y), f"{row['unit_price']:,.2f}", fontsize=8)
+            page.insert_text((COLUMNS["amount"], y), f"{row['total_price']:,.2f}", fontsize=8)
+            truth.append(row)
+            y += 10 * len(lines) + 6
+    doc.save(path)
+    doc.close()
+    return truth
+
+def write_corpus(folder, files, pages, seed=0, styles=("table",)):
+    """files BOQ PDFs in folder (styles used in turn); returns {path: ground truth rows}"""
+    corpus = {}
+    for i in range(files):
+        path = os.path.join(folder, f"boq_{i:04d}.pdf")
+        corpus[path] = write_boq_pdf(path, pages, seed=seed + i, style=styles[i % len(styles)])
+    return corpus
+
+def main():
+    from backend.utils.pdf_parser import parse_boq_pdfs
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count()}", help="comma-separated worker counts")
+    parser.add_argument("--pages-per-task", type=int, default=0, help="split files into page ranges; 0 = whole files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = write_corpus(folder, args.files, args.pages)
+        print(f"{len(corpus)} PDFs x {args.pages} pages, {sum(len(rows) for rows in corpus.values())} BOQ rows")
+        for workers in (int(w) for w in args.workers.split(",")):
+            stats = {}
+            started = time.perf_counter()
+            items = sum(len(found) for _, found in parse_boq_pdfs(sorted(corpus), workers, args.pages_per_task, stats))
+            wall = time.perf_counter() - started
+            print(f"workers={workers:<3} {stats['pages'] / wall:8.1f} pages/s  "
+                  f"{stats['pages']} pages in {wall:.2f}s, {items} items parsed")
+
+if __name__ == "__main__":
+    main()
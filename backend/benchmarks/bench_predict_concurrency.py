@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_predict_concurrency.py
+"""
+Concurrent /api/predict throughput.
+
+Live mode (needs the API + MySQL running), run once on the old build and once on
+the new one to compare:
+
+    python -m backend.benchmarks.bench_predict_concurrency --url http://localhost:8000 --requests 200 --concurrency 20
+
+Simulated mode (no server, no MySQL): compares a handler that calls a blocking
+20 ms "query" directly on the event loop with one that awaits it through run_db.
+
+    python -m backend.benchmarks.bench_predict_concurrency --simulate
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_PROJECT = {
+    "project_name": "Benchmark Road",
+    "location": "Lahore",
+    "location_type": "plain",
+    "max_budget_pkr": 5_000_000_000,
+    "parent_company": "NHA",
+    "road_length_km": 12.5,
+    "road_width_m": 7.3,
+    "project_type": "highway",
+    "soil_type": "normal",
+    "traffic_volume": "medium",
+}
+
+def _report(label, latencies, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(f"{label:<28} {len(latencies) / wall:8.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+
+def run_live(url, total, concurrency, user_id):
+    import requests
+
+    session = requests.Session()
+    endpoint = f"{url.rstrip('/')}/api/predict"
+
+    def one(_):
+        started = time.perf_counter()
+        r = session.post(endpoint, params={"user_id": user_id}, json=SAMPLE_PROJECT, timeout=120)
+        r.raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total)))
+    _report(f"live x{concurrency}", latencies, time.perf_counter() - started)
+
+def run_simulated(total, query_ms):
+    from backend.database import run_db
+
+    def blocking_query():
+        time.sleep(query_ms / 1000)
+
+    # Latency is measured from the moment all requests arrive, as a client would see it
+    async def handler_blocking(arrived):
+        blocking_query()
+        return time.perf_counter() - arrived
+
+    async def handler_executor(arrived):
+        await run_db(blocking_query)
+        return time.perf_counter() - arrived
+
+    async def drive(handler):
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(handler(started) for _ in range(total)))
+        return latencies, time.perf_counter() - started
+
+    for label, handler in (("blocking on event loop", handler_blocking),
+                           ("run_db executor", handler_executor)):
+        latencies, wall = asyncio.run(drive(handler))
+        _report(label, latencies, wall)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--query-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.simulate:
+        run_simulated(args.requests, args.query_ms)
+    else:
+        run_live(args.url, args.requests, args.concurrency, args.user_id)
@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_startup.py
+"""
+API startup time, for tracking across releases.
+
+Starts `uvicorn backend.app:app` in a fresh process (from the repo root) and polls
+until /api/health answers (accepting traffic) and until /api/ready answers 200
+(database, catalog and other components warm). Also times a bare
+`import backend.app`. Prints one JSON line per run so results can be appended to a
+file and compared:
+
+    python -m backend.benchmarks.bench_startup --runs 3 >> startup_times.jsonl
+
+Without MySQL the required components never warm up; /api/ready is then reported
+as not reached after --timeout, while the health and import timings still apply.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except OSError:
+        return None, None
+
+def time_import():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import backend.app"], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def time_server(timeout):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    health_s = ready_s = None
+    ready_body = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if health_s is None and _status(f"{base}/api/health")[0] == 200:
+                health_s = time.perf_counter() - started
+            if health_s is not None:
+                code, ready_body = _status(f"{base}/api/ready")
+                if code == 200:
+                    ready_s = time.perf_counter() - started
+                    break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return health_s, ready_s, ready_body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for readiness")
+    args = parser.parse_args()
+
+    for run in range(args.runs):
+        import_s = time_import()
+        health_s, ready_s, ready_body = time_server(args.timeout)
+        print(json.dumps({
+            "run": run + 1,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "import_app_s": round(import_s, 3),
+            "process_to_health_s": round(health_s, 3) if health_s is not None else None,
+            "process_to_ready_s": round(ready_s, 3) if ready_s is not None else None,
+            "components": {
+                name: {"status": c["status"], "seconds": c["seconds"]}
+                for name, c in ((ready_body or {}).get("components") or {}).items()
+            },
+            "startup": (ready_body or {}).get("startup"),
+        }))
+
+if __name__ == "__main__":
+    main()
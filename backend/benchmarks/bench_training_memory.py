@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_training_memory.py
+"""
+Training memory and time: one-hot (dense float64 + StandardScaler) against native
+categoricals (float32 codes, XGBoost categorical splits).
+
+Writes a synthetic feature snapshot of --rows tenders to a temporary store, then
+trains on it once per encoding, each in a fresh process so peak RSS is not
+shared. Prints one JSON line per encoding:
+
+    python -m backend.benchmarks.bench_training_memory --rows 1000000 --trees 50
+
+No database needed. Peak RSS comes from getrusage (Linux / macOS).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+from backend.utils.quantity_estimator import PROJECT_TYPES, TRAFFIC_LEVELS, LOCATION_TYPES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+VOCAB = {
+    "location_type": list(LOCATION_TYPES),
+    "project_type": list(PROJECT_TYPES),
+    "traffic_volume": list(TRAFFIC_LEVELS),
+    "soil_type": ["normal", "sandy", "clayey", "rocky"],
+}
+
+
+def write_snapshot(store_dir, rows, seed=0):
+    from backend.ml import feature_store
+
+    rng = np.random.default_rng(seed)
+    columns = {"tender_id": np.arange(1, rows + 1, dtype=np.int64)}
+    for name in NUMERIC_FEATURES:
+        columns[name] = rng.uniform(0, 5000, rows).astype(np.float32)
+    for name in CATEGORICAL_FEATURES:
+        columns[name] = rng.integers(0, len(VOCAB[name]), rows).astype(np.int16)
+    columns["label_cost"] = (
+        columns["road_length_km"].astype(np.float64) * 2.5e5
+        + columns["cement_qty"] * 900.0
+        + columns["project_type"] * 1e6
+        + rng.normal(0, 1e5, rows)
+    )
+    return feature_store._save(store_dir, columns, {n: list(VOCAB[n]) for n in CATEGORICAL_FEATURES}, None, None)
+
+def run_worker(encoding, store_dir, trees, nthread):
+    """Build the training matrix and fit, in this process; prints the JSON result"""
+    from backend.ml.train_model import onehot_table, native_table, peak_rss_mb
+    from backend.ml.feature_store import load_snapshot
+    from sklearn.preprocessing import StandardScaler
+    import xgboost as xgb
+
+    baseline = peak_rss_mb()
+    snapshot = load_snapshot(store_dir)
+    started = time.perf_counter()
+    params = {"tree_method": "hist", "n_estimators": trees, "max_depth": 8, "n_jobs": nthread}
+    if encoding == "native":
+        X, y, _, _ = native_table(snapshot)
+        params.update(enable_categorical=True,
+                      feature_types=["q"] * len(NUMERIC_FEATURES) + ["c"] * len(CATEGORICAL_FEATURES))
+    else:
+        X, y, _ = onehot_table(snapshot)
+        X = StandardScaler().fit_transform(X)
+    build_s = time.perf_counter() - started
+    after_build = peak_rss_mb()
+
+    started = time.perf_counter()
+    xgb.XGBRegressor(**params).fit(X, y)
+    fit_s = time.perf_counter() - started
+    print(json.dumps({
+        "encoding": encoding,
+        "rows": snapshot.rows,
+        "columns": int(X.shape[1]),
+        "matrix_mb": round(X.nbytes / 1e6, 1),
+        "build_s": round(build_s, 2),
+        "fit_s": round(fit_s, 2),
+        "rss_before_mb": baseline,
+        "peak_rss_build_mb": after_build,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--nthread", type=int, default=0, help="XGBoost threads; 0 = all cores")
+    parser.add_argument("--worker", choices=("onehot", "native"), help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    nthread = args.nthread or os.cpu_count()
+
+    if args.worker:
+        run_worker(args.worker, args.store, args.trees, nthread)
+        return
+
+    with tempfile.TemporaryDirectory() as store:
+        write_snapshot(store, args.rows)
+        for encoding in ("onehot", "native"):
+            out = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.bench_training_memory", "--worker", encoding,
+                 "--store", store, "--trees", str(args.trees), "--nthread", str(nthread)],
+                cwd=ROOT, check=True, capture_output=True, text=True
+            ).stdout
+            print(out.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
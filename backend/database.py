@@ -1,11 +1,243 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from queue import LifoQueue, Empty
+
 import pymysql
 from pymysql.cursors import DictCursor
 import yaml
 
-cfg = yaml.safe_load(open("config.yaml"))
+# libyaml's loader when available; parsing the config is on the import path of every worker
+with open("config.yaml") as _f:
+    cfg = yaml.load(_f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
-def get_conn():
-    return pymysql.connect(
+# ============================================================================
+# CONNECTION POOL
+# ============================================================================
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pymysql connection checked out of a ConnectionPool.
+    close() hands the connection back to the pool instead of closing the socket,
+    so existing `conn = get_conn() ... conn.close()` call sites keep working.
+    A proxy dropped without close() (e.g. an exception skipped it) returns its
+    connection when it is garbage-collected, so the pool slot is never lost.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        # Holds pool and raw, never self, so the proxy can still be collected
+        self._finalizer = weakref.finalize(self, pool.reclaim, raw)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to the pool")
+        return getattr(raw, name)
+
+    def close(self):
+        self._raw = None
+        detached = self._finalizer.detach()  # None once closed (or reclaimed)
+        if detached is not None:
+            _, _, (raw,), _ = detached
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Uncommitted work is rolled back by the pool on release
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Bounded pool of pymysql connections.
+
+    - at most `size` connections exist at once; callers wait up to `timeout` seconds
+    - idle connections are pinged before reuse when they have been idle for
+      `ping_interval` seconds, and replaced if the server dropped them
+    - connections older than `recycle` seconds are closed and reopened
+    - any open transaction is rolled back when a connection is returned
+    """
+
+    def __init__(self, size=10, timeout=30.0, recycle=3600, ping_interval=30.0, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._born = {}  # id(raw) -> created timestamp
+        self._last_used = {}  # id(raw) -> last release timestamp
+
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total_s": 0.0,
+            "wait_time_max_s": 0.0,
+            "timeouts": 0,
+            "in_use": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "reclaimed": 0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(**self.connect_kwargs)
+        now = time.monotonic()
+        with self._lock:
+            self._born[id(raw)] = now
+            self._last_used[id(raw)] = now
+            self._stats["created"] += 1
+        return raw
+
+    def _discard(self, raw, reason="discarded"):
+        with self._lock:
+            self._born.pop(id(raw), None)
+            self._last_used.pop(id(raw), None)
+            self._stats[reason] += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, raw):
+        now = time.monotonic()
+        born = self._born.get(id(raw), now)
+        if self.recycle and now - born > self.recycle:
+            self._discard(raw, "recycled")
+            return False
+        if now - self._last_used.get(id(raw), now) >= self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._discard(raw)
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a raw connection, opening a new one if no idle one is usable."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available within {self.timeout}s")
+
+        try:
+            raw = None
+            while raw is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except Empty:
+                    raw = self._connect()
+                    break
+                if self._is_usable(candidate):
+                    raw = candidate
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_time_total_s"] += waited
+            self._stats["wait_time_max_s"] = max(self._stats["wait_time_max_s"], waited)
+        return raw
+
+    def release(self, raw):
+        """Return a raw connection to the pool (drops it if it is broken)."""
+        try:
+            # Never hand the next caller an open transaction or a stale snapshot
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+        else:
+            with self._lock:
+                self._last_used[id(raw)] = time.monotonic()
+            self._idle.put(raw)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def reclaim(self, raw):
+        """release() for a connection whose proxy was garbage-collected without close()"""
+        with self._lock:
+            self._stats["reclaimed"] += 1
+        self.release(raw)
+
+    def get(self):
+        """Check out a connection wrapped so that close() returns it to the pool."""
+        return PooledConnection(self, self.acquire())
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection; uncommitted work is rolled back on exit."""
+        conn = self.get()
+        with conn:
+            yield conn
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["size"] = self.size
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["wait_time_avg_ms"] = (
+            snapshot["wait_time_total_s"] / snapshot["checkouts"] * 1000 if snapshot["checkouts"] else 0.0
+        )
+        return snapshot
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close when returned)."""
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(raw)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide pool, rebuilt after fork so children never share sockets."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                pool_cfg = cfg["mysql"].get("pool", {}) or {}
+                _pool = ConnectionPool(
+                    size=pool_cfg.get("size", 10),
+                    timeout=pool_cfg.get("timeout", 30),
+                    recycle=pool_cfg.get("recycle", 3600),
+                    ping_interval=pool_cfg.get("ping_interval", 30),
+                    **_connect_kwargs()
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def _connect_kwargs():
+    return dict(
         host=cfg["mysql"]["host"],
         user=cfg["mysql"]["user"],
         password=cfg["mysql"]["password"],
@@ -14,102 +246,363 @@ def get_conn():
         charset="utf8mb4"
     )
 
+def open_dedicated_connection():
+    """
+    Unpooled connection for long-lived sessions, e.g. one holding a GET_LOCK for
+    the length of a training job. The caller closes it.
+    """
+    return pymysql.connect(**_connect_kwargs())
+
+def get_conn():
+    """Pooled connection; call close() (or use it as a context manager) to give it back."""
+    return get_pool().get()
+
+def connection():
+    """`with connection() as conn:` - pooled connection released on exit."""
+    return get_pool().connection()
+
+def get_pool_stats():
+    return get_pool().stats()
+
+# ============================================================================
+# ASYNC DATA ACCESS (bounded executor over the pool)
+# ============================================================================
+
+_executor = None
+_executor_pid = None
+
+def get_db_executor():
+    """
+    Thread pool sized to the connection pool: blocking pymysql work runs here so
+    the event loop stays free, and we never queue more threads than connections.
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        size = get_pool().size
+        with _pool_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db")
+                _executor_pid = os.getpid()
+    return _executor
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking callable on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(fn, *args, **kwargs))
+
+def _fetch_one(sql, params=None):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone()
+
+def _fetch_all(sql, params=None):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+def _execute(sql, params=None):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            lastrowid = cur.lastrowid
+        conn.commit()
+        return lastrowid
+
+def _in_transaction(fn, *args, **kwargs):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            result = fn(cur, *args, **kwargs)
+        conn.commit()
+        return result
+
+async def fetch_one(sql, params=None):
+    return await run_db(_fetch_one, sql, params)
+
+async def fetch_all(sql, params=None):
+    return await run_db(_fetch_all, sql, params)
+
+async def execute(sql, params=None):
+    """Run one write statement, commit, and return cursor.lastrowid."""
+    return await run_db(_execute, sql, params)
+
+async def run_in_transaction(fn, *args, **kwargs):
+    """
+    Call fn(cursor, *args, **kwargs) on one pooled connection and commit if it
+    returns normally; any exception rolls the whole unit back.
+    """
+    return await run_db(_in_transaction, fn, *args, **kwargs)
+
 def insert_tender_record(tender):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO tenders
-        (source_site, tender_url, tender_no, title, department, city, province, 
-         publish_date, closing_date, category, procurement_method, opening_date, 
-         status, organization, raw_pdf_path, created_at)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-    """, (
-        tender.get("source_site"),
-        tender.get("tender_url"),
-        tender.get("tender_no"),
-        tender.get("title"),
-        tender.get("department"),
-        tender.get("city"),
-        tender.get("province"),
-        tender.get("publish_date"),
-        tender.get("closing_date"),
-        tender.get("category"),
-        tender.get("procurement_method"),
-        tender.get("opening_date"),
-        tender.get("status"),
-        tender.get("organization"),
-        tender.get("raw_pdf_path")
-    ))
-    tid = cur.lastrowid
-    conn.commit()
-    cur.close()
-    conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO tenders
+            (source_site, tender_url, tender_no, title, department, city, province, 
+             publish_date, closing_date, category, procurement_method, opening_date, 
+             status, organization, raw_pdf_path, created_at)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+        """, (
+            tender.get("source_site"),
+            tender.get("tender_url"),
+            tender.get("tender_no"),
+            tender.get("title"),
+            tender.get("department"),
+            tender.get("city"),
+            tender.get("province"),
+            tender.get("publish_date"),
+            tender.get("closing_date"),
+            tender.get("category"),
+            tender.get("procurement_method"),
+            tender.get("opening_date"),
+            tender.get("status"),
+            tender.get("organization"),
+            tender.get("raw_pdf_path")
+        ))
+        tid = cur.lastrowid
+        conn.commit()
     return tid
 
 def upsert_material(name, unit):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)", (name,))
-    r = cur.fetchone()
-    if r:
-        mid = r["material_id"]
-    else:
-        # Note: In new schema materials link to categories, but for scraper/legacy support we allow null category
-        cur.execute("INSERT INTO materials (material_name, unit) VALUES (%s,%s)", (name, unit))
-        mid = cur.lastrowid
-        conn.commit()
-    cur.close()
-    conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)", (name,))
+        r = cur.fetchone()
+        if r:
+            mid = r["material_id"]
+        else:
+            # Note: In new schema materials link to categories, but for scraper/legacy support we allow null category
+            cur.execute("INSERT INTO materials (material_name, unit) VALUES (%s,%s)", (name, unit))
+            mid = cur.lastrowid
+            conn.commit()
     return mid
 
-def insert_boq_line(tender_id, boq_id, item_code, description, unit, quantity, rate, cost, raw_line):
-    """Insert a parsed BOQ line into the boq_items table."""
-    conn = get_conn()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        INSERT INTO boq_items
-        (tender_id, boq_id, item_code, description, unit, quantity, rate, cost, created_at)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-    """, (tender_id, boq_id, item_code, description, unit, quantity, rate, cost))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+def insert_boq_line(tender_id, boq_id, item_code, description, unit, quantity, rate, cost, raw_line=None, db=None):
+    """Insert a single parsed BOQ line into the boq_items table (store_boq_file writes whole files)."""
+    conn = db or get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO boq_items
+                (tender_id, boq_id, item_code, description, unit, quantity, rate, cost, raw_line, created_at)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+            """, (tender_id, boq_id, item_code, description, unit, quantity, rate, cost, raw_line))
+        conn.commit()
+    finally:
+        if not db:
+            conn.close()
 
 def insert_boq_file(tender_id, file_path, extracted_text, db=None):
     """Insert a BOQ file record and return the boq_id."""
     conn = db or get_conn()
-    cur = conn.cursor()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO boq_files (tender_id, file_path, extracted_text, created_at)
+                VALUES (%s, %s, %s, NOW())
+            """, (tender_id, file_path, extracted_text))
+            boq_id = cur.lastrowid
+        conn.commit()
+    finally:
+        if not db:
+            conn.close()
 
-    cur.execute("""
-        INSERT INTO boq_files (tender_id, file_path, extracted_text, created_at)
-        VALUES (%s, %s, %s, NOW())
-    """, (tender_id, file_path, extracted_text))
+    return boq_id
+
+BOQ_BATCH_SIZE = (cfg.get("etl") or {}).get("boq_batch_size", 1000)
+
+_BOQ_FILE_SQL = "SELECT boq_id, file_sha256, line_count FROM boq_files WHERE tender_id=%s AND file_path=%s"
+
+def get_boq_file(tender_id, file_path, db=None):
+    """{boq_id, file_sha256, line_count} of a stored BOQ file, or None"""
+    if db is None:
+        return _fetch_one(_BOQ_FILE_SQL, (tender_id, file_path))
+    with db.cursor() as cur:
+        cur.execute(_BOQ_FILE_SQL, (tender_id, file_path))
+        return cur.fetchone()
+
+def _store_boq_file(cur, tender_id, file_path, extracted_text, items, file_sha256, batch_size, force):
+    cur.execute(_BOQ_FILE_SQL, (tender_id, file_path))
+    existing = cur.fetchone()
+    if existing and not force and file_sha256 and existing["file_sha256"] == file_sha256:
+        return {"boq_id": existing["boq_id"], "lines": existing["line_count"], "skipped": True}
 
+    # LAST_INSERT_ID(boq_id) makes lastrowid the existing id when the file is re-ingested
+    cur.execute("""
+        INSERT INTO boq_files (tender_id, file_path, file_sha256, extracted_text, line_count, created_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            boq_id=LAST_INSERT_ID(boq_id), file_sha256=VALUES(file_sha256),
+            extracted_text=VALUES(extracted_text), line_count=VALUES(line_count)
+    """, (tender_id, file_path, file_sha256, extracted_text, len(items)))
     boq_id = cur.lastrowid
-    conn.commit()
+    if existing:
+        cur.execute("DELETE FROM boq_items WHERE boq_id=%s", (boq_id,))
 
-    if not db:
-        cur.close()
-        conn.close()
+    rows = [
+        (tender_id, boq_id, line_no, it["item_no"], it["description"], it["unit"],
+         it["quantity"], it["unit_price"], it["total_price"], it.get("raw"))
+        for line_no, it in enumerate(items, start=1)
+    ]
+    # executemany sends each batch as one multi-row INSERT (only with plain %s
+    # placeholders in VALUES, so created_at comes from the column default)
+    for start in range(0, len(rows), batch_size):
+        cur.executemany("""
+            INSERT INTO boq_items
+            (tender_id, boq_id, line_no, item_code, description, unit, quantity, rate, cost, raw_line)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, rows[start:start + batch_size])
+    return {"boq_id": boq_id, "lines": len(rows), "skipped": False}
 
-    return boq_id
+def store_boq_file(tender_id, file_path, extracted_text, items, file_sha256=None, batch_size=None, force=False, db=None):
+    """
+    Write a BOQ file record and all of its parsed lines in one transaction, with
+    batched multi-row inserts. Re-running for the same (tender_id, file_path)
+    replaces that file's lines instead of duplicating them, and is a no-op when
+    file_sha256 matches what was stored (unless force). Returns
+    {"boq_id", "lines", "skipped", "seconds"}.
+    """
+    started = time.perf_counter()
+    args = (tender_id, file_path, extracted_text, items, file_sha256, batch_size or BOQ_BATCH_SIZE, force)
+    if db is None:
+        result = _in_transaction(_store_boq_file, *args)
+    else:
+        cur = db.cursor()
+        try:
+            result = _store_boq_file(cur, *args)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cur.close()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
 
 def stage_price_row(material_name, source_name, unit, price_pkr, year, metadata=None, tender_id=None):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)", (material_name,))
-    r = cur.fetchone()
-    mat_id = r["material_id"] if r else None
-    cur.execute("""
-        INSERT INTO material_price_raw
-        (material_name, canonical_material_id, source_name, unit, price_pkr, year, metadata, tender_id, created_at)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-    """, (material_name, mat_id, source_name, unit, price_pkr, year, yaml.safe_dump(metadata or {}), tender_id))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)", (material_name,))
+        r = cur.fetchone()
+        mat_id = r["material_id"] if r else None
+        cur.execute("""
+            INSERT INTO material_price_raw
+            (material_name, canonical_material_id, source_name, unit, price_pkr, year, metadata, tender_id, created_at)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+        """, (material_name, mat_id, source_name, unit, price_pkr, year, yaml.safe_dump(metadata or {}), tender_id))
+        conn.commit()
+
+# --- PREDICTION PERSISTENCE ---
+
+MULTI_ROW_CHUNK = 500
+
+_write_lock = threading.Lock()
+_write_stats = {"calls": 0, "projects": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+
+def _record_write(projects, rows, elapsed_ms):
+    with _write_lock:
+        _write_stats["calls"] += 1
+        _write_stats["projects"] += projects
+        _write_stats["rows"] += rows
+        _write_stats["total_ms"] += elapsed_ms
+        _write_stats["max_ms"] = max(_write_stats["max_ms"], elapsed_ms)
+        _write_stats["last_ms"] = elapsed_ms
+
+def get_prediction_write_stats():
+    """Insert time for predict writes (statements only, commit excluded)"""
+    with _write_lock:
+        stats = dict(_write_stats)
+    stats["avg_ms_per_call"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+    stats["avg_ms_per_project"] = stats["total_ms"] / stats["projects"] if stats["projects"] else 0.0
+    return stats
+
+def _insert_rows_returning_ids(cur, sql_prefix, row_placeholder, rows, chunk=MULTI_ROW_CHUNK):
+    """
+    Multi-row INSERT in chunks, returning the AUTO_INCREMENT id of every row.
+    A single multi-row VALUES insert is a "simple insert", so InnoDB hands it
+    consecutive ids starting at lastrowid (assumes auto_increment_increment=1).
+    """
+    ids = []
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        cur.execute(
+            sql_prefix + ",".join([row_placeholder] * len(part)),
+            [value for row in part for value in row]
+        )
+        first_id = cur.lastrowid
+        ids.extend(range(first_id, first_id + len(part)))
+    return ids
+
+def _model_columns(ml, model_version):
+    """(model_version, features_json) for a project_predictions row"""
+    if not ml:
+        return model_version, None
+    return ml['model_version'], json.dumps({"ml_estimate_pkr": ml['estimate_pkr'], "features": ml['features']})
+
+def insert_predicted_projects(cur, user_id, entries, model_version="v2.0"):
+    """
+    Persist priced projects with multi-row inserts into projects, project_predictions,
+    project_boq and project_climate_impact. Runs on the caller's cursor; the caller
+    owns the transaction. entries: [(ProjectInput, cost_engine breakdown), ...]
+    A breakdown carrying an 'ml' estimate (model_server) records that model's
+    version and features; otherwise model_version is used.
+    Returns the new project_ids in entry order.
+    """
+    if not entries:
+        return []
+
+    started = time.perf_counter()
+    project_ids = _insert_rows_returning_ids(cur, """
+        INSERT INTO projects
+        (user_id, project_name, location, location_type, parent_company,
+         road_length_km, road_width_m, area_hectares, project_type,
+         traffic_volume, soil_type, max_budget_pkr)
+        VALUES """, "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", [(
+            user_id, p.project_name, p.location, p.location_type, p.parent_company,
+            p.road_length_km, p.road_width_m, (p.road_length_km * 1000 * p.road_width_m) / 10000,
+            p.project_type, p.traffic_volume, p.soil_type, p.max_budget_pkr
+        ) for p, _ in entries])
+
+    cur.executemany("""
+        INSERT INTO project_predictions
+        (project_id, predicted_cost_pkr, total_co2_emissions_tons,
+         total_energy_mj, total_water_liters, budget_status,
+         budget_difference_pkr, budget_utilization_percent, model_version, features_json)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(
+        project_id, r['total_cost'], r['total_co2_kg'] / 1000, r['total_energy_mj'], r['total_water_l'],
+        r['budget_status'], r['budget_difference'], r['budget_utilization'],
+        *_model_columns(r.get('ml'), model_version)
+    ) for project_id, (_, r) in zip(project_ids, entries)])
+
+    boq_rows = [
+        (project_id, item['material_id'], item['quantity'], item['unit'],
+         item['unit_price'], item['total_cost'], item['category'])
+        for project_id, (_, r) in zip(project_ids, entries) for item in r['boq']
+    ]
+    if boq_rows:
+        cur.executemany("""
+            INSERT INTO project_boq
+            (project_id, material_id, quantity, unit, unit_price_pkr, total_cost_pkr, category_name)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, boq_rows)
+
+    climate_rows = [
+        (project_id, item['material_id'], item['quantity_kg'],
+         item['co2_kg'], item['energy_mj'], item['water_l'])
+        for project_id, (_, r) in zip(project_ids, entries) for item in r['climate']
+    ]
+    if climate_rows:
+        cur.executemany("""
+            INSERT INTO project_climate_impact
+            (project_id, material_id, quantity_kg, co2_emissions_kg,
+             energy_consumption_mj, water_usage_liters)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, climate_rows)
+
+    _record_write(
+        len(entries), 2 * len(entries) + len(boq_rows) + len(climate_rows),
+        (time.perf_counter() - started) * 1000
+    )
+    return project_ids
 
 # --- WEB UI EXPANSION FUNCTIONS ---
 
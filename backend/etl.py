@@ -1,7 +1,7 @@
 from backend.scrapers.ppra_scraper import run_ppra_org
 from backend.utils.material_extractor import extract_materials_from_boq_items
 from backend.utils.price_processor import recompute_all
-from backend.database import get_conn
+from backend.database import connection
 
 def run_full_pipeline():
     print("="*60)
@@ -12,12 +12,9 @@ def run_full_pipeline():
     print("\n" + "="*60)
     print("STEP 2: Extracting material prices from BOQ items...")
     print("="*60)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT tender_id FROM tenders WHERE created_at >= DATE_SUB(NOW(), INTERVAL 1 DAY)")
-    recent_tenders = cur.fetchall()
-    cur.close()
-    conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT tender_id FROM tenders WHERE created_at >= DATE_SUB(NOW(), INTERVAL 1 DAY)")
+        recent_tenders = cur.fetchall()
     
     for row in recent_tenders:
         tid = row["tender_id"]
@@ -0,0 +1,176 @@
+# backend/ml/feature_schema.py
+"""
+Feature schema saved next to each trained model, and the vectorizer built from it.
+
+The schema (feature_schema.json) records the model's column order, the numeric
+features, each categorical feature's vocabulary (the one-hot columns training
+produced) and the defaults used for missing values. FeatureVectorizer compiles
+it once into column positions and lookup tables, then turns a batch of records
+(a {feature: values} mapping, a list of dicts or a DataFrame) into a dense
+float32 matrix with per-column array operations.
+
+A scaler can be fused into the vectorizer: numeric columns are scaled in float64
+and one-hot columns take precomputed "off" / "on" values, so the output equals
+scaler.transform() followed by XGBoost's own float32 conversion.
+
+Models trained with native categoricals (training.categorical_encoding: native)
+have encoding "native": one column per categorical feature holding the value's
+index in its vocabulary (NaN, i.e. missing, for values the model never saw).
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+SCHEMA_FILE = "feature_schema.json"
+SCHEMA_VERSION = 1
+
+NUMERIC_DEFAULT = 0.0          # train_model fills missing numerics with 0.0
+CATEGORICAL_DEFAULT = "unknown"  # ...and missing categorical columns with 'unknown'
+
+
+def schema_from_columns(feature_columns, numeric_features, categorical_features):
+    """Derive a schema from the trained column order (one-hot columns are '<feature>_<value>')"""
+    categorical = {}
+    for name in categorical_features:
+        prefix = f"{name}_"
+        categorical[name] = [c[len(prefix):] for c in feature_columns if c.startswith(prefix)]
+    numeric = [name for name in numeric_features if name in feature_columns]
+
+    defaults = {name: NUMERIC_DEFAULT for name in numeric}
+    defaults.update({name: CATEGORICAL_DEFAULT for name in categorical})
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "columns": list(feature_columns),
+        "numeric": numeric,
+        "categorical": categorical,
+        "defaults": defaults,
+        "dtype": "float32",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def native_schema(numeric_features, vocab):
+    """Schema for numeric columns followed by one category-code column per categorical feature"""
+    defaults = {name: NUMERIC_DEFAULT for name in numeric_features}
+    defaults.update({name: CATEGORICAL_DEFAULT for name in vocab})
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "encoding": "native",
+        "columns": list(numeric_features) + list(vocab),
+        "numeric": list(numeric_features),
+        "categorical": {name: list(values) for name, values in vocab.items()},
+        "defaults": defaults,
+        "dtype": "float32",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def save_schema(schema, models_folder):
+    path = os.path.join(models_folder, SCHEMA_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def load_schema(models_folder):
+    """The saved schema, or None for models trained before schemas were written"""
+    path = os.path.join(models_folder, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _numeric_values(values, default):
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # None / strings: coerce like pd.to_numeric(errors='coerce')
+        array = np.array([_to_float(v) for v in values], dtype=np.float64)
+    return np.where(np.isnan(array), default, array)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FeatureVectorizer:
+    def __init__(self, schema, shift=None, scale=None):
+        self.schema = schema
+        self.columns = schema["columns"]
+        self.defaults = schema.get("defaults", {})
+        n_columns = len(self.columns)
+        position = {name: j for j, name in enumerate(self.columns)}
+
+        shift = np.zeros(n_columns) if shift is None else np.broadcast_to(np.asarray(shift, dtype=np.float64), (n_columns,))
+        scale = np.ones(n_columns) if scale is None else np.broadcast_to(np.asarray(scale, dtype=np.float64), (n_columns,))
+        self._shift = shift
+        self._scale = scale
+        # Value of every column when its feature is absent / one-hot is off, and when a one-hot is on
+        self._base_row = ((0.0 - shift) / scale).astype(np.float32)
+        self._on_value = ((1.0 - shift) / scale).astype(np.float32)
+
+        self._numeric = [
+            (name, position[name], self.defaults.get(name, NUMERIC_DEFAULT))
+            for name in schema["numeric"] if name in position
+        ]
+        self.native = schema.get("encoding") == "native"
+        if self.native:
+            # feature -> {normalised value: category code}; column position in _code_columns
+            self._categorical = {
+                name: {str(value).lower().strip(): code for code, value in enumerate(vocabulary)}
+                for name, vocabulary in schema["categorical"].items()
+            }
+            self._code_columns = {name: position[name] for name in self._categorical}
+        else:
+            # feature -> {normalised value: column position}
+            self._categorical = {
+                name: {value: position[f"{name}_{value}"] for value in vocabulary if f"{name}_{value}" in position}
+                for name, vocabulary in schema["categorical"].items()
+            }
+
+    @property
+    def feature_names(self):
+        return [name for name, _, _ in self._numeric] + list(self._categorical)
+
+    def _columns(self, records):
+        """(mapping of feature -> values, row count) for any supported input"""
+        if hasattr(records, "columns") and hasattr(records, "to_numpy"):   # DataFrame
+            return {name: records[name].to_numpy() for name in self.feature_names if name in records.columns}, len(records)
+        if isinstance(records, dict):
+            lengths = {len(v) for v in records.values()}
+            return records, lengths.pop() if lengths else 0
+        records = list(records)
+        return {name: [r.get(name) for r in records] for name in self.feature_names}, len(records)
+
+    def transform(self, records):
+        """Dense (rows x columns) float32 matrix in the schema's column order"""
+        columns, n = self._columns(records)
+        X = np.empty((n, len(self.columns)), dtype=np.float32)
+        X[:] = self._base_row
+
+        for name, j, default in self._numeric:
+            values = _numeric_values(columns[name], default) if name in columns else np.full(n, default)
+            X[:, j] = (values - self._shift[j]) / self._scale[j]
+
+        rows = np.arange(n)
+        for name, lookup in self._categorical.items():
+            values = np.asarray(columns.get(name, [self.defaults.get(name, CATEGORICAL_DEFAULT)] * n), dtype=object)
+            if n == 0:
+                continue
+            values = np.where(values == None, self.defaults.get(name, CATEGORICAL_DEFAULT), values)  # noqa: E711
+            # Map each distinct value once, then broadcast through the inverse index
+            keys, inverse = np.unique(values.astype(str), return_inverse=True)
+            if self.native:
+                codes = np.array([lookup.get(k.lower().strip(), np.nan) for k in keys], dtype=np.float32)
+                X[:, self._code_columns[name]] = codes[inverse.reshape(-1)]
+                continue
+            key_cols = np.array([lookup.get(k.lower().strip(), -1) for k in keys], dtype=np.intp)
+            cols = key_cols[inverse.reshape(-1)]
+            hit = cols >= 0
+            X[rows[hit], cols[hit]] = self._on_value[cols[hit]]
+        return X
+
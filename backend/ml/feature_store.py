@@ -0,0 +1,366 @@
+# backend/ml/feature_store.py
+"""
+On-disk snapshot of ml_training_data for training.
+
+A snapshot is a directory of one .npy file per column, sorted by tender_id:
+
+  tender_id.npy        int64
+  label_cost.npy       float64
+  <numeric>.npy        float32 (NUMERIC_FEATURES, missing -> 0)
+  <categorical>.npy    int16 codes into manifest["vocab"][name]
+
+plus manifest.json (rows, columns, vocabularies, content hash, the
+ml_training_data.created_at watermark it covers). Files are memory-mapped on load,
+so training never re-parses features_json for rows it has already seen.
+
+update_snapshot() reads only rows upserted since the current snapshot's watermark
+(the DB time its read started, less training.snapshot_margin_seconds; features
+are pulled out of the JSON by MySQL, in tender_id order) through an
+unbuffered server-side cursor, encoding fetch_rows at a time and appending each
+chunk to .npy files on disk. Those are merged with the current snapshot by a
+sorted pass over both, a block of at most fetch_rows rows per side at a time,
+which also drops rows that left ml_training_data. Memory stays at a few blocks
+however large the history is. A new version directory is written when anything
+changed; CURRENT names the live version and is swapped atomically; older
+versions beyond `keep` are removed.
+"""
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pymysql.cursors import SSDictCursor
+
+from backend.database import cfg, get_conn
+from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+STORE_DIR = (cfg.get("paths") or {}).get("feature_store", "data/feature_store")
+WATERMARK_MARGIN_SECONDS = (cfg.get("training") or {}).get("snapshot_margin_seconds", 900)
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_FORMAT = 1
+UNKNOWN = "unknown"
+
+_ROWS_SQL = """
+    SELECT tender_id, label_cost_pkr, created_at, {columns}
+    FROM ml_training_data
+    WHERE label_cost_pkr > 0 AND created_at >= %s
+    ORDER BY tender_id
+""".format(columns=", ".join(
+    f"JSON_UNQUOTE(JSON_EXTRACT(features_json, '$.{name}')) AS {name}"
+    for name in NUMERIC_FEATURES + CATEGORICAL_FEATURES
+))
+_LIVE_SQL = "SELECT tender_id FROM ml_training_data WHERE label_cost_pkr > 0 ORDER BY tender_id"
+_HASH_ROWS = 1 << 16
+
+
+class FeatureSnapshot:
+    def __init__(self, path, manifest, columns):
+        self.path = path
+        self.manifest = manifest
+        self.columns = columns   # name -> array (memory-mapped when loaded from disk)
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def hash(self):
+        return self.manifest["hash"]
+
+    @property
+    def rows(self):
+        return self.manifest["rows"]
+
+    def categorical(self, name):
+        """Decoded string values of a categorical column"""
+        return np.asarray(self.manifest["vocab"][name], dtype=object)[self.columns[name]]
+
+    def records(self, index=slice(None)):
+        """{feature: values} for the rows at index (categoricals decoded), as FeatureVectorizer takes them"""
+        data = {name: np.asarray(self.columns[name][index]) for name in NUMERIC_FEATURES}
+        vocab = self.manifest["vocab"]
+        data.update({
+            name: np.asarray(vocab[name], dtype=object)[np.asarray(self.columns[name][index])]
+            for name in CATEGORICAL_FEATURES
+        })
+        return data
+
+    def release_pages(self):
+        """Drop the snapshot pages read so far from this process's RSS (see _release_pages)"""
+        _release_pages(self.columns.values())
+
+    def frame(self):
+        """Numeric features, decoded categoricals and label_cost as a DataFrame"""
+        data = {name: np.asarray(self.columns[name]) for name in NUMERIC_FEATURES}
+        data.update({name: self.categorical(name) for name in CATEGORICAL_FEATURES})
+        data["label_cost"] = np.asarray(self.columns["label_cost"])
+        return pd.DataFrame(data, index=np.asarray(self.columns["tender_id"]))
+
+
+def _release_pages(arrays):
+    """
+    Drop the pages of memory-mapped arrays this process has read from its resident
+    set; they stay in the OS page cache. Without this every page touched while
+    streaming over a snapshot counts towards RSS until the mapping is closed.
+    """
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    for array in arrays:
+        mapped = getattr(array, "_mmap", None)
+        if mapped is not None and not mapped.closed:
+            mapped.madvise(mmap.MADV_DONTNEED)
+
+def _content_hash(columns, vocab):
+    digest = hashlib.sha256()
+    for name in sorted(columns):
+        array = columns[name]
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        # In slices, so memory-mapped columns are never read in whole
+        for start in range(0, len(array), _HASH_ROWS):
+            digest.update(np.ascontiguousarray(array[start:start + _HASH_ROWS]).tobytes())
+            _release_pages([array])
+    digest.update(json.dumps(vocab, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def load_snapshot(store_dir=STORE_DIR, version=None):
+    """The CURRENT (or given) snapshot, memory-mapped, or None when there is none"""
+    if version is None:
+        try:
+            with open(os.path.join(store_dir, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+    path = os.path.join(store_dir, version)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in manifest["columns"]}
+    return FeatureSnapshot(path, manifest, columns)
+
+def _encode_rows(rows, vocab):
+    """DB rows -> column arrays; extends vocab with unseen categories"""
+    columns = {
+        "tender_id": np.fromiter((r["tender_id"] for r in rows), dtype=np.int64, count=len(rows)),
+        "label_cost": np.fromiter((float(r["label_cost_pkr"]) for r in rows), dtype=np.float64, count=len(rows)),
+    }
+    for name in NUMERIC_FEATURES:
+        values = pd.to_numeric(pd.Series([r[name] for r in rows], dtype=object), errors="coerce")
+        columns[name] = values.fillna(0.0).to_numpy(dtype=np.float32)
+    for name in CATEGORICAL_FEATURES:
+        values = np.array([r[name] if r[name] not in (None, "null") else UNKNOWN for r in rows], dtype=object)
+        labels, inverse = np.unique(values.astype(str), return_inverse=True)
+        known = vocab.setdefault(name, [])
+        for label in labels:
+            if label not in known:
+                known.append(label)
+        lookup = np.array([known.index(label) for label in labels], dtype=np.int16)
+        columns[name] = lookup[inverse] if len(rows) else np.zeros(0, dtype=np.int16)
+    return columns
+
+class _ColumnFiles:
+    """
+    One .npy file per column, appended to a chunk at a time; each header is
+    written for zero rows and rewritten with the final row count on close
+    """
+
+    def __init__(self, path, like):
+        self.rows = 0
+        self._files = {}
+        for name, array in like.items():
+            f = open(os.path.join(path, f"{name}.npy"), "wb")
+            self._files[name] = (f, array.dtype, self._header(f, array.dtype, 0))
+
+    @staticmethod
+    def _header(f, dtype, rows):
+        np.lib.format.write_array_header_1_0(f, {
+            "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)
+        })
+        return f.tell()
+
+    def append(self, columns):
+        for name, (f, dtype, _) in self._files.items():
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self.rows += len(columns[next(iter(self._files))])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for f, dtype, size in self._files.values():
+            if exc_type is None:
+                f.seek(0)
+                # Same padded header size for any row count, so the data does not move
+                if self._header(f, dtype, self.rows) != size:
+                    raise RuntimeError(f"npy header of {f.name} changed size")
+            f.close()
+        return False
+
+def _load_columns(path, names):
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+def _merge(old, fresh, live_ids, path, block_rows):
+    """
+    Sorted merge of the old snapshot's columns with the fresh rows (both sorted by
+    tender_id) into .npy files in path: fresh rows replace old ones with the same
+    tender_id and old rows missing from live_ids are dropped. Works through the
+    key space block_rows rows per side at a time; returns the number dropped.
+    """
+    old_ids, fresh_ids = old["tender_id"], fresh["tender_id"]
+    n_old, n_fresh = len(old_ids), len(fresh_ids)
+    i = j = removed = 0
+    with _ColumnFiles(path, old) as out:
+        while i < n_old or j < n_fresh:
+            # The block ends at the smaller of the two sides' block_rows-th id
+            i_end, j_end = min(i + block_rows, n_old), min(j + block_rows, n_fresh)
+            ends = ([old_ids[i_end - 1]] if i < n_old else []) + ([fresh_ids[j_end - 1]] if j < n_fresh else [])
+            bound = min(ends)
+            i_stop = i + int(np.searchsorted(old_ids[i:i_end], bound, side="right"))
+            j_stop = j + int(np.searchsorted(fresh_ids[j:j_end], bound, side="right"))
+
+            block_old, block_fresh = np.asarray(old_ids[i:i_stop]), np.asarray(fresh_ids[j:j_stop])
+            first = min(block_old[:1].tolist() + block_fresh[:1].tolist())
+            live = live_ids[np.searchsorted(live_ids, first):np.searchsorted(live_ids, bound, side="right")]
+            replaced = np.isin(block_old, block_fresh)
+            keep = np.isin(block_old, live) & ~replaced
+            removed += int(len(block_old) - np.count_nonzero(keep) - np.count_nonzero(replaced))
+
+            block = {name: np.concatenate([np.asarray(old[name][i:i_stop])[keep], np.asarray(fresh[name][j:j_stop])])
+                     for name in old}
+            order = np.argsort(block["tender_id"], kind="stable")
+            out.append({name: array[order] for name, array in block.items()})
+            _release_pages([*old.values(), *fresh.values(), live_ids])
+            i, j = i_stop, j_stop
+    return removed
+
+def _publish(store_dir, path, columns, vocab, watermark, previous, content_hash=None):
+    """Move the column files in path into a new version directory and make it CURRENT"""
+    content_hash = content_hash or _content_hash(columns, vocab)
+    version = f"fs_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{content_hash[:8]}"
+    version_dir = os.path.join(store_dir, version)
+    if os.path.isdir(version_dir):
+        # Same content already written this second (a forced rebuild): its columns are these
+        shutil.rmtree(path)
+    else:
+        os.rename(path, version_dir)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "hash": content_hash,
+        "rows": int(len(columns["tender_id"])),
+        "columns": list(columns),
+        "numeric": list(NUMERIC_FEATURES),
+        "categorical": list(CATEGORICAL_FEATURES),
+        "vocab": vocab,
+        "watermark": watermark.isoformat(sep=" ") if watermark else None,
+        "parent": previous,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    _write_atomic(os.path.join(version_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    _write_atomic(os.path.join(store_dir, CURRENT_FILE), version)
+    return version
+
+def _save(store_dir, columns, vocab, watermark, previous):
+    """Write in-memory columns (sorted by tender_id) as a new CURRENT version"""
+    os.makedirs(store_dir, exist_ok=True)
+    build = tempfile.mkdtemp(prefix=".build_", dir=store_dir)
+    try:
+        with _ColumnFiles(build, columns) as out:
+            out.append(columns)
+        return _publish(store_dir, build, _load_columns(build, list(columns)), vocab, watermark, previous)
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+
+def _prune(store_dir, keep):
+    current = open(os.path.join(store_dir, CURRENT_FILE)).read().strip()
+    versions = sorted(d for d in os.listdir(store_dir) if d.startswith("fs_") and os.path.isdir(os.path.join(store_dir, d)))
+    for version in versions[:-keep]:
+        if version != current:
+            shutil.rmtree(os.path.join(store_dir, version), ignore_errors=True)
+
+def _read_chunks(conn, sql, params=None, size=50000):
+    """Rows of a query in lists of at most size, streamed from a server-side cursor"""
+    cur = conn.cursor(SSDictCursor)
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+def update_snapshot(store_dir=STORE_DIR, full_rebuild=False, keep=3, fetch_rows=50000):
+    """Bring the snapshot up to date with ml_training_data and return it (memory-mapped)"""
+    os.makedirs(store_dir, exist_ok=True)
+    current = None if full_rebuild else load_snapshot(store_dir)
+    if current is not None and (current.manifest.get("format") != SNAPSHOT_FORMAT
+                                or current.manifest.get("numeric") != list(NUMERIC_FEATURES)
+                                or current.manifest.get("categorical") != list(CATEGORICAL_FEATURES)):
+        print("[INFO] Feature list changed since the last snapshot; rebuilding it")
+        current = None
+    since = datetime.fromisoformat(current.manifest["watermark"]) if current and current.manifest["watermark"] else datetime(1970, 1, 2)
+
+    vocab = {name: list(values) for name, values in (current.manifest["vocab"] if current else {}).items()}
+    names = list(_encode_rows([], vocab))
+    build = tempfile.mkdtemp(prefix=".build_", dir=store_dir)
+    try:
+        fresh_dir, merged_dir = os.path.join(build, "fresh"), os.path.join(build, "merged")
+        os.makedirs(fresh_dir)
+        read = 0
+        conn = get_conn()
+        try:
+            # created_at (DB clock) is stamped when a row is written but only visible at
+            # commit: the next read starts a margin before this one rather than at the
+            # newest row seen, so rows committed late are re-read instead of missed
+            with conn.cursor() as cur:
+                cur.execute("SELECT NOW() AS now")
+                read_started = cur.fetchone()["now"]
+            watermark = max(since, read_started - timedelta(seconds=WATERMARK_MARGIN_SECONDS))
+            with _ColumnFiles(fresh_dir, _encode_rows([], vocab)) as fresh_out:
+                for rows in _read_chunks(conn, _ROWS_SQL, (since,), fetch_rows):
+                    fresh_out.append(_encode_rows(rows, vocab))
+                    read += len(rows)
+            if current is not None:
+                with _ColumnFiles(build, {"live_tender_id": np.zeros(0, dtype=np.int64)}) as live_out:
+                    for rows in _read_chunks(conn, _LIVE_SQL, size=fetch_rows):
+                        ids = np.fromiter((r["tender_id"] for r in rows), dtype=np.int64, count=len(rows))
+                        live_out.append({"live_tender_id": ids})
+        finally:
+            conn.close()
+
+        fresh = _load_columns(fresh_dir, names)
+        if current is None:
+            out_dir, removed = fresh_dir, 0
+        else:
+            os.makedirs(merged_dir)
+            live_ids = np.load(os.path.join(build, "live_tender_id.npy"), mmap_mode="r")
+            removed = _merge(current.columns, fresh, live_ids, merged_dir, fetch_rows)
+            out_dir = merged_dir
+        columns = _load_columns(out_dir, names)
+        content_hash = _content_hash(columns, vocab)
+
+        if current is not None and content_hash == current.hash:
+            print(f"[INFO] Feature snapshot {current.version} is up to date ({current.rows} rows)")
+            return current
+
+        version = _publish(store_dir, out_dir, columns, vocab, watermark,
+                           current.version if current else None, content_hash)
+        rows = len(columns["tender_id"])
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+    _prune(store_dir, keep)
+    print(f"[INFO] Feature snapshot {version}: {rows} rows ({read} read from MySQL, {removed} removed)")
+    return load_snapshot(store_dir, version)
@@ -0,0 +1,242 @@
+# backend/ml/incremental.py
+"""
+Incremental cost model updates.
+
+Instead of rebuilding every tree over the whole history, update_model() continues
+boosting the registry's current model with training.incremental.extra_trees new
+rounds fitted only on tenders that are new (or relabelled) since the feature
+snapshot that model was trained on. The update reuses the base model's feature
+schema and scaler, so serving is unchanged.
+
+A guard falls back to a full train_model.train_save when an update would not be
+trustworthy:
+  - rows were removed (boosting cannot forget them) or the base snapshot is gone
+  - too many new rows (absolute or as a share of the base data)
+  - too many incremental updates in a row since the last full retrain
+  - new categorical values the base model has no column / code for
+  - drift: population stability index of a numeric feature above max_psi, or the
+    base model's RMSE on the new rows above max_error_ratio x its holdout RMSE
+  - the updated model scores worse than the base on the holdout set
+
+Both paths score on the same tender_id-hashed holdout (train_model.holdout_mask).
+With --compare a full retrain is also run (published, not activated) and the two
+runs' time and holdout metrics are recorded side by side in the update's metadata.
+
+    python -m backend.ml.incremental [--compare] [--no-refresh] [--no-activate]
+"""
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backend.database import cfg
+from backend.ml import train_model
+from backend.ml.feature_store import load_snapshot
+from backend.ml.model_registry import current_version, read_metadata, version_path
+from backend.ml.model_server import LoadedModel, load_artifacts, joblib_load, MODEL_FILE
+from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+
+def diff_snapshots(base, current):
+    """(mask over current rows that are new or changed since base, number of base rows removed)"""
+    base_ids = np.asarray(base.columns["tender_id"])
+    ids = np.asarray(current.columns["tender_id"])
+    removed = int(np.count_nonzero(~np.isin(base_ids, ids)))
+    if not len(base_ids):
+        return np.ones(len(ids), dtype=bool), removed
+
+    # Both snapshots are sorted by tender_id
+    pos = np.minimum(np.searchsorted(base_ids, ids), len(base_ids) - 1)
+    existing = base_ids[pos] == ids
+    at = pos[existing]
+    changed = np.zeros(np.count_nonzero(existing), dtype=bool)
+    for name in NUMERIC_FEATURES + ("label_cost",):
+        changed |= np.asarray(current.columns[name])[existing] != np.asarray(base.columns[name])[at]
+    for name in CATEGORICAL_FEATURES:
+        changed |= current.categorical(name)[existing] != base.categorical(name)[at]
+
+    new = ~existing
+    new[np.flatnonzero(existing)[changed]] = True
+    return new, removed
+
+def psi(expected, actual, bins=10):
+    """Population stability index of actual against expected (quantile bins of expected)"""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    edges = np.unique(np.quantile(expected, np.linspace(0, 1, bins + 1)))
+    if len(edges) < 3 or not len(actual):
+        return 0.0
+    e = np.histogram(np.clip(expected, edges[0], edges[-1]), edges)[0] / len(expected)
+    a = np.histogram(np.clip(actual, edges[0], edges[-1]), edges)[0] / len(actual)
+    e, a = np.clip(e, 1e-4, None), np.clip(a, 1e-4, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+def _rmse(predictions, labels):
+    return float(np.sqrt(np.mean((np.asarray(predictions) - labels) ** 2))) if len(labels) else None
+
+def _full_retrain(reasons, guard, activate):
+    print(f"\n[Update] Full retrain instead: {'; '.join(reasons)}")
+    return train_model.train_save(refresh=False, activate=activate,
+                                  update={"reason": "; ".join(reasons), "guard": guard})
+
+def update_model(refresh=True, compare=False, activate=True):
+    """Continue boosting the current model on new rows, or fall back to a full retrain; returns the new version"""
+    started = time.perf_counter()
+    train_cfg = cfg.get("training") or {}
+    inc_cfg = train_cfg.get("incremental") or {}
+
+    snapshot = train_model.load_training_snapshot(refresh)
+    base_version = current_version()
+    if base_version is None:
+        return _full_retrain(["no registered model to update"], {}, activate)
+    meta = read_metadata(base_version)
+    base_snapshot = None
+    if meta.get("feature_snapshot"):
+        try:
+            base_snapshot = load_snapshot(version=meta["feature_snapshot"])
+        except FileNotFoundError:
+            pass
+    if base_snapshot is None:
+        return _full_retrain([f"feature snapshot of {base_version} is no longer on disk"], {}, activate)
+
+    new, removed = diff_snapshots(base_snapshot, snapshot)
+    n_new = int(np.count_nonzero(new))
+    if not n_new and not removed:
+        print(f"[Update] No new training rows since {base_version}; nothing to do")
+        return base_version
+
+    test = train_model.holdout_mask(snapshot.columns["tender_id"], train_cfg.get("test_size", 0.2))
+    update_rows = np.flatnonzero(new & ~test)
+    test_rows = np.flatnonzero(test)
+    labels = np.asarray(snapshot.columns["label_cost"])
+    chain = (meta.get("update") or {}).get("chain", 0) + 1
+    guard = {"base_version": base_version, "new_rows": n_new, "removed_rows": removed,
+             "base_rows": base_snapshot.rows, "chain": chain}
+    print(f"[Update] {n_new} new/changed rows since {base_version} ({base_snapshot.rows} rows), "
+          f"{len(update_rows)} outside the holdout")
+
+    reasons = []
+    if removed:
+        reasons.append(f"{removed} training rows were removed")
+    if n_new > inc_cfg.get("max_new_rows", 5000):
+        reasons.append(f"{n_new} new rows > max_new_rows")
+    if n_new > inc_cfg.get("max_new_fraction", 0.2) * base_snapshot.rows:
+        reasons.append(f"{n_new} new rows > {inc_cfg.get('max_new_fraction', 0.2):.0%} of the base data")
+    if chain > inc_cfg.get("max_chain", 5):
+        reasons.append(f"{chain - 1} incremental updates since the last full retrain")
+    if reasons:
+        return _full_retrain(reasons, guard, activate)
+
+    # Drift checks against the base model and its training data
+    folder = version_path(base_version)
+    booster, scaler, schema, _ = load_artifacts(folder)
+    base = LoadedModel(booster, scaler, schema, base_version, nthread=0)
+    new_index = np.flatnonzero(new)
+    new_records = snapshot.records(new_index)
+
+    unseen = {}
+    for name in CATEGORICAL_FEATURES:
+        known = {str(v).lower().strip() for v in schema["categorical"].get(name, [])}
+        values = {str(v).lower().strip() for v in new_records[name]} - known
+        if values:
+            unseen[name] = sorted(values)
+    guard["unseen_categories"] = unseen
+    if unseen:
+        reasons.append(f"unseen categories {unseen}")
+
+    if n_new >= inc_cfg.get("psi_min_rows", 30):
+        guard["psi"] = {
+            name: round(psi(base_snapshot.columns[name], new_records[name]), 4) for name in NUMERIC_FEATURES
+        }
+        drifted = {k: v for k, v in guard["psi"].items() if v > inc_cfg.get("max_psi", 0.25)}
+        if drifted:
+            reasons.append(f"feature drift (PSI) in {drifted}")
+
+    base_holdout = (meta.get("metrics") or {}).get("holdout_rmse")
+    new_rmse = _rmse(base.predict(new_records), labels[new_index])
+    guard["base_rmse_on_new_rows"] = new_rmse
+    if base_holdout and new_rmse > inc_cfg.get("max_error_ratio", 1.5) * base_holdout:
+        reasons.append(f"base model RMSE on new rows {new_rmse:,.0f} > "
+                       f"{inc_cfg.get('max_error_ratio', 1.5)}x its holdout RMSE {base_holdout:,.0f}")
+    if reasons:
+        return _full_retrain(reasons, guard, activate)
+
+    if not len(update_rows):
+        print("[Update] All new rows fall in the holdout set; model unchanged")
+        return base_version
+
+    comparison = None
+    if compare:
+        # Same snapshot and holdout, so the numbers line up with the update below
+        full_started = time.perf_counter()
+        full_version = train_model.train_save(refresh=False, activate=False,
+                                              update={"reason": f"comparison for the update of {base_version}"})
+        full_meta = read_metadata(full_version)
+        comparison = {
+            "full_version": full_version,
+            "full_seconds": round(time.perf_counter() - full_started, 3),
+            "full_holdout_rmse": full_meta["metrics"]["holdout_rmse"],
+            "full_holdout_mae": full_meta["metrics"]["holdout_mae"],
+        }
+
+    # Continue boosting from the base booster with the base model's parameters
+    update_started = time.perf_counter()
+    model = joblib_load(f"{folder}/{MODEL_FILE}")
+    trees = inc_cfg.get("extra_trees", 50)
+    model.set_params(n_estimators=trees, early_stopping_rounds=None)
+    X_update = base.vectorizer.transform(snapshot.records(update_rows))
+    print(f"\n[Update] Adding {trees} trees on {len(update_rows)} rows...")
+    model.fit(X_update, labels[update_rows], xgb_model=model.get_booster(), verbose=False)
+    model.get_booster().set_attr(best_iteration=None, best_score=None)
+    update_seconds = time.perf_counter() - update_started
+
+    X_test = base.vectorizer.transform(snapshot.records(test_rows))
+    updated_pred = model.predict(X_test)
+    updated_rmse = _rmse(updated_pred, labels[test_rows])
+    base_rmse = _rmse(base.predict(snapshot.records(test_rows)), labels[test_rows])
+    print(f"[Update] Holdout RMSE {base_rmse:,.0f} -> {updated_rmse:,.0f} in {update_seconds:.2f}s")
+    if updated_rmse > base_rmse * (1 + inc_cfg.get("max_regression", 0.05)):
+        guard["updated_holdout_rmse"] = updated_rmse
+        return _full_retrain([f"update raised holdout RMSE from {base_rmse:,.0f} to {updated_rmse:,.0f}"],
+                             guard, activate)
+
+    schema = {k: v for k, v in schema.items() if k != "artifacts"}
+    schema["training"] = {
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "rows": snapshot.rows,
+        "base_version": base_version,
+    }
+    metrics = {
+        "holdout_rmse": updated_rmse,
+        "holdout_mae": float(np.mean(np.abs(updated_pred - labels[test_rows]))),
+        "base_holdout_rmse": base_rmse,
+        "train_rows": int(len(update_rows)),
+        "test_rows": int(len(test_rows)),
+        "update_seconds": round(update_seconds, 3),
+    }
+    if comparison:
+        comparison.update(incremental_seconds=metrics["update_seconds"], incremental_holdout_rmse=updated_rmse)
+        print(f"[Update] vs full retrain: {update_seconds:.2f}s / rmse {updated_rmse:,.0f} against "
+              f"{comparison['full_seconds']:.2f}s / rmse {comparison['full_holdout_rmse']:,.0f}")
+
+    version = train_model.save_version(model, scaler, schema, schema["columns"], {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "training_seconds": round(time.perf_counter() - started, 3),
+        "rows": snapshot.rows,
+        "categorical_encoding": "native" if schema.get("encoding") == "native" else "onehot",
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "metrics": metrics,
+        "update": {"mode": "incremental", "trees_added": trees, "update_rows": int(len(update_rows)), **guard},
+        "comparison": comparison,
+    }, activate=activate)
+    print(f"Success! Model {base_version} updated with {len(update_rows)} new records.")
+    print(f"Feature snapshot: {snapshot.version} (sha256 {snapshot.hash})")
+    print(f"Model version: {version}{' (now serving)' if activate else ''}")
+    return version
+
+if __name__ == "__main__":
+    update_model(refresh="--no-refresh" not in sys.argv, compare="--compare" in sys.argv,
+                 activate="--no-activate" not in sys.argv)
@@ -1,47 +1,38 @@
-import joblib
-import numpy as np
-import yaml
-import os
+# backend/ml/inference.py
+"""
+Scoring helpers. The model, scaler and feature schema are loaded once per worker
+by backend.ml.model_server; features use the same keys as
+ml_training_data.features_json. Single and batch calls share one vectorizer.
+"""
+from backend.ml.model_server import get_model_server, NUMERIC_FEATURES, CATEGORICAL_FEATURES
 
-cfg = yaml.safe_load(open("config.yaml"))
+FEATURE_KEYS = NUMERIC_FEATURES + CATEGORICAL_FEATURES
 
-MODEL_PATH = cfg["training"].get("model_path", "models/road_cost_predictor.joblib")
-SCALER_PATH = cfg["training"].get("scaler_path", "models/scaler.joblib")
-
-# must match training feature_cols order
-FEATURE_ORDER = [
-    "road_length_km",
-    "road_width_km",
-    "cement_qty_ton",
-    "bitumen_qty_ton",
-    "steel_qty_ton",
-    "cement_price",
-    "bitumen_price",
-    "steel_price",
-    "materials_total",
-]
-
-if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
-    raise FileNotFoundError(f"Model or scaler not found. Expected {MODEL_PATH} and {SCALER_PATH}")
-
-_model = joblib.load(MODEL_PATH)
-_scaler = joblib.load(SCALER_PATH)
-
-def _validate_and_build_vector(features: dict):
-    missing = [f for f in FEATURE_ORDER if f not in features]
+def predict_cost(features: dict):
+    """
+    features: dict containing the keys in FEATURE_KEYS (extra keys allowed)
+    returns: numeric prediction
+    """
+    missing = [f for f in FEATURE_KEYS if f not in features]
     if missing:
         raise ValueError(f"Missing required features: {missing}")
-    # enforce ordering and convert to float
-    x = [float(features[f]) if features[f] is not None else 0.0 for f in FEATURE_ORDER]
-    return np.array([x], dtype=float)
 
-def predict_cost(features: dict):
+    server = get_model_server()
+    if not server.ready:
+        raise FileNotFoundError(f"Cost model not available: {server.load_error}")
+
+    predictions, _, _ = server.predict_records({f: [features[f]] for f in FEATURE_KEYS})
+    return float(predictions[0])
+
+def predict_costs(records):
     """
-    features: dict containing exactly the keys in FEATURE_ORDER (extra keys allowed)
-    returns: numeric prediction
+    Batch scoring: records is a list of feature dicts or a DataFrame with the
+    FEATURE_KEYS columns; missing values take the schema defaults.
+    returns: float64 array of predictions
     """
-    x = _validate_and_build_vector(features)
-    x_s = _scaler.transform(x)
-    pred = _model.predict(x_s)
-    return float(pred[0])
-    
\ No newline at end of file
+    server = get_model_server()
+    if not server.ready:
+        raise FileNotFoundError(f"Cost model not available: {server.load_error}")
+
+    predictions, _, _ = server.predict_records(records)
+    return predictions
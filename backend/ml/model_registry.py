@@ -0,0 +1,133 @@
+# backend/ml/model_registry.py
+"""
+Versioned cost model artifacts.
+
+Every training run publishes a new directory under paths.model_registry:
+
+  <registry>/v20260115_093012/   model, native booster, scaler, feature_schema.json
+                                 and metadata.json (data hash, metrics, timings)
+  <registry>/CURRENT             name of the version being served
+  <registry>/history.jsonl       one line per CURRENT change (activate / rollback)
+
+Artifacts are written into a hidden staging directory and published with a
+single rename, and a published directory is never modified, so a reader can
+never see a half-written model. CURRENT is replaced atomically (write + rename);
+API workers compare it on access and hot-swap the in-memory model when it moves
+(see model_server.ModelServer). Rolling back is just pointing CURRENT at an
+older version.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+from backend.database import cfg
+
+REGISTRY_DIR = (cfg.get("paths") or {}).get("model_registry", "models/registry")
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+HISTORY_FILE = "history.jsonl"
+STAGING_PREFIX = ".staging-"
+
+
+class RegistryError(Exception):
+    pass
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def version_path(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+def current_version(registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def pointer_stamp(registry_dir=REGISTRY_DIR):
+    """Cheap change marker for CURRENT (one stat call), or None when there is no registry"""
+    try:
+        st = os.stat(os.path.join(registry_dir, CURRENT_FILE))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def stage(registry_dir=REGISTRY_DIR):
+    """New version name and an empty staging directory to write its artifacts into"""
+    os.makedirs(registry_dir, exist_ok=True)
+    version = datetime.now().strftime("v%Y%m%d_%H%M%S")
+    suffix = 1
+    while os.path.exists(version_path(version, registry_dir)):
+        suffix += 1
+        version = f"{datetime.now().strftime('v%Y%m%d_%H%M%S')}_{suffix}"
+    staging = os.path.join(registry_dir, STAGING_PREFIX + version)
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return version, staging
+
+def publish(version, staging, metadata, activate=True, registry_dir=REGISTRY_DIR):
+    """Write metadata, move the staging directory into place and optionally serve it"""
+    metadata = {**metadata, "version": version, "published_at": datetime.now().isoformat(timespec="seconds")}
+    _write_atomic(os.path.join(staging, METADATA_FILE), json.dumps(metadata, indent=2, default=str))
+    os.rename(staging, version_path(version, registry_dir))
+    if activate:
+        set_current(version, reason="trained", registry_dir=registry_dir)
+    return version
+
+def read_metadata(version, registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(version_path(version, registry_dir), METADATA_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"Model version {version} not found")
+
+def set_current(version, reason="activate", registry_dir=REGISTRY_DIR):
+    read_metadata(version, registry_dir)  # raises for unknown / unpublished versions
+    previous = current_version(registry_dir)
+    _write_atomic(os.path.join(registry_dir, CURRENT_FILE), version)
+    with open(os.path.join(registry_dir, HISTORY_FILE), "a") as f:
+        f.write(json.dumps({
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "version": version,
+            "previous": previous,
+            "reason": reason,
+        }) + "\n")
+    return previous
+
+def history(registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry_dir, HISTORY_FILE)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def previous_version(registry_dir=REGISTRY_DIR):
+    """The version that was serving before the current one, or None"""
+    current = current_version(registry_dir)
+    for entry in reversed(history(registry_dir)):
+        if entry["version"] == current and entry.get("previous") and entry["previous"] != current:
+            return entry["previous"]
+    return None
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Published versions, newest first, with their metadata"""
+    if not os.path.isdir(registry_dir):
+        return []
+    current = current_version(registry_dir)
+    versions = []
+    for name in os.listdir(registry_dir):
+        path = version_path(name, registry_dir)
+        if name.startswith(".") or not os.path.isfile(os.path.join(path, METADATA_FILE)):
+            continue
+        metadata = read_metadata(name, registry_dir)
+        metadata["current"] = name == current
+        versions.append(metadata)
+    return sorted(versions, key=lambda m: m["version"], reverse=True)
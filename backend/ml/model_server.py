@@ -0,0 +1,276 @@
+# backend/ml/model_server.py
+"""
+Resident cost model for the prediction endpoints.
+
+Loads the model registry's CURRENT version (model, scaler and the feature
+schema written by train_model.train_save) once per worker process, and scores
+projects in batches: the schema's FeatureVectorizer (with the scaler fused in)
+turns the feature columns into one float32 (projects x features) array for a
+single model.predict call. When CURRENT moves (a new training run, an admin
+activation or rollback) the worker notices on its next prediction and swaps the
+model in the background. Installs without a registry load the flat models
+folder; models trained before schemas were saved fall back to
+feature_columns.joblib.
+
+Serving features mirror prepare_ml_training_data: road dimensions, one-hot
+categoricals, and cement / bitumen / steel / aggregate quantity aggregates, here
+taken from the estimated BOQ instead of a tender BOQ.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backend.database import cfg
+from backend.ml.feature_schema import FeatureVectorizer, load_schema, schema_from_columns
+from backend.ml.model_registry import REGISTRY_DIR, current_version, pointer_stamp, version_path
+from backend.ml.prepare_ml_training_data import (
+    BOQ_QTY_FEATURES, NUMERIC_FEATURES, CATEGORICAL_FEATURES, boq_feature_for
+)
+from backend.utils.quantity_estimator import MATERIAL_NAMES
+
+MODEL_FILE = "road_cost_model.joblib"
+SCALER_FILE = "scaler.joblib"
+FEATURE_COLUMNS_FILE = "feature_columns.joblib"
+
+# materials x quantity aggregates, so aggregates for N projects are one matmul
+_BOQ_GROUPS = np.zeros((len(MATERIAL_NAMES), len(BOQ_QTY_FEATURES)))
+for _j, _name in enumerate(MATERIAL_NAMES):
+    _feature = boq_feature_for(_name)
+    if _feature:
+        _BOQ_GROUPS[_j, BOQ_QTY_FEATURES.index(_feature)] = 1.0
+
+
+def _iteration_range(booster):
+    # XGBRegressor.predict stops at best_iteration when early stopping recorded one
+    best = booster.attr("best_iteration")
+    return (0, int(best) + 1) if best is not None else (0, 0)
+
+
+def joblib_load(path):
+    import joblib  # deferred (with xgboost/sklearn, pulled in by unpickling) until a model is loaded
+    return joblib.load(path)
+
+
+class LoadedModel:
+    """One set of artifacts; replaced as a whole on reload so callers never mix versions"""
+
+    def __init__(self, booster, scaler, schema, version, nthread=1):
+        self.booster = booster
+        self.schema = schema
+        self.feature_columns = schema["columns"]
+        self.version = version
+        self.scaled = scaler is not None
+        self.iteration_range = _iteration_range(booster)
+        booster.set_param({"nthread": nthread})
+        if schema.get("encoding") == "native":
+            # Category-code columns; older xgboost builds don't keep feature types in the model file
+            booster.feature_types = ["c" if name in schema["categorical"] else "q" for name in self.feature_columns]
+        shift = scaler.mean_ if scaler is not None and getattr(scaler, "with_mean", True) else None
+        scale = scaler.scale_ if scaler is not None and getattr(scaler, "with_std", True) else None
+        self.vectorizer = FeatureVectorizer(schema, shift, scale)
+
+    def predict(self, records):
+        """records: {feature: values}, list of dicts or DataFrame -> float64 predictions"""
+        # In-place prediction on the contiguous float32 matrix: no DMatrix, no sklearn wrapper
+        X = self.vectorizer.transform(records)
+        return np.asarray(self.booster.inplace_predict(X, iteration_range=self.iteration_range), dtype=np.float64)
+
+
+def project_columns(projects, quantities):
+    """Feature columns for ProjectInput objects and their (projects x materials) quantities"""
+    aggregates = np.asarray(quantities, dtype=np.float64) @ _BOQ_GROUPS
+    columns = {name: aggregates[:, k] for k, name in enumerate(BOQ_QTY_FEATURES)}
+    for name in ("road_length_km", "road_width_m") + CATEGORICAL_FEATURES:
+        columns[name] = [getattr(p, name) for p in projects]
+    return columns
+
+
+def load_artifacts(folder):
+    """Artifacts of one model folder -> (booster, scaler, schema, model_file)"""
+    path = lambda name: os.path.join(folder, name)
+    schema = load_schema(folder)
+    artifacts = (schema or {}).get("artifacts")
+    if artifacts and artifacts.get("booster") and os.path.exists(path(artifacts["booster"])):
+        import xgboost as xgb  # deferred until the model is needed
+        model_file = artifacts["booster"]
+        booster = xgb.Booster()
+        booster.load_model(path(model_file))
+    else:
+        model_file = MODEL_FILE
+        booster = joblib_load(path(MODEL_FILE)).get_booster()
+
+    if artifacts is not None:
+        scaler = joblib_load(path(artifacts["scaler"])) if artifacts.get("scaler") else None
+    else:
+        # Models trained before artifact names were recorded always had a scaler
+        scaler = joblib_load(path(SCALER_FILE))
+
+    if schema is None:
+        feature_columns = list(joblib_load(path(FEATURE_COLUMNS_FILE)))
+        schema = schema_from_columns(feature_columns, NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    return booster, scaler, schema, path(model_file)
+
+
+class ModelServer:
+    def __init__(self, models_folder, nthread=1, registry_dir=REGISTRY_DIR, poll_interval=5.0):
+        self.models_folder = models_folder
+        self.registry_dir = registry_dir
+        self.poll_interval = poll_interval
+        self.nthread = nthread
+        self.current = None
+        self.source = None
+        self.folder = None
+        self.load_error = None
+        self.load_time_s = None
+        self.swaps = 0
+        self._stamp = None
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._stats = {"calls": 0, "rows": 0, "latency_total_ms": 0.0, "latency_max_ms": 0.0, "last_latency_ms": None}
+
+    @property
+    def ready(self):
+        return self.current is not None
+
+    @property
+    def version(self):
+        current = self.current
+        return current.version if current else None
+
+    def load(self):
+        """
+        (Re)load the registry's CURRENT version, or the flat models folder when
+        there is no registry yet; on failure the previous model stays in service
+        """
+        started = time.perf_counter()
+        try:
+            stamp = pointer_stamp(self.registry_dir)
+            version = current_version(self.registry_dir) if stamp else None
+            if version:
+                folder, source = version_path(version, self.registry_dir), "registry"
+            else:
+                folder, source = self.models_folder, "legacy"
+            booster, scaler, schema, model_file = load_artifacts(folder)
+            if source == "legacy":
+                version = datetime.fromtimestamp(os.path.getmtime(model_file)).strftime("v%Y%m%d_%H%M%S")
+            loaded = LoadedModel(booster, scaler, schema, version, self.nthread)
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"[WARN] Cost model not loaded: {e}")
+            return False
+
+        if self.current is not None and self.current.version != version:
+            self.swaps += 1
+        self.current = loaded
+        self.source = source
+        self.folder = folder
+        self._stamp = stamp
+        self.load_error = None
+        self.load_time_s = time.perf_counter() - started
+        print(f"[INFO] Cost model {version} loaded from {model_file} "
+              f"({len(schema['columns'])} features, scaler={'yes' if loaded.scaled else 'no'}, {self.load_time_s:.2f}s)")
+        return True
+
+    def _reload(self):
+        try:
+            self.load()
+        finally:
+            self._reload_lock.release()
+
+    def check_for_update(self):
+        """
+        At most every poll_interval seconds, stat the registry's CURRENT pointer; when
+        it moved, load that version on a background thread. Requests keep using the
+        model they already have until the new one replaces it in one assignment.
+        While no model is loaded (none published yet, or the last load failed) every
+        poll retries the load, so a version published later is still picked up.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_interval:
+            return False
+        self._checked_at = now
+        if self.current is not None and pointer_stamp(self.registry_dir) == self._stamp:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._reload, name="model-reload", daemon=True).start()
+        return True
+
+    def _record(self, rows, latency_ms):
+        self._stats["calls"] += 1
+        self._stats["rows"] += rows
+        self._stats["latency_total_ms"] += latency_ms
+        self._stats["latency_max_ms"] = max(self._stats["latency_max_ms"], latency_ms)
+        self._stats["last_latency_ms"] = latency_ms
+
+    def predict_records(self, records):
+        """Score a batch given as {feature: values}, a list of dicts or a DataFrame; returns (predictions, latency_ms, LoadedModel)"""
+        self.check_for_update()
+        current = self.current
+        started = time.perf_counter()
+        predictions = current.predict(records)
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._record(len(predictions), latency_ms)
+        return predictions, latency_ms, current
+
+    def predict_projects(self, projects, quantities):
+        """
+        ML estimates for a batch of projects. Returns one dict per project with
+        estimate_pkr, model_version, inference_ms (for the whole batch call) and
+        the raw feature values used (features_json format).
+        """
+        columns = project_columns(projects, quantities)
+        predictions, latency_ms, current = self.predict_records(columns)
+        rows = {name: (values.tolist() if isinstance(values, np.ndarray) else values) for name, values in columns.items()}
+        return [
+            {
+                "estimate_pkr": float(predictions[i]),
+                "model_version": current.version,
+                "inference_ms": latency_ms,
+                "features": {name: values[i] for name, values in rows.items()},
+            }
+            for i in range(len(projects))
+        ]
+
+    def stats(self):
+        calls = self._stats["calls"]
+        current = self.current
+        return {
+            **self._stats,
+            "latency_avg_ms": self._stats["latency_total_ms"] / calls if calls else 0.0,
+            "ready": current is not None,
+            "model_version": current.version if current else None,
+            "features": len(current.feature_columns) if current else 0,
+            "scaled": current.scaled if current else None,
+            "nthread": self.nthread,
+            "source": self.source,
+            "swaps": self.swaps,
+            "load_time_s": self.load_time_s,
+            "load_error": self.load_error,
+        }
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_model_server():
+    """The worker's model server, loading the artifacts on first use"""
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                serving = cfg.get("serving") or {}
+                server = ModelServer(
+                    (cfg.get("paths") or {}).get("models_folder", "models"),
+                    nthread=serving.get("nthread", 1),
+                    poll_interval=serving.get("registry_poll_seconds", 5)
+                )
+                server.load()
+                _server = server
+    return _server
+
+def get_model_stats():
+    return _server.stats() if _server is not None else {"ready": False, "model_version": None}
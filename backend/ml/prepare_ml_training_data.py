@@ -1,114 +1,245 @@
-from backend.database import get_conn
+from backend.database import cfg, get_conn
+from datetime import datetime
+import argparse
 import json
+import time
 
-def prepare_ml_training_data():
+import pymysql
+
+# BOQ quantity aggregates used as model features (also built at serving time)
+BOQ_QTY_FEATURES = ("cement_qty", "bitumen_qty", "steel_qty", "aggregate_qty")
+NUMERIC_FEATURES = ("road_length_km", "road_width_m") + BOQ_QTY_FEATURES
+CATEGORICAL_FEATURES = ("location_type", "project_type", "traffic_volume", "soil_type")
+
+# Material name keywords per aggregate, checked in this order (first match wins)
+BOQ_FEATURE_KEYWORDS = (
+    ("cement_qty", ("cement",)),
+    ("bitumen_qty", ("bitumen",)),
+    ("steel_qty", ("steel",)),
+    ("aggregate_qty", ("stone", "crush", "bajri")),
+)
+
+WATERMARK_JOB = "ml_training_data"
+# Earliest TIMESTAMP value valid in every time zone
+EPOCH = datetime(1970, 1, 2)
+
+def boq_feature_for(material_name):
+    """Which quantity aggregate a BOQ material counts towards, or None"""
+    mat_name = material_name.lower()
+    for feature, keywords in BOQ_FEATURE_KEYWORDS:
+        if any(x in mat_name for x in keywords):
+            return feature
+    return None
+
+def _feature_case_sql():
+    """boq_feature_for as a SQL CASE over JSON_TABLE column b.material"""
+    whens = " ".join(
+        "WHEN " + " OR ".join(f"LOWER(b.material) LIKE '%%{k}%%'" for k in keywords) + f" THEN '{feature}'"
+        for feature, keywords in BOQ_FEATURE_KEYWORDS
+    )
+    return f"CASE {whens} END"
+
+# One page of tenders changed after a (updated_at, tender_id) key
+_PAGE_SQL = """
+    SELECT tender_id, location_type, road_length_km, road_width_m, project_type,
+           traffic_volume, soil_type, actual_cost_pkr, used_for_training, updated_at, boq_json
+    FROM tenders
+    WHERE updated_at > %s OR (updated_at = %s AND tender_id > %s)
+    ORDER BY updated_at, tender_id
+    LIMIT %s
+"""
+
+# The same page with BOQ quantities summed per tender by MySQL (8.0.14+)
+_AGGREGATED_PAGE_SQL = """
+    SELECT t.*, {sums}
+    FROM ({page}) t
+    LEFT JOIN LATERAL (
+        SELECT {inner_sums}
+        FROM JSON_TABLE(t.boq_json, '$[*]' COLUMNS (
+            material VARCHAR(255) PATH '$.material',
+            quantity DOUBLE PATH '$.quantity' NULL ON ERROR
+        )) b
+    ) q ON TRUE
+    ORDER BY t.updated_at, t.tender_id
+""".format(
+    sums=", ".join(f"COALESCE(q.{f}, 0) AS {f}" for f in BOQ_QTY_FEATURES),
+    page=_PAGE_SQL,
+    inner_sums=", ".join(
+        f"SUM(CASE WHEN ({_feature_case_sql()}) = '{f}' THEN b.quantity ELSE 0 END) AS {f}"
+        for f in BOQ_QTY_FEATURES
+    ),
+)
+
+_UPSERT_SQL = """
+    INSERT INTO ml_training_data (tender_id, features_json, label_cost_pkr, data_quality)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        features_json=VALUES(features_json),
+        label_cost_pkr=VALUES(label_cost_pkr),
+        data_quality=VALUES(data_quality),
+        created_at=NOW()
+"""
+# created_at is the feature snapshot's change cursor, so it comes from the DB clock
+# (column default on insert, NOW() on update) like the admin insert's; NOW() stays
+# out of VALUES so executemany still sends one multi-row INSERT
+
+def _aggregate_in_python(tenders):
+    """Fallback when the server has no JSON_TABLE / LATERAL: sum BOQ quantities here"""
+    for tender in tenders:
+        for feature in BOQ_QTY_FEATURES:
+            tender[feature] = 0.0
+        if not tender['boq_json']:
+            continue
+        try:
+            boq_items = json.loads(tender['boq_json']) if isinstance(tender['boq_json'], str) else tender['boq_json']
+            for item in boq_items:
+                feature = boq_feature_for(item['material'])
+                if feature:
+                    tender[feature] += float(item['quantity'])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            print(f"    [WARN] Could not parse BOQ JSON for Tender {tender['tender_id']}")
+
+def _features(tender):
+    return {
+        "road_length_km": float(tender['road_length_km'] or 0.0),
+        "road_width_m": float(tender['road_width_m'] or 0.0),
+        # Categorical features (to be encoded during model training)
+        "location_type": tender['location_type'],
+        "project_type": tender['project_type'],
+        "traffic_volume": tender['traffic_volume'],
+        "soil_type": tender['soil_type'],
+        # Material aggregates from BOQ
+        **{f: float(tender[f] or 0.0) for f in BOQ_QTY_FEATURES}
+    }
+
+def _read_watermark(cur):
+    cur.execute("SELECT watermark_at FROM etl_watermarks WHERE job_name = %s", (WATERMARK_JOB,))
+    row = cur.fetchone()
+    return row['watermark_at'] if row and row['watermark_at'] else None
+
+def prepare_ml_training_data(full_rebuild=False, batch_size=None):
     """
     Build training dataset from structured tenders table.
     Maps database columns directly to ML features for XGBoost.
+
+    Only tenders created or updated since the last run are processed, unless
+    full_rebuild is set; tenders that stopped qualifying for training are removed.
     """
+    batch_size = batch_size or (cfg.get("etl") or {}).get("batch_size", 1000)
     conn = get_conn()
     cur = conn.cursor()
-    
+
     print("="*60)
     print("PREPARING ML TRAINING DATA (STRUCTURED VERSION)")
     print("="*60)
-    
-    # [1/3] Retrieve structured data directly from the new tenders table
-    print("\n[1/3] Fetching structured tender features...")
-    cur.execute("""
-        SELECT 
-            tender_id, 
-            location_type, 
-            road_length_km, 
-            road_width_m, 
-            project_type, 
-            traffic_volume, 
-            soil_type, 
-            actual_cost_pkr, 
-            boq_json 
-        FROM tenders 
-        WHERE actual_cost_pkr > 0 
-        AND used_for_training = TRUE
-    """)
-    
-    tenders = cur.fetchall()
-    print(f"[INFO] Found {len(tenders)} tenders available for training.")
-    
-    if not tenders:
-        print("\n[ERROR] No valid training data found in tenders table!")
+
+    watermark = None if full_rebuild else _read_watermark(cur)
+    if watermark is None:
+        print("\n[1/3] Full rebuild: reading every tender...")
+        key = (EPOCH, 0)
+    else:
+        # Re-read the watermark's own second: rows updated in it after the last
+        # run would otherwise be skipped (TIMESTAMP has 1 s resolution)
+        print(f"\n[1/3] Incremental: reading tenders changed since {watermark}...")
+        key = (watermark, 0)
+
+    print(f"\n[2/3] Processing features for XGBoost in batches of {batch_size}...")
+    in_sql = True
+    processed = upserted = removed = 0
+    started = time.perf_counter()
+    next_report = 10000
+
+    try:
+        while True:
+            params = (key[0], key[0], key[1], batch_size)
+            if in_sql:
+                try:
+                    cur.execute(_AGGREGATED_PAGE_SQL, params)
+                except pymysql.err.ProgrammingError as e:
+                    print(f"[WARN] SQL BOQ aggregation unavailable ({e}); summing in Python")
+                    in_sql = False
+                    continue
+            else:
+                cur.execute(_PAGE_SQL, params)
+            tenders = cur.fetchall()
+            if not tenders:
+                break
+            if not in_sql:
+                _aggregate_in_python(tenders)
+
+            rows, stale = [], []
+            for tender in tenders:
+                if tender['used_for_training'] and (tender['actual_cost_pkr'] or 0) > 0:
+                    rows.append((
+                        tender['tender_id'],
+                        json.dumps(_features(tender)),
+                        tender['actual_cost_pkr'],
+                        'High',  # Structured data is considered High quality
+                    ))
+                else:
+                    stale.append(tender['tender_id'])
+
+            if rows:
+                cur.executemany(_UPSERT_SQL, rows)
+            if stale:
+                placeholders = ", ".join(["%s"] * len(stale))
+                cur.execute(f"DELETE FROM ml_training_data WHERE tender_id IN ({placeholders})", stale)
+                removed += cur.rowcount
+
+            last = tenders[-1]
+            key = (last['updated_at'], last['tender_id'])
+            processed += len(tenders)
+            upserted += len(rows)
+
+            # Watermark moves in the same transaction as the rows it covers
+            cur.execute("""
+                INSERT INTO etl_watermarks (job_name, watermark_at, last_tender_id, rows_processed)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE watermark_at=VALUES(watermark_at),
+                    last_tender_id=VALUES(last_tender_id), rows_processed=VALUES(rows_processed)
+            """, (WATERMARK_JOB, key[0], key[1], processed))
+            conn.commit()
+
+            if processed >= next_report:
+                elapsed = time.perf_counter() - started
+                print(f"    Processed {processed} tenders ({elapsed / processed * 10000:.2f}s per 10k)")
+                next_report += 10000
+
+            if len(tenders) < batch_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         cur.close()
         conn.close()
-        return
 
-    print("\n[2/3] Processing features for XGBoost...")
-    processed = 0
-    
-    for tender in tenders:
-        tid = tender['tender_id']
-        
-        # Initialize features with direct numerical values
-        features = {
-            "road_length_km": float(tender['road_length_km']),
-            "road_width_m": float(tender['road_width_m']),
-            # Categorical features (to be encoded during model training)
-            "location_type": tender['location_type'],
-            "project_type": tender['project_type'],
-            "traffic_volume": tender['traffic_volume'],
-            "soil_type": tender['soil_type'],
-            # Material aggregates from BOQ
-            "cement_qty": 0.0,
-            "bitumen_qty": 0.0,
-            "steel_qty": 0.0,
-            "aggregate_qty": 0.0
-        }
-
-        # Parse the BOQ JSON to get precise material quantities
-        if tender['boq_json']:
-            try:
-                boq_items = json.loads(tender['boq_json'])
-                for item in boq_items:
-                    mat_name = item['material'].lower()
-                    qty = float(item['quantity'])
-                    
-                    if 'cement' in mat_name:
-                        features["cement_qty"] += qty
-                    elif 'bitumen' in mat_name:
-                        features["bitumen_qty"] += qty
-                    elif 'steel' in mat_name:
-                        features["steel_qty"] += qty
-                    elif any(x in mat_name for x in ['stone', 'crush', 'bajri']):
-                        features["aggregate_qty"] += qty
-            except (json.JSONDecodeError, KeyError, TypeError):
-                print(f"    [WARN] Could not parse BOQ JSON for Tender {tid}")
-
-        # Insert into ml_training_data using the new schema columns
-        # Note: label_cost_pkr matches your schema.sql
-        cur.execute("""
-            INSERT INTO ml_training_data (tender_id, features_json, label_cost_pkr, data_quality, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-            ON DUPLICATE KEY UPDATE 
-                features_json=VALUES(features_json), 
-                label_cost_pkr=VALUES(label_cost_pkr),
-                data_quality=VALUES(data_quality),
-                created_at=NOW()
-        """, (
-            tid, 
-            json.dumps(features), 
-            tender['actual_cost_pkr'],
-            'High'  # Structured data is considered High quality
-        ))
-        
-        processed += 1
-        if processed % 50 == 0:
-            print(f"    Processed {processed} records...")
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    print("\n" + "="*60)
-    print(f"✅ Prepared {processed} training records in ml_training_data")
+    elapsed = time.perf_counter() - started
+    result = {
+        "mode": "full" if watermark is None else "incremental",
+        "tenders_processed": processed,
+        "rows_upserted": upserted,
+        "rows_removed": removed,
+        "aggregation": "sql" if in_sql else "python",
+        "elapsed_s": round(elapsed, 3),
+        "seconds_per_10k": round(elapsed / processed * 10000, 3) if processed else None,
+        "watermark": str(key[0]) if processed else (str(watermark) if watermark else None),
+    }
+
+    print("\n[3/3] Done")
+    print("="*60)
+    if processed:
+        print(f"✅ Prepared {upserted} training records in ml_training_data "
+              f"({processed} tenders read, {removed} removed) in {elapsed:.2f}s "
+              f"= {result['seconds_per_10k']:.2f}s per 10k tenders")
+    else:
+        print("[INFO] No tenders changed since the last run")
     print("="*60)
+    return result
 
 if __name__ == "__main__":
-    prepare_ml_training_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build ml_training_data from tenders")
+    parser.add_argument("--full-rebuild", action="store_true", help="ignore the watermark and reprocess every tender")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    prepare_ml_training_data(full_rebuild=args.full_rebuild, batch_size=args.batch_size)
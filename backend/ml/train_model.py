@@ -1,125 +1,320 @@
 # backend/ml/train_model.py
+import numpy as np
 import pandas as pd
 import xgboost as xgb
-import yaml
-import pymysql
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import joblib
-import json
 import os
 import sys
+import time
+from datetime import datetime
+
+from backend.database import cfg
+from backend.ml.feature_store import update_snapshot, load_snapshot
+from backend.ml.tuning import tune as tune_params, save_best_params, load_best_params
+from backend.ml.model_registry import stage as stage_version, publish as publish_version
+from backend.ml.feature_schema import schema_from_columns, native_schema, save_schema
+from backend.ml.prepare_ml_training_data import NUMERIC_FEATURES, CATEGORICAL_FEATURES
 
 print("="*60)
 print("STARTING MODEL TRAINING")
 print("="*60)
 
-cfg = yaml.safe_load(open("config.yaml"))
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def load_training_snapshot(refresh=True):
+    if refresh:
+        print("\n[1/2] Updating feature snapshot from ml_training_data...")
+        snapshot = update_snapshot()
+    else:
+        print("\n[1/2] Using the current feature snapshot (no database refresh)...")
+        snapshot = load_snapshot()
+
+    if snapshot is None or not snapshot.rows:
+        raise RuntimeError("No training data found in ml_training_data!")
+    print(f"\n[2/2] Loading feature snapshot {snapshot.version} ({snapshot.rows} rows)...")
+    return snapshot
+
+def onehot_table(snapshot):
+    """Dense one-hot DataFrame: numeric features + one column per categorical value"""
+    # 1. Memory-mapped columns -> DataFrame (no per-row JSON decoding)
+    df = snapshot.frame()
+
+    # 2. Handle Categorical Features (One-Hot Encoding)
+    # These must match the features prepared in prepare_ml_training_data.py
+    categorical_cols = list(CATEGORICAL_FEATURES)
+    df = pd.get_dummies(df, columns=categorical_cols)
+
+    # 3. Define Final Feature Set
+    # We include the numeric features + all dummy columns created above
+    numeric_features = list(NUMERIC_FEATURES)
+
+    # Get all column names that start with our categorical prefixes
+    encoded_cols = [c for c in df.columns if any(c.startswith(prefix) for prefix in categorical_cols)]
+
+    feature_cols = numeric_features + encoded_cols
+
+    X = df[feature_cols].astype(float)
+    y = df['label_cost']
+
+    return X, y, feature_cols
+
+def native_table(snapshot):
+    """
+    float32 matrix of the numeric features followed by one column of category
+    codes per categorical feature, filled straight from the snapshot's columns
+    (no DataFrame, no one-hot expansion). Returns X, y, columns, vocabularies.
+    """
+    feature_cols = list(NUMERIC_FEATURES) + list(CATEGORICAL_FEATURES)
+    X = np.empty((snapshot.rows, len(feature_cols)), dtype=np.float32)
+    for j, name in enumerate(feature_cols):
+        X[:, j] = snapshot.columns[name]
+    y = np.asarray(snapshot.columns["label_cost"])
+    vocab = {name: list(snapshot.manifest["vocab"][name]) for name in CATEGORICAL_FEATURES}
+    return X, y, feature_cols, vocab
+
+def holdout_mask(tender_ids, fraction=0.2):
+    """
+    True for held-out tenders. Decided by a hash of tender_id rather than a random
+    split, so a tender stays on the same side as the data grows and models trained
+    on different snapshots (full or incremental) are scored on comparable rows.
+    """
+    ids = np.asarray(tender_ids, dtype=np.uint64)
+    return (ids * np.uint64(2654435761) % np.uint64(2 ** 32)) < np.uint64(fraction * 2 ** 32)
+
+def save_version(model, scaler, schema, feature_cols, metadata, activate=True):
+    """Write the artifacts into a new registry version (published in one rename); returns its name"""
+    train_cfg = cfg.get("training") or {}
+    version, folder = stage_version()
+    joblib.dump(model, os.path.join(folder, "road_cost_model.joblib"))
+    if scaler is not None:
+        joblib.dump(scaler, os.path.join(folder, "scaler.joblib"))
+    # Column order for models loaded without a schema
+    joblib.dump(feature_cols, os.path.join(folder, "feature_columns.joblib"))
+
+    # Native booster for the inference fast path (no pickle / sklearn on load)
+    booster_format = train_cfg.get("booster_format", "ubj")
+    booster_file = None
+    if booster_format:
+        booster_file = f"road_cost_model.{booster_format}"
+        model.get_booster().save_model(os.path.join(folder, booster_file))
+
+    schema = dict(schema)
+    schema["artifacts"] = {
+        "model": "road_cost_model.joblib",
+        "booster": booster_file,
+        "scaler": "scaler.joblib" if scaler is not None else None,
+    }
+    save_schema(schema, folder)
 
-def get_conn():
-    return pymysql.connect(
-        host=cfg["mysql"]["host"],
-        user=cfg["mysql"]["user"],
-        password=cfg["mysql"]["password"],
-        db=cfg["mysql"]["db"],
-        cursorclass=pymysql.cursors.DictCursor,
-        charset="utf8mb4"
+    publish_version(version, folder, {
+        **metadata,
+        "features": len(feature_cols),
+        "peak_rss_mb": peak_rss_mb(),
+        "params": {k: v for k, v in model.get_params().items()
+                   if v is not None and v == v and not callable(v) and k != "feature_types"},
+        "scaled": scaler is not None,
+        "xgboost_version": xgb.__version__,
+    }, activate=activate)
+    return version
+
+def regressor_params(train_cfg, model_params=None):
+    """XGBRegressor arguments (tuned ones when available) and the tuning result used, if any"""
+    model_params = model_params or {}
+    tuned = load_best_params("models") if train_cfg.get("use_tuned_params", True) else None
+    if tuned:
+        print(f"\n[Training] Using tuned parameters from {tuned['created_at']}: {tuned['best_params']}")
+        params = {
+            "n_estimators": tuned["n_estimators"],
+            "objective": 'reg:squarederror',
+            **{"tree_method": "hist", **model_params, **tuned["best_params"]}
+        }
+    else:
+        # XGBoost is excellent at handling the sparse data from One-Hot Encoding
+        params = {
+            "n_estimators": 500,
+            "learning_rate": 0.05,
+            "max_depth": 8,
+            "subsample": 0.8,
+            "colsample_bytree": 0.8,
+            "objective": 'reg:squarederror',
+            **model_params
+        }
+    return params, tuned
+
+def build_feature_table(refresh=True):
+    snapshot = load_training_snapshot(refresh)
+    X, y, feature_cols = onehot_table(snapshot)
+    return X, y, feature_cols, snapshot
+
+def train_out_of_core(snapshot, started, activate=True, update=None):
+    """
+    Train from the snapshot in chunks through XGBoost's external memory (see
+    out_of_core); features take one chunk of memory, XGBoost's own state still
+    grows by a few dozen bytes per row
+    """
+    from backend.ml.out_of_core import fit_external
+
+    train_cfg = cfg.get("training") or {}
+    ooc_cfg = train_cfg.get("out_of_core") or {}
+    encoding = train_cfg.get("categorical_encoding", "onehot")
+    vocab = {name: list(snapshot.manifest["vocab"][name]) for name in CATEGORICAL_FEATURES}
+
+    model_params = {}
+    if encoding == "native":
+        schema = native_schema(NUMERIC_FEATURES, vocab)
+        model_params = {
+            "tree_method": "hist",
+            "enable_categorical": True,
+            "feature_types": ["q"] * len(NUMERIC_FEATURES) + ["c"] * len(CATEGORICAL_FEATURES),
+        }
+    else:
+        # Same column naming as pd.get_dummies, from the snapshot's vocabularies
+        feature_cols = list(NUMERIC_FEATURES) + [f"{name}_{value}" for name in CATEGORICAL_FEATURES for value in vocab[name]]
+        schema = schema_from_columns(feature_cols, NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    params, tuned = regressor_params(train_cfg, model_params)
+    params["tree_method"] = "hist"
+
+    test_size = train_cfg.get("test_size", 0.2)
+    print(f"\n[Training] Out-of-core XGBoost ({encoding}) on {snapshot.rows} rows, {len(schema['columns'])} features...")
+    booster, metrics = fit_external(
+        snapshot, schema, params, lambda ids: holdout_mask(ids, test_size),
+        chunk_rows=ooc_cfg.get("chunk_rows", 100000), cache_dir=ooc_cfg.get("cache_dir")
     )
+    if tuned:
+        metrics.update(cv_rmse=tuned["cv_rmse"], cv_rmse_std=tuned["cv_rmse_std"], cv_mae=tuned["cv_mae"])
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(f"[Training] Holdout RMSE: {metrics['holdout_rmse']:,.0f}; "
+          f"{time.perf_counter() - started:.1f}s, peak RSS {metrics['peak_rss_mb']} MB")
 
-def build_feature_table():
-    print("\n[1/2] Connecting to database...")
-    conn = get_conn()
-    cur = conn.cursor()
-    
-    try:
-        # 1. Load Data with correct schema column: label_cost_pkr
-        print("\n[2/2] Loading structured training data...")
-        cur.execute("""
-            SELECT tender_id, features_json, label_cost_pkr 
-            FROM ml_training_data 
-            WHERE label_cost_pkr > 0
-        """)
-        rows = cur.fetchall()
-        
-        if not rows:
-            raise RuntimeError("No training data found in ml_training_data!")
-
-        # 2. Parse JSON into DataFrame
-        data_list = []
-        for row in rows:
-            record = {'label_cost': float(row['label_cost_pkr'])}
-            features = json.loads(row['features_json']) if isinstance(row['features_json'], str) else row['features_json']
-            record.update(features)
-            data_list.append(record)
-        
-        df = pd.DataFrame(data_list)
-
-        # 3. Handle Categorical Features (One-Hot Encoding)
-        # These must match the features prepared in prepare_ml_training_data.py
-        categorical_cols = ['location_type', 'project_type', 'traffic_volume', 'soil_type']
-        
-        # Ensure columns exist before encoding
-        for col in categorical_cols:
-            if col not in df.columns:
-                df[col] = 'unknown'
-        
-        df = pd.get_dummies(df, columns=categorical_cols)
-
-        # 4. Material Price Integration (Logic remains valid but updated for new keys)
-        # ... [Price lookup code from your original script] ...
-        # (Assuming the lookup_price_by_name logic is kept here)
-        
-        # 5. Define Final Feature Set
-        # We include the numeric features + all dummy columns created above
-        numeric_features = [
-            'road_length_km', 'road_width_m', 'cement_qty', 
-            'bitumen_qty', 'steel_qty', 'aggregate_qty'
-        ]
-        
-        # Get all column names that start with our categorical prefixes
-        encoded_cols = [c for c in df.columns if any(c.startswith(prefix) for prefix in categorical_cols)]
-        
-        feature_cols = numeric_features + encoded_cols
-        
-        X = df[feature_cols].apply(pd.to_numeric, errors='coerce').fillna(0.0).astype(float)
-        y = df['label_cost']
-        
-        # Save feature column order for inference later
-        joblib.dump(feature_cols, "models/feature_columns.joblib")
-        
-        return X, y, feature_cols
-        
-    finally:
-        cur.close()
-        conn.close()
-
-def train_save():
-    X, y, feature_cols = build_feature_table()
+    # Wrap the booster so the registry artifacts match the in-memory path
+    print("\n[Saving] Writing model artifacts...")
+    model = xgb.XGBRegressor(**params)
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    schema["training"] = {
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "rows": snapshot.rows,
+    }
+    version = save_version(model, None, schema, schema["columns"], {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "training_seconds": round(time.perf_counter() - started, 3),
+        "rows": snapshot.rows,
+        "categorical_encoding": encoding,
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "metrics": metrics,
+        "update": {"mode": "full", "out_of_core": True, **(update or {})},
+    }, activate=activate)
+
+    print(f"Success! Model trained out-of-core on {snapshot.rows} records with {len(schema['columns'])} features.")
+    print(f"Feature snapshot: {snapshot.version} (sha256 {snapshot.hash})")
+    print(f"Model version: {version}{' (now serving)' if activate else ''}")
+    return version
+
+def train_save(refresh=True, tune=False, activate=True, update=None, out_of_core=None):
+    started = time.perf_counter()
+    train_cfg = cfg.get("training") or {}
+    encoding = train_cfg.get("categorical_encoding", "onehot")
+    snapshot = load_training_snapshot(refresh)
+    if out_of_core is None:
+        out_of_core = (train_cfg.get("out_of_core") or {}).get("enabled", False)
+    if out_of_core:
+        return train_out_of_core(snapshot, started, activate, update)
+
+    model_params = {}
+    if encoding == "native":
+        # Categories stay as codes; XGBoost splits on them directly (hist only)
+        X, y, feature_cols, vocab = native_table(snapshot)
+        model_params = {
+            "tree_method": "hist",
+            "enable_categorical": True,
+            "feature_types": ["q"] * len(NUMERIC_FEATURES) + ["c"] * len(CATEGORICAL_FEATURES),
+        }
+    else:
+        X, y, feature_cols = onehot_table(snapshot)
+    print(f"[Training] {encoding} features: {X.shape[0]} x {X.shape[1]} "
+          f"({X.to_numpy().nbytes if hasattr(X, 'to_numpy') else X.nbytes:,} bytes)")
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    test = holdout_mask(snapshot.columns["tender_id"], train_cfg.get("test_size", 0.2))
+    X_train, X_test = X[~test], X[test]
+    y_train, y_test = np.asarray(y)[~test], np.asarray(y)[test]
     
-    scaler = StandardScaler()
-    X_train_s = scaler.fit_transform(X_train)
-    X_test_s = scaler.transform(X_test)
-
-    # XGBoost is excellent at handling the sparse data from One-Hot Encoding
-    model = xgb.XGBRegressor(
-        n_estimators=500,
-        learning_rate=0.05,
-        max_depth=8,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        objective='reg:squarederror'
-    )
+    if encoding != "native" and train_cfg.get("use_scaler", True):
+        scaler = StandardScaler()
+        X_train_s = scaler.fit_transform(X_train)
+        X_test_s = scaler.transform(X_test)
+    else:
+        # Tree splits don't depend on feature scale; serving then skips scaling entirely
+        scaler = None
+        X_train_s = np.asarray(X_train, dtype="float32")
+        X_test_s = np.asarray(X_test, dtype="float32")
 
+    # Optional K-fold search on the training split (the test split stays held out)
+    tuning_cfg = train_cfg.get("tuning") or {}
+    if tune or tuning_cfg.get("enabled", False):
+        result = tune_params(np.asarray(X_train, dtype="float32"), y_train, tuning_cfg, model_params)
+        os.makedirs("models", exist_ok=True)
+        save_best_params(result, "models")
+        print(f"[Tuning] Best CV rmse {result['cv_rmse']:,.0f} with {result['best_params']} "
+              f"({result['n_estimators']} trees) in {result['wall_clock_s']:.1f}s")
+
+    params, tuned = regressor_params(train_cfg, model_params)
+    model = xgb.XGBRegressor(**params)
+
+    print(f"\n[Training] XGBoost on {len(X_train)} rows, validating on {len(X_test)}...")
     model.fit(X_train_s, y_train, eval_set=[(X_test_s, y_test)], verbose=False)
+    errors = model.predict(X_test_s) - y_test
+    metrics = {
+        "holdout_rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "holdout_mae": float(np.mean(np.abs(errors))),
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+    }
+    if tuned:
+        metrics.update(cv_rmse=tuned["cv_rmse"], cv_rmse_std=tuned["cv_rmse_std"], cv_mae=tuned["cv_mae"])
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(f"[Training] Holdout RMSE: {metrics['holdout_rmse']:,.0f}; "
+          f"{time.perf_counter() - started:.1f}s, peak RSS {metrics['peak_rss_mb']} MB")
     
-    # Save artifacts
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(model, "models/road_cost_model.joblib")
-    joblib.dump(scaler, "models/scaler.joblib")
+    # Save artifacts into a new registry version (published in one rename)
+    print("\n[Saving] Writing model artifacts...")
+
+    # Column order, categorical vocabularies, defaults and artifact names for inference
+    if encoding == "native":
+        schema = native_schema(NUMERIC_FEATURES, vocab)
+    else:
+        schema = schema_from_columns(feature_cols, NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    # Which feature snapshot the model was fitted on (recorded in model_training_logs)
+    schema["training"] = {
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "rows": int(len(X)),
+    }
+
+    version = save_version(model, scaler, schema, feature_cols, {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "training_seconds": round(time.perf_counter() - started, 3),
+        "rows": int(len(X)),
+        "categorical_encoding": encoding,
+        "feature_snapshot": snapshot.version,
+        "feature_snapshot_hash": snapshot.hash,
+        "metrics": metrics,
+        "update": {"mode": "full", **(update or {})},
+    }, activate=activate)
     
     print(f"Success! Model trained on {len(X)} records with {len(feature_cols)} features.")
+    print(f"Feature snapshot: {snapshot.version} (sha256 {snapshot.hash})")
+    print(f"Model version: {version}{' (now serving)' if activate else ''}")
+    return version
 
 if __name__ == "__main__":
-    train_save()
\ No newline at end of file
+    train_save(refresh="--no-refresh" not in sys.argv, tune="--tune" in sys.argv,
+               activate="--no-activate" not in sys.argv, out_of_core=True if "--out-of-core" in sys.argv else None)
\ No newline at end of file
@@ -0,0 +1,234 @@
+# backend/ml/training_jobs.py
+"""
+Background model retraining.
+
+POST /api/admin/retrain-model used to run train_model inside the request for up to
+ten minutes. TrainingJobRunner instead starts `python -m backend.ml.train_model`
+as a separate process and returns the model_training_logs row id straight away;
+a monitor thread streams the process output into that row (log_output, with the
+last line doubling as the progress message), enforces the timeout and records the
+outcome. Jobs submitted with mode="incremental" run backend.ml.incremental
+instead, which continues boosting the current model on new tenders (or falls back
+to a full retrain on its own).
+
+Only one training job runs at a time across every API worker: the job holds the
+MySQL named lock LOCK_NAME on its own connection until the process exits. If the
+worker dies the connection drops and MySQL releases the lock, so a crash never
+wedges retraining; rows it left 'in_progress' are marked failed by the next job.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from backend.database import cfg, connection, open_dedicated_connection
+
+LOCK_NAME = "intelliroad_model_training"
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRAIN_COMMANDS = {
+    "full": [sys.executable, "-u", "-m", "backend.ml.train_model"],
+    "incremental": [sys.executable, "-u", "-m", "backend.ml.incremental"],
+}
+
+# log_output is a TEXT column (64 KB); keep the tail of longer logs
+MAX_LOG_CHARS = 60000
+
+
+class TrainingAlreadyRunning(Exception):
+    pass
+
+
+def _tail(lines):
+    text = "".join(lines)
+    return text[-MAX_LOG_CHARS:] if len(text) > MAX_LOG_CHARS else text
+
+def progress_line(log_output):
+    """Last non-empty line of a job's output, shown as its progress"""
+    for line in reversed((log_output or "").splitlines()):
+        if line.strip():
+            return line.strip()[:255]
+    return None
+
+
+class TrainingJob:
+    def __init__(self, log_id, admin_id, training_count, lock_conn, on_success, mode="full"):
+        self.log_id = log_id
+        self.admin_id = admin_id
+        self.training_count = training_count
+        self.mode = mode
+        self.started = time.monotonic()
+        self._lock_conn = lock_conn
+        self._on_success = on_success
+        self._lines = [f"[Job] {mode} training\n"]
+        self.process = None
+        self.thread = None
+
+    def _update(self, sql, params):
+        with connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            conn.commit()
+            cur.close()
+
+    def _flush(self):
+        self._update("UPDATE model_training_logs SET log_output=%s WHERE log_id=%s",
+                     (_tail(self._lines), self.log_id))
+
+    def _finish(self, status, error=None, model_version=None, feature_snapshot_hash=None):
+        # %% escapes % for the driver's parameter formatting
+        self._update("""
+            UPDATE model_training_logs
+            SET status=%s, completed_at=NOW(), log_output=%s, error_message=%s,
+                model_version=CASE WHEN %s='completed'
+                    THEN COALESCE(%s, CONCAT('v', DATE_FORMAT(NOW(), '%%Y%%m%%d_%%H%%i%%s')))
+                    ELSE model_version END,
+                feature_snapshot_hash=%s
+            WHERE log_id=%s
+        """, (status, _tail(self._lines), error, status, model_version, feature_snapshot_hash, self.log_id))
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            self._lines.append(line)
+
+    def run(self, timeout, flush_interval):
+        reader = None
+        try:
+            self.process = subprocess.Popen(
+                TRAIN_COMMANDS[self.mode], cwd=ROOT, text=True, bufsize=1,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+            )
+            reader = threading.Thread(target=self._read_output, name=f"training-{self.log_id}-output", daemon=True)
+            reader.start()
+
+            flushed = 0
+            while self.process.poll() is None:
+                if time.monotonic() - self.started > timeout:
+                    self.process.kill()
+                    self.process.wait()
+                    reader.join(5)
+                    self._finish("failed", f"Training timeout (>{timeout:.0f} seconds)")
+                    print(f"[ERROR] Training job {self.log_id} timed out")
+                    return
+                if len(self._lines) != flushed:
+                    flushed = len(self._lines)
+                    try:
+                        self._flush()
+                    except Exception as e:
+                        print(f"[WARN] Could not write training log {self.log_id}: {e}")
+                time.sleep(flush_interval)
+            reader.join(5)
+
+            if self.process.returncode != 0:
+                self._finish("failed", progress_line(_tail(self._lines)) or f"train_model exited with {self.process.returncode}")
+                print(f"[ERROR] Training job {self.log_id} failed (exit {self.process.returncode})")
+                return
+
+            trained = {}
+            try:
+                trained = self._on_success() or {}
+            except Exception as e:
+                self._lines.append(f"[WARN] Model trained but could not be loaded: {e}\n")
+            self._finish("completed", **trained)
+            print(f"[SUCCESS] Training job {self.log_id} completed in {time.monotonic() - self.started:.1f}s")
+
+        except Exception as e:
+            if self.process is not None and self.process.poll() is None:
+                self.process.kill()
+            print(f"[ERROR] Training job {self.log_id} crashed: {e}")
+            try:
+                self._finish("failed", str(e))
+            except Exception:
+                pass
+        finally:
+            try:
+                cur = self._lock_conn.cursor()
+                cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cur.close()
+            except Exception:
+                pass
+            self._lock_conn.close()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+
+class TrainingJobRunner:
+    def __init__(self, on_success, timeout=600, flush_interval=2.0):
+        """
+        on_success() runs after a clean exit (e.g. reload the model) and returns
+        {"model_version", "feature_snapshot_hash"} for the log row
+        """
+        self.on_success = on_success
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.current = None
+        self._lock = threading.Lock()
+
+    def submit(self, admin_id, training_count, mode="full"):
+        """Start a training job ("full" or "incremental") and return its log_id; raises TrainingAlreadyRunning"""
+        if mode not in TRAIN_COMMANDS:
+            raise ValueError(f"Unknown training mode {mode!r}")
+        with self._lock:
+            if self.current is not None and self.current.running:
+                raise TrainingAlreadyRunning(self.current.log_id)
+
+            lock_conn = open_dedicated_connection()
+            try:
+                cur = lock_conn.cursor()
+                cur.execute("SELECT GET_LOCK(%s, 0) AS acquired", (LOCK_NAME,))
+                if not cur.fetchone()["acquired"]:
+                    cur.execute("""
+                        SELECT log_id FROM model_training_logs
+                        WHERE status='in_progress' ORDER BY started_at DESC LIMIT 1
+                    """)
+                    row = cur.fetchone()
+                    raise TrainingAlreadyRunning(row["log_id"] if row else None)
+
+                # Holding the lock means nothing else is training: earlier in_progress rows were orphaned
+                cur.execute("""
+                    UPDATE model_training_logs
+                    SET status='failed', completed_at=NOW(), error_message='Interrupted (API worker stopped)'
+                    WHERE status='in_progress'
+                """)
+                cur.execute("""
+                    INSERT INTO model_training_logs (admin_id, status, training_data_count, started_at)
+                    VALUES (%s, 'in_progress', %s, NOW())
+                """, (admin_id, training_count))
+                log_id = cur.lastrowid
+                lock_conn.commit()
+                cur.close()
+            except Exception:
+                lock_conn.close()
+                raise
+
+            job = TrainingJob(log_id, admin_id, training_count, lock_conn, self.on_success, mode)
+            job.thread = threading.Thread(
+                target=job.run, args=(self.timeout, self.flush_interval),
+                name=f"training-{log_id}", daemon=True
+            )
+            job.thread.start()
+            self.current = job
+            print(f"[INFO] Started {mode} training job {log_id} with {training_count} records")
+            return log_id
+
+    def stats(self):
+        job = self.current
+        return {
+            "running": job is not None and job.running,
+            "log_id": job.log_id if job else None,
+            "mode": job.mode if job else None,
+            "elapsed_s": round(time.monotonic() - job.started, 1) if job and job.running else None,
+            "timeout_s": self.timeout,
+        }
+
+
+_training_cfg = cfg.get("training") or {}
+
+def training_runner(on_success):
+    return TrainingJobRunner(
+        on_success,
+        timeout=_training_cfg.get("timeout_seconds", 600),
+        flush_interval=_training_cfg.get("log_flush_seconds", 2.0)
+    )
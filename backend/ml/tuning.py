@@ -0,0 +1,161 @@
+# backend/ml/tuning.py
+"""
+Hyperparameter search with K-fold cross-validation for the cost model.
+
+Each trial is one parameter set from training.tuning.space, scored by K-fold CV:
+every fold fits an XGBRegressor with tree_method="hist" and early stopping on the
+held-out fold, so n_estimators is only an upper bound and the trial reports the
+average best iteration. Trials run in a process pool; the feature matrix is sent
+to each worker once (pool initializer), and every fit gets an explicit thread
+budget of cores // workers so the pool never oversubscribes the CPU.
+
+The winning parameters, with their CV metrics, every trial's scores and the
+wall-clock / CPU cost of the search, are written to models/best_params.json;
+train_model uses them for the final fit.
+"""
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+BEST_PARAMS_FILE = "best_params.json"
+
+DEFAULT_SPACE = {
+    "max_depth": [4, 6, 8],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "subsample": [0.7, 0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "min_child_weight": [1, 5],
+    "reg_lambda": [1.0, 5.0],
+}
+
+# Set by _init_worker in each pool process
+_X = _y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+def _folds(n_rows, folds, seed):
+    order = np.random.default_rng(seed).permutation(n_rows)
+    return np.array_split(order, folds)
+
+def _run_trial(trial_id, params, folds, seed, max_estimators, early_stopping_rounds, nthread, model_params):
+    """CV score of one parameter set; runs in a pool worker"""
+    import xgboost as xgb
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    rmse, mae, iterations = [], [], []
+    parts = _folds(len(_y), folds, seed)
+    for k, valid in enumerate(parts):
+        train = np.concatenate([p for i, p in enumerate(parts) if i != k])
+        model = xgb.XGBRegressor(
+            n_estimators=max_estimators,
+            n_jobs=nthread,
+            early_stopping_rounds=early_stopping_rounds,
+            objective="reg:squarederror",
+            random_state=seed,
+            **{"tree_method": "hist", **model_params, **params}
+        )
+        model.fit(_X[train], _y[train], eval_set=[(_X[valid], _y[valid])], verbose=False)
+        pred = model.predict(_X[valid], iteration_range=(0, model.best_iteration + 1))
+        err = pred - _y[valid]
+        rmse.append(float(np.sqrt(np.mean(err ** 2))))
+        mae.append(float(np.mean(np.abs(err))))
+        iterations.append(model.best_iteration + 1)
+    return {
+        "trial": trial_id,
+        "params": params,
+        "cv_rmse": float(np.mean(rmse)),
+        "cv_rmse_std": float(np.std(rmse)),
+        "cv_mae": float(np.mean(mae)),
+        "best_iterations": iterations,
+        "seconds": round(time.perf_counter() - started, 3),
+        "cpu_seconds": round(time.process_time() - cpu_started, 3),
+    }
+
+def sample_trials(space, trials, seed):
+    """Every combination when the grid is small enough, otherwise a random sample of it"""
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if trials and trials < len(grid):
+        grid = random.Random(seed).sample(grid, trials)
+    return grid
+
+def _thread_budget(workers, cores):
+    if workers <= 0:
+        workers = cores
+    workers = max(1, min(workers, cores))
+    return workers, max(1, cores // workers)
+
+def tune(X, y, tuning_cfg=None, model_params=None):
+    """
+    Run the search and return the result dict (also what gets persisted);
+    model_params are fixed XGBRegressor arguments for every fit (e.g. categorical setup)
+    """
+    tuning_cfg = tuning_cfg or {}
+    folds = int(tuning_cfg.get("folds", 5))
+    seed = int(tuning_cfg.get("random_state", 42))
+    max_estimators = int(tuning_cfg.get("max_estimators", 2000))
+    early_stopping_rounds = int(tuning_cfg.get("early_stopping_rounds", 50))
+    cores = int(tuning_cfg.get("cores") or os.cpu_count() or 1)
+    trials = sample_trials(tuning_cfg.get("space") or DEFAULT_SPACE, int(tuning_cfg.get("trials", 20)), seed)
+    workers, nthread = _thread_budget(int(tuning_cfg.get("workers", 0)), cores)
+    workers = min(workers, len(trials))
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    print(f"[Tuning] {len(trials)} trials x {folds} folds on {len(y)} rows: "
+          f"{workers} worker processes x {nthread} threads")
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = [
+            pool.submit(_run_trial, i, params, folds, seed, max_estimators, early_stopping_rounds, nthread,
+                        model_params or {})
+            for i, params in enumerate(trials)
+        ]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            print(f"    trial {result['trial'] + 1}/{len(trials)}: rmse {result['cv_rmse']:,.0f} "
+                  f"(±{result['cv_rmse_std']:,.0f}) in {result['seconds']:.1f}s")
+    wall = time.perf_counter() - started
+
+    best = min(results, key=lambda r: r["cv_rmse"])
+    return {
+        "best_params": best["params"],
+        "n_estimators": int(round(np.mean(best["best_iterations"]))),
+        "cv_rmse": best["cv_rmse"],
+        "cv_rmse_std": best["cv_rmse_std"],
+        "cv_mae": best["cv_mae"],
+        "folds": folds,
+        "rows": int(len(y)),
+        "trials": sorted(results, key=lambda r: r["cv_rmse"]),
+        "wall_clock_s": round(wall, 3),
+        "trial_cpu_s": round(sum(r["cpu_seconds"] for r in results), 3),
+        "workers": workers,
+        "threads_per_trial": nthread,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def save_best_params(result, folder):
+    tmp = os.path.join(folder, BEST_PARAMS_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp, os.path.join(folder, BEST_PARAMS_FILE))
+
+def load_best_params(folder):
+    try:
+        with open(os.path.join(folder, BEST_PARAMS_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
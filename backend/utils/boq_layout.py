@@ -0,0 +1,151 @@
+# backend/utils/boq_layout.py
+"""
+Layout-aware BOQ table extraction from PyMuPDF word coordinates.
+
+Tender BOQs are tables, but get_text("text") emits their cells as separate
+lines, so the line regexes in pdf_parser mostly miss them (and they lose every
+description that wraps onto a second line). Here one pass over a page's words
+(page.get_text("words")) rebuilds the table:
+
+  1. words are grouped into visual lines by baseline
+  2. the header line (Item / Description / Unit / Qty / Rate / Amount, in any of
+     the usual spellings) gives the column positions; pages without a header
+     reuse the previous page's layout
+  3. every later line's words go to the column they sit under; a line with a
+     quantity starts a BOQ row, and description-only lines directly below it
+     are appended to that row's description
+
+pdf_parser falls back to the regex path for pages where no table is found.
+"""
+import re
+
+HEADER_KEYWORDS = {
+    "item_no": ("item", "sr", "s.no", "sno", "no", "#"),
+    "description": ("description", "particulars", "specification"),
+    "unit": ("unit", "units", "uom"),
+    "quantity": ("qty", "quantity", "quantities"),
+    "unit_price": ("rate", "price"),
+    "total_price": ("amount", "total", "cost"),
+}
+_KEYWORD_FIELD = {}
+for _field, _words in HEADER_KEYWORDS.items():
+    for _word in _words:
+        _KEYWORD_FIELD.setdefault(_word, _field)
+
+_NUMBER = re.compile(r"^(?:rs\.?)?\s*(-?[\d,]*\.?\d+)$", re.IGNORECASE)
+
+
+def _number(cell):
+    if not cell:
+        return None
+    m = _NUMBER.match(cell.replace(" ", ""))
+    if not m:
+        return None
+    try:
+        return float(m.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+def visual_lines(words, tolerance=0.35):
+    """Words (x0, y0, x1, y1, text, ...) -> lines sorted top to bottom, each sorted left to right"""
+    lines = []
+    for w in sorted(words, key=lambda w: (w[3], w[0])):
+        height = w[3] - w[1]
+        if lines and abs(w[3] - lines[-1]["y1"]) <= tolerance * height:
+            lines[-1]["words"].append(w)
+            lines[-1]["y0"] = min(lines[-1]["y0"], w[1])
+        else:
+            lines.append({"y0": w[1], "y1": w[3], "words": [w]})
+    for line in lines:
+        line["words"].sort(key=lambda w: w[0])
+    return lines
+
+def find_header(line):
+    """Column layout [(field, x0, x1)] if the line is a BOQ table header, else None"""
+    columns = []
+    seen = set()
+    for w in line["words"]:
+        field = _KEYWORD_FIELD.get(w[4].lower().strip(".:()/"))
+        if field is None or field in seen:
+            continue
+        seen.add(field)
+        columns.append((field, w[0], w[2]))
+    if {"description", "quantity"} <= seen and seen & {"unit_price", "total_price"}:
+        return columns
+    return None
+
+def find_layout(words):
+    """Column layout of the first table header among a page's words, or None"""
+    for line in visual_lines(words):
+        header = find_header(line)
+        if header:
+            return header
+    return None
+
+def _boundaries(columns, margin=12.0):
+    # Text runs right from its header, numbers are often right-aligned a little
+    # left of it: a column starts just before its header (at most halfway back
+    # to the previous header), and a word belongs to the column its centre is in
+    edges = [b[1] - min(margin, max(b[1] - a[2], 0) / 2) for a, b in zip(columns, columns[1:])]
+    return [float("-inf")] + edges
+
+def _cells(line, columns, edges):
+    cells = {}
+    for w in line["words"]:
+        centre = (w[0] + w[2]) / 2
+        k = len(edges) - 1
+        while k > 0 and centre < edges[k]:
+            k -= 1
+        field = columns[k][0]
+        cells[field] = f"{cells[field]} {w[4]}" if field in cells else w[4]
+    return cells
+
+def _row(cells, raw):
+    quantity = _number(cells.get("quantity"))
+    unit_price = _number(cells.get("unit_price"))
+    total_price = _number(cells.get("total_price"))
+    if total_price is None and unit_price is not None:
+        total_price = quantity * unit_price
+    return {
+        "item_no": cells.get("item_no"),
+        "description": cells.get("description", ""),
+        "unit": cells.get("unit", ""),
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "total_price": total_price,
+        "raw": raw,
+    }
+
+def extract_table_rows(words, layout=None):
+    """
+    BOQ rows from one page's words; layout is the column layout carried over from
+    the previous page. Returns (rows, layout) - rows is None when the page has no
+    table (no header and no layout to reuse).
+    """
+    lines = visual_lines(words)
+    start = 0
+    for i, line in enumerate(lines):
+        header = find_header(line)
+        if header:
+            layout, start = header, i + 1
+            break
+    if layout is None:
+        return None, None
+
+    edges = _boundaries(layout)
+    rows, current, previous = [], None, None
+    for line in lines[start:]:
+        cells = _cells(line, layout, edges)
+        text = " ".join(w[4] for w in line["words"])
+        if _number(cells.get("quantity")) is not None and (cells.get("item_no") or cells.get("description")):
+            current = _row(cells, text)
+            rows.append(current)
+        elif (current is not None and previous is not None and set(cells) == {"description"}
+              and line["y0"] - previous["y1"] <= 0.5 * (line["y1"] - line["y0"])):
+            # Wrapped description: continues the row above
+            current["description"] = f"{current['description']} {cells['description']}".strip()
+            current["raw"] = f"{current['raw']} {text}"
+        else:
+            current = None
+        previous = line
+    return rows, layout
@@ -0,0 +1,153 @@
+# backend/utils/cost_engine.py
+"""
+Costing and climate impact for estimated quantities, against one catalog snapshot.
+
+Input is the (projects x materials) quantity array from quantity_estimator; the
+catalog is aligned to the same material columns once per snapshot, so pricing N
+projects is a handful of array operations.
+"""
+import numpy as np
+
+from backend.utils.quantity_estimator import MATERIAL_NAMES
+
+MIN_BILLABLE_QTY = 0.01
+
+# Billing units whose weight depends on the material rather than the unit
+_VOLUME_AREA_UNITS = ['Cubic Foot (cft)', 'Running Meter (RM)', 'Square Foot (ft²)', 'Square Meter (m²)']
+
+
+def kg_per_unit(material_name, unit):
+    """Weight of one billing unit in kg, used to apply per-kg climate factors"""
+    if "Metric Ton" in unit:
+        return 1000.0
+    if "50 kg Bag" in unit:
+        return 50.0
+    if unit in _VOLUME_AREA_UNITS:
+        # Rough estimates: 1 cft stone = 45kg, 1 cft sand = 40kg, 1 RM pipe = 50kg, 1 m² mesh = 5kg
+        if 'Stone' in material_name or 'Bajri' in material_name or 'Ballast' in material_name:
+            return 45.0
+        if 'Sand' in material_name:
+            return 40.0
+        if 'Pipe' in material_name:
+            return 50.0
+        if 'Mesh' in material_name:
+            return 5.0
+    return 1.0  # Default: already in kg
+
+
+class CatalogArrays:
+    """Catalog columns aligned to quantity_estimator.MATERIAL_NAMES"""
+
+    def __init__(self, catalog, names=MATERIAL_NAMES):
+        infos = [catalog.materials.get(name) for name in names]
+        impacts = [catalog.climate.get(name, {}) for name in names]
+
+        self.names = names
+        self.present = np.array([info is not None for info in infos])
+        self.material_id = [info['material_id'] if info else None for info in infos]
+        self.unit = [info['unit'] if info else None for info in infos]
+        self.category = [info['category_name'] if info else None for info in infos]
+        self.price = np.array([catalog.prices.get(name, 0.0) for name in names], dtype=np.float64)
+        self.kg_per_unit = np.array([
+            kg_per_unit(name, info['unit']) if info else 0.0 for name, info in zip(names, infos)
+        ])
+        self.co2 = np.array([impact.get('co2', 0.0) for impact in impacts], dtype=np.float64)
+        self.energy = np.array([impact.get('energy', 0.0) for impact in impacts], dtype=np.float64)
+        self.water = np.array([impact.get('water', 0.0) for impact in impacts], dtype=np.float64)
+
+
+def catalog_arrays(catalog):
+    """Aligned arrays for a snapshot, built once and kept on the (immutable) snapshot"""
+    arrays = getattr(catalog, "_cost_arrays", None)
+    if arrays is None:
+        arrays = CatalogArrays(catalog)
+        catalog._cost_arrays = arrays
+    return arrays
+
+
+def _row_totals(values):
+    # cumsum adds strictly left to right, so totals equal a sequential Python loop
+    return np.cumsum(values, axis=1)[:, -1] if values.shape[1] else np.zeros(len(values))
+
+
+def price_quantities(quantities, catalog):
+    """
+    Price a (projects x materials) quantity array.
+
+    Returns a dict of arrays: include mask, cost / kg / co2 / energy / water per
+    material, and per-project totals. Materials below MIN_BILLABLE_QTY or missing
+    from the catalog are excluded, as in the original per-material loop.
+    """
+    arrays = catalog_arrays(catalog)
+    quantities = np.asarray(quantities, dtype=np.float64)
+
+    include = (quantities >= MIN_BILLABLE_QTY) & arrays.present
+    cost = quantities * arrays.price
+    qty_kg = quantities * arrays.kg_per_unit
+    co2_kg = qty_kg * arrays.co2
+    energy_mj = qty_kg * arrays.energy
+    water_l = qty_kg * arrays.water
+
+    return {
+        "include": include,
+        "quantity": quantities,
+        "cost": cost,
+        "quantity_kg": qty_kg,
+        "co2_kg": co2_kg,
+        "energy_mj": energy_mj,
+        "water_l": water_l,
+        "total_cost": _row_totals(np.where(include, cost, 0.0)),
+        "total_co2_kg": _row_totals(np.where(include, co2_kg, 0.0)),
+        "total_energy_mj": _row_totals(np.where(include, energy_mj, 0.0)),
+        "total_water_l": _row_totals(np.where(include, water_l, 0.0)),
+    }
+
+
+def budget_summary(total_cost, max_budget_pkr):
+    within_budget = total_cost <= max_budget_pkr
+    return {
+        "within_budget": within_budget,
+        "budget_status": "Within Budget" if within_budget else "Over Budget",
+        "budget_difference": max_budget_pkr - total_cost,
+        "budget_utilization": (total_cost / max_budget_pkr) * 100,
+    }
+
+
+def project_breakdown(priced, i, catalog, max_budget_pkr):
+    """
+    Row i of a price_quantities() result as BOQ / climate lists and totals,
+    in the same shape predict_project has always produced.
+    """
+    arrays = catalog_arrays(catalog)
+    boq_list = []
+    climate_list = []
+
+    for j in np.flatnonzero(priced["include"][i]).tolist():
+        boq_list.append({
+            'material_id': arrays.material_id[j],
+            'material_name': arrays.names[j],
+            'quantity': float(priced["quantity"][i, j]),
+            'unit': arrays.unit[j],
+            'unit_price': float(arrays.price[j]),
+            'total_cost': float(priced["cost"][i, j]),
+            'category': arrays.category[j]
+        })
+        climate_list.append({
+            'material_id': arrays.material_id[j],
+            'material_name': arrays.names[j],
+            'quantity_kg': float(priced["quantity_kg"][i, j]),
+            'co2_kg': float(priced["co2_kg"][i, j]),
+            'energy_mj': float(priced["energy_mj"][i, j]),
+            'water_l': float(priced["water_l"][i, j])
+        })
+
+    total_cost = float(priced["total_cost"][i])
+    return {
+        "boq": boq_list,
+        "climate": climate_list,
+        "total_cost": total_cost,
+        "total_co2_kg": float(priced["total_co2_kg"][i]),
+        "total_energy_mj": float(priced["total_energy_mj"][i]),
+        "total_water_l": float(priced["total_water_l"][i]),
+        **budget_summary(total_cost, max_budget_pkr),
+    }
@@ -0,0 +1,122 @@
+# backend/utils/cost_uncertainty.py
+"""
+Monte Carlo cost ranges from observed price dispersion.
+
+Each material's price is drawn around its current catalog price with the
+relative spread (std / mean) seen in material_price_distribution for the latest
+year on record. Draws are log-normal and mean-preserving, so prices stay positive
+and the average draw is the catalog price. Materials with no recorded spread are
+held at the catalog price.
+
+All samples are drawn as one (samples x materials) array and costed with a single
+matrix product against the (materials x projects) billable quantities.
+"""
+import threading
+import time
+
+import numpy as np
+
+from backend.database import cfg, connection
+from backend.utils.cost_engine import MIN_BILLABLE_QTY, catalog_arrays
+
+_uncertainty_cfg = cfg.get("uncertainty") or {}
+
+DEFAULT_SAMPLES = _uncertainty_cfg.get("default_samples", 5000)
+MAX_SAMPLES = _uncertainty_cfg.get("max_samples", 50000)
+REFRESH_SECONDS = _uncertainty_cfg.get("refresh_seconds", 300)
+
+DISTRIBUTION_SQL = """
+    SELECT d.material_id, d.year, d.raw_count, d.mean_pkr, d.std_pkr
+    FROM material_price_distribution d
+    JOIN (
+        SELECT material_id, MAX(year) AS year
+        FROM material_price_distribution
+        GROUP BY material_id
+    ) latest ON latest.material_id = d.material_id AND latest.year = d.year
+"""
+
+
+class _DistributionCache:
+    """material_id -> coefficient of variation, reloaded at most every REFRESH_SECONDS"""
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._cv = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._cv is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return self._cv
+        with self._lock:
+            if self._cv is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                with connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(DISTRIBUTION_SQL)
+                        rows = cur.fetchall()
+                self._cv = {
+                    row["material_id"]: float(row["std_pkr"]) / float(row["mean_pkr"])
+                    for row in rows
+                    if row["mean_pkr"] and row["std_pkr"] and row["raw_count"] > 1
+                }
+                self._loaded_at = time.monotonic()
+            return self._cv
+
+
+_distributions = _DistributionCache(REFRESH_SECONDS)
+
+def get_price_dispersion():
+    return _distributions.get()
+
+
+def dispersion_vector(catalog, cv_by_material_id):
+    """Per-material log-normal sigma aligned to MATERIAL_NAMES (0 where no spread is known)"""
+    arrays = catalog_arrays(catalog)
+    cv = np.array([cv_by_material_id.get(mid, 0.0) if mid is not None else 0.0
+                   for mid in arrays.material_id])
+    return np.sqrt(np.log1p(cv * cv))
+
+
+def sample_prices(price, sigma, samples, rng):
+    """(samples x materials) price draws with E[draw] == price"""
+    z = rng.standard_normal((samples, len(price)))
+    return price * np.exp(sigma * z - 0.5 * sigma * sigma)
+
+
+def simulate_costs(quantities, catalog, max_budgets, samples=DEFAULT_SAMPLES, cv_by_material_id=None, seed=None):
+    """
+    quantities: (projects x materials) from quantity_estimator; max_budgets: per project.
+    Returns one summary dict per project: P10 / P50 / P90, mean, std and the
+    probability that cost exceeds the budget.
+    """
+    if cv_by_material_id is None:
+        cv_by_material_id = get_price_dispersion()
+
+    arrays = catalog_arrays(catalog)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    # Same billable set as price_quantities
+    billable = np.where((quantities >= MIN_BILLABLE_QTY) & arrays.present, quantities, 0.0)
+    sigma = dispersion_vector(catalog, cv_by_material_id)
+
+    rng = np.random.default_rng(seed)
+    costs = sample_prices(arrays.price, sigma, samples, rng) @ billable.T   # samples x projects
+
+    p10, p50, p90 = np.percentile(costs, [10, 50, 90], axis=0)
+    mean = costs.mean(axis=0)
+    std = costs.std(axis=0)
+    overrun = (costs > np.asarray(max_budgets, dtype=np.float64)).mean(axis=0)
+
+    uncertain = np.count_nonzero((billable > 0) & (sigma > 0), axis=1)
+    return [
+        {
+            "samples": samples,
+            "p10_cost": float(p10[i]),
+            "p50_cost": float(p50[i]),
+            "p90_cost": float(p90[i]),
+            "mean_cost": float(mean[i]),
+            "std_cost": float(std[i]),
+            "overrun_probability": float(overrun[i]),
+            "materials_with_price_spread": int(uncertain[i]),
+        }
+        for i in range(len(billable))
+    ]
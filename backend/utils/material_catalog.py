@@ -0,0 +1,166 @@
+# backend/utils/material_catalog.py
+"""
+Process-level snapshot of the material catalog (prices, climate factors, units,
+categories, material IDs) used on the prediction hot path.
+
+The snapshot is loaded once and replaced as a whole, never mutated, so readers
+can keep using the reference they got. It is refreshed when:
+  - invalidate_catalog() is called (after an admin edits prices in this worker)
+  - a cheap version query (MAX(last_updated_at) plus row counts) changes, which is
+    how other workers notice edits; the check runs at most every
+    `catalog.version_check_interval` seconds
+"""
+import threading
+import time
+
+from backend.database import cfg, connection
+
+VERSION_SQL = """
+    SELECT
+        (SELECT MAX(last_updated_at) FROM material_prices) AS prices_updated_at,
+        (SELECT COUNT(*) FROM material_prices) AS price_rows,
+        (SELECT MAX(updated_at) FROM material_climatic_impact) AS climate_updated_at,
+        (SELECT COUNT(*) FROM material_climatic_impact) AS climate_rows,
+        (SELECT COUNT(*) FROM materials) AS material_rows,
+        (SELECT MAX(material_id) FROM materials) AS max_material_id
+"""
+
+CATALOG_SQL = """
+    SELECT m.material_id, m.material_name, m.unit, mc.category_name,
+           mp.price_current,
+           mci.emission_factor_kg_co2_per_kg, mci.energy_consumption_mj, mci.water_usage_liters
+    FROM materials m
+    LEFT JOIN material_categories mc ON m.category_id = mc.category_id
+    LEFT JOIN material_prices mp ON m.material_id = mp.material_id
+    LEFT JOIN material_climatic_impact mci ON m.material_id = mci.material_id
+"""
+
+
+def _version_key(row):
+    return tuple(str(row[k]) for k in (
+        "prices_updated_at", "price_rows", "climate_updated_at",
+        "climate_rows", "material_rows", "max_material_id"
+    ))
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog at one version.
+
+    materials: {material_name: {material_id, material_name, unit, category_name}}
+    prices:    {material_name: price_current}  (only materials with a price row)
+    climate:   {material_name: {co2, energy, water}}  (only materials with impact factors)
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.loaded_at = time.time()
+        self.materials = {}
+        self.prices = {}
+        self.climate = {}
+
+        for row in rows:
+            name = row["material_name"]
+            self.materials[name] = {
+                "material_id": row["material_id"],
+                "material_name": name,
+                "unit": row["unit"],
+                "category_name": row["category_name"],
+            }
+            if row["price_current"] is not None:
+                self.prices[name] = float(row["price_current"])
+            if row["emission_factor_kg_co2_per_kg"] is not None:
+                self.climate[name] = {
+                    "co2": float(row["emission_factor_kg_co2_per_kg"]),
+                    "energy": float(row["energy_consumption_mj"] or 0),
+                    "water": float(row["water_usage_liters"] or 0),
+                }
+
+    @property
+    def age_seconds(self):
+        return time.time() - self.loaded_at
+
+
+class MaterialCatalogCache:
+    def __init__(self, version_check_interval=5.0):
+        self.version_check_interval = version_check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._invalidated = False
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "version_checks": 0}
+
+    def _read_version(self, cur):
+        cur.execute(VERSION_SQL)
+        return _version_key(cur.fetchone())
+
+    def _load(self):
+        # Cleared before reading so an invalidate() racing this load is not lost
+        self._invalidated = False
+        with connection() as conn:
+            with conn.cursor() as cur:
+                # Version and rows are read in the same transaction, so they agree
+                version = self._read_version(cur)
+                cur.execute(CATALOG_SQL)
+                snapshot = CatalogSnapshot(version, cur.fetchall())
+        self._snapshot = snapshot
+        self._checked_at = time.monotonic()
+        self._stats["reloads"] += 1
+        return snapshot
+
+    def _current_version(self):
+        with connection() as conn:
+            with conn.cursor() as cur:
+                return self._read_version(cur)
+
+    def get(self):
+        """Return the current snapshot, reloading it if it was invalidated or is stale."""
+        snapshot = self._snapshot
+        due = time.monotonic() - self._checked_at >= self.version_check_interval
+        if snapshot is not None and not self._invalidated and not due:
+            self._stats["hits"] += 1
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._invalidated:
+                self._stats["misses"] += 1
+                return self._load()
+
+            if time.monotonic() - self._checked_at >= self.version_check_interval:
+                self._stats["version_checks"] += 1
+                if self._current_version() != snapshot.version:
+                    self._stats["misses"] += 1
+                    return self._load()
+                self._checked_at = time.monotonic()
+
+            self._stats["hits"] += 1
+            return snapshot
+
+    def invalidate(self):
+        self._invalidated = True
+
+    def stats(self):
+        snapshot = self._snapshot
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+            "snapshot_age_s": snapshot.age_seconds if snapshot else None,
+            "materials": len(snapshot.materials) if snapshot else 0,
+            "version": list(snapshot.version) if snapshot else None,
+        }
+
+
+_catalog = MaterialCatalogCache(
+    version_check_interval=(cfg.get("catalog") or {}).get("version_check_interval", 5)
+)
+
+def get_catalog():
+    return _catalog.get()
+
+def invalidate_catalog():
+    _catalog.invalidate()
+
+def get_catalog_stats():
+    return _catalog.stats()
@@ -1,13 +1,179 @@
 import fitz
+import hashlib
+import os
 import re
-from backend.database import upsert_material, insert_boq_line, stage_price_row, insert_boq_file
+import time
+from collections import deque
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from backend.utils.boq_layout import extract_table_rows, find_layout
+from backend.database import cfg, upsert_material, stage_price_row, get_boq_file, store_boq_file
 
-def extract_text_from_pdf(path):
-    doc = fitz.open(path)
-    parts = []
-    for i in range(len(doc)):
-        parts.append(doc[i].get_text("text"))
-    return "\n".join(parts)
+_extract_cfg = cfg.get("pdf_extraction") or {}
+
+def _iter_pages(doc, start, stop, layout, columns=None):
+    """
+    (page_no, text, rows, words, columns) for pages [start, stop) of an open
+    document; columns is the table layout in effect at start and is yielded as
+    it stands after each page. words is only kept for pages no layout applies to
+    yet, so a caller that learns the layout later can still extract their rows
+    """
+    for i in range(start, min(stop, len(doc))):
+        page = doc[i]
+        if not layout:
+            yield i, page.get_text("text"), None, None, None
+            continue
+        # One text analysis for both the words and the plain text
+        textpage = page.get_textpage()
+        words = page.get_text("words", textpage=textpage)
+        rows, columns = extract_table_rows(words, columns)
+        yield i, page.get_text("text", textpage=textpage), rows, words if columns is None else None, columns
+
+def iter_pdf_pages(path, start=0, stop=None, layout=None, doc=None):
+    """
+    Yield (page_no, text, rows) for pages [start, stop) of one PDF, one page at a time;
+    rows are the page's BOQ table rows (boq_layout), or None when it has no table
+    or layout extraction is off. doc: path already opened (closed when done)
+    """
+    layout = _extract_cfg.get("layout", True) if layout is None else layout
+    with doc if doc is not None else fitz.open(path) as doc:
+        stop = len(doc) if stop is None else stop
+        columns = None
+        if layout:
+            # A table runs on until the next header: start from the nearest one before start
+            for j in range(start - 1, -1, -1):
+                columns = find_layout(doc[j].get_text("words"))
+                if columns:
+                    break
+        for i, text, rows, _, _ in _iter_pages(doc, start, stop, layout, columns):
+            yield i, text, rows
+
+def _extract_range(path, start, stop):
+    """
+    Pool worker: ([(page_no, text, rows, words)], layout in effect at the end) of
+    one file / page range. Pages before the range's first table header keep their
+    words: which layout they continue is only known once the ranges before have
+    been read (_range_pages)
+    """
+    layout = _extract_cfg.get("layout", True)
+    pages, columns = [], None
+    with fitz.open(path) as doc:
+        for i, text, rows, words, columns in _iter_pages(doc, start, len(doc) if stop is None else stop, layout):
+            pages.append((i, text, rows, words))
+    return pages, columns
+
+def _range_pages(path, future, layouts):
+    """
+    (page_no, text, rows) of a pool range, in order; its pages before the first
+    header get their rows from the layout the file's previous range ended with,
+    as if the file had been read in one pass. layouts: path -> that layout
+    """
+    pages, end_layout = future.result()
+    columns = layouts.get(path)
+    for i, text, rows, words in pages:
+        if words is not None and columns is not None:
+            rows, _ = extract_table_rows(words, columns)
+        yield i, text, rows
+    layouts[path] = end_layout or columns
+
+def _page_ranges(paths, pages_per_task, known_pages=None):
+    for path in paths:
+        if not pages_per_task:
+            yield path, 0, None
+            continue
+        try:
+            if known_pages and path in known_pages:
+                pages = known_pages[path]
+            else:
+                with fitz.open(path) as doc:
+                    pages = len(doc)
+        except Exception:
+            # Let the worker hit (and extract_pages report) the same error
+            yield path, 0, None
+            continue
+        for start in range(0, max(pages, 1), pages_per_task):
+            yield path, start, start + pages_per_task
+
+def _page_batches(paths, workers, pages_per_task, doc=None, known_pages=None):
+    """(path, lazy iterable of (page_no, text, rows)) per file or page range, in order"""
+    if workers == 1:
+        for path in paths:
+            yield path, iter_pdf_pages(path, doc=doc)
+            doc = None
+        return
+    layouts = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        ranges = _page_ranges(paths, pages_per_task, known_pages)
+        pending = deque()
+        for path, start, stop in ranges:
+            pending.append((path, pool.submit(_extract_range, path, start, stop)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            path, future = pending.popleft()
+            # Keep the window full while the caller works through this range
+            for next_path, start, stop in ranges:
+                pending.append((next_path, pool.submit(_extract_range, next_path, start, stop)))
+                break
+            yield path, _range_pages(path, future, layouts)
+
+def extract_pages(paths, workers=None, pages_per_task=None, stats=None):
+    """
+    Yield (path, page_no, text, rows) for every page of every PDF, in order
+    (rows: see iter_pdf_pages).
+
+    With more than one worker, files - or ranges of pages_per_task pages of a large
+    file - are extracted in a process pool; a single document of at most
+    pages_per_task pages is extracted in-process. At most 2 x workers ranges are in flight,
+    so the caller can parse early pages while later ones are still being extracted
+    and memory stays bounded however many files there are. Files (ranges) that
+    cannot be read are reported and skipped. stats, if given, is filled with
+    files / pages / failed / seconds / pages_per_sec.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    workers = workers if workers is not None else _extract_cfg.get("workers", 0)
+    workers = workers if workers > 0 else os.cpu_count() or 1
+    if pages_per_task is None:
+        pages_per_task = _extract_cfg.get("pages_per_task", 50)
+    doc, known_pages = None, {}
+    if workers > 1 and len(paths) == 1:
+        # A single document only gains from the pool when it splits into several
+        # ranges; otherwise extract it in-process from the copy opened to count it
+        try:
+            doc = fitz.open(paths[0])
+        except Exception:
+            workers = 1  # iter_pdf_pages hits and reports the same error
+        else:
+            if not pages_per_task or len(doc) <= pages_per_task:
+                workers = 1
+            else:
+                known_pages[paths[0]] = len(doc)
+                doc.close()
+                doc = None
+    stats = stats if stats is not None else {}
+    stats.update(files=0, pages=0, failed=0)
+    started = time.perf_counter()
+
+    last_path = None
+    for path, pages in _page_batches(paths, workers, pages_per_task, doc, known_pages):
+        try:
+            for i, text, rows in pages:
+                if path != last_path:
+                    last_path = path
+                    stats["files"] += 1
+                stats["pages"] += 1
+                yield path, i, text, rows
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"[ERROR] Could not extract {path}: {e}")
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["pages_per_sec"] = round(stats["pages"] / stats["seconds"], 1) if stats["seconds"] else None
+    print(f"[INFO] Extracted {stats['pages']} pages from {stats['files']} PDF(s) in {stats['seconds']:.2f}s "
+          f"({stats['pages_per_sec']} pages/s, {workers} worker(s))")
+
+def extract_text_from_pdf(path, workers=1):
+    return "\n".join(text for _, _, text, _ in extract_pages([path], workers))
 
 def parse_money(s):
     if not s:
@@ -19,49 +185,65 @@ def parse_money(s):
         return None
 
 def parse_boq_lines_from_text(text):
-    lines = text.splitlines()
+    return parse_boq_pages([text])
+
+_STRICT_LINE = re.compile(
+    r"^\s*(\d+[\.\d\-]*)\s+(.{10,200}?)\s+([0-9,\.]+)\s*(m3|m2|mt|ton|tonne|kg|cft|rm|ft2|ft|bag|nos)?\s+([Rs\.\s0-9,\.]+)\s+([Rs\.\s0-9,\.]+)",
+    re.IGNORECASE,
+)
+_LOOSE_LINE = re.compile(
+    r"(.{10,80}?)\s+([0-9,\.]+)\s+(m3|mt|kg|cft|bag|rm|m2|ft2)?\s+([Rs\.\s0-9,\.]+)",
+    re.IGNORECASE,
+)
+
+def parse_boq_pages(pages):
+    """
+    Parse BOQ line items from pages as they arrive: page texts, or (text, rows)
+    pairs where rows came from the layout-aware table extractor.
+    Pages with table rows use them; the line regexes only run on the others.
+    Loose matches are only kept (and used) while nothing else has matched.
+    """
     candidates = []
+    loose_candidates = []
 
-    pattern = re.compile(
-        r"^\s*(\d+[\.\d\-]*)\s+(.{10,200}?)\s+([0-9,\.]+)\s*(m3|m2|mt|ton|tonne|kg|cft|rm|ft2|ft|bag|nos)?\s+([Rs\.\s0-9,\.]+)\s+([Rs\.\s0-9,\.]+)",
-        re.IGNORECASE,
-    )
+    for page in pages:
+        text, rows = (page, None) if isinstance(page, str) else page
+        if rows:
+            candidates.extend(rows)
+            continue
+
+        for ln in text.splitlines():
+            m = _STRICT_LINE.search(ln)
+            if m:
+                item_no = m.group(1).strip()
+                desc = m.group(2).strip()
+                qty = float(m.group(3).replace(",", ""))
+                unit = (m.group(4) or "").strip()
+                unit_price = parse_money(m.group(5))
+                total_price = parse_money(m.group(6))
+                candidates.append(
+                    {
+                        "item_no": item_no,
+                        "description": desc,
+                        "unit": unit,
+                        "quantity": qty,
+                        "unit_price": unit_price,
+                        "total_price": total_price,
+                        "raw": ln,
+                    }
+                )
+                continue
+            if candidates:
+                continue
 
-    for ln in lines:
-        m = pattern.search(ln)
-        if m:
-            item_no = m.group(1).strip()
-            desc = m.group(2).strip()
-            qty = float(m.group(3).replace(",", ""))
-            unit = (m.group(4) or "").strip()
-            unit_price = parse_money(m.group(5))
-            total_price = parse_money(m.group(6))
-            candidates.append(
-                {
-                    "item_no": item_no,
-                    "description": desc,
-                    "unit": unit,
-                    "quantity": qty,
-                    "unit_price": unit_price,
-                    "total_price": total_price,
-                    "raw": ln,
-                }
-            )
-
-    if not candidates:
-        loose = re.compile(
-            r"(.{10,80}?)\s+([0-9,\.]+)\s+(m3|mt|kg|cft|bag|rm|m2|ft2)?\s+([Rs\.\s0-9,\.]+)",
-            re.IGNORECASE,
-        )
-        for ln in lines:
-            m = loose.search(ln)
+            m = _LOOSE_LINE.search(ln)
             if m:
                 desc = m.group(1).strip()
                 qty = float(m.group(2).replace(",", ""))
                 unit = (m.group(3) or "").strip()
                 unit_price = parse_money(m.group(4))
                 total_price = qty * unit_price if unit_price else None
-                candidates.append(
+                loose_candidates.append(
                     {
                         "item_no": None,
                         "description": desc,
@@ -73,43 +255,53 @@ def parse_boq_lines_from_text(text):
                     }
                 )
 
-    return candidates
+    return candidates or loose_candidates
 
-def parse_and_store_boq(tender_id, pdf_path, db=None):
+def parse_boq_pdfs(paths, workers=None, pages_per_task=None, stats=None):
+    """Yield (path, items) per PDF; each file is parsed while the pool extracts the next ones"""
+    for path, pages in groupby(extract_pages(paths, workers, pages_per_task, stats), key=lambda page: page[0]):
+        yield path, parse_boq_pages((text, rows) for _, _, text, rows in pages)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def parse_and_store_boq(tender_id, pdf_path, db=None, workers=None, batch_size=None, force=False):
     """
-    1. Extract text from PDF
-    2. Insert BOQ file record
-    3. Parse BOQ line items
-    4. Insert parsed BOQ lines
+    1. Skip files already stored with the same content (unless force)
+    2. Extract text from PDF and parse BOQ line items as pages arrive
+    3. Write the BOQ file record and all its lines in one transaction
     """
 
-    # 1. Extract text
-    text = extract_text_from_pdf(pdf_path)
+    # 1. Unchanged files are not re-parsed
+    digest = file_sha256(pdf_path)
+    stored = get_boq_file(tender_id, pdf_path, db=db)
+    if stored and stored["file_sha256"] == digest and not force:
+        print(f"[INFO] {pdf_path} is unchanged since it was stored (boq_id {stored['boq_id']})")
+        return stored["boq_id"]
+
+    # 2. Extract text (page ranges in parallel when workers > 1) and parse items
+    page_texts = []
+    def pages():
+        for _, _, page_text, rows in extract_pages([pdf_path], workers):
+            page_texts.append(page_text)
+            yield page_text, rows
 
-    # 2. Insert the file record
-    boq_id = insert_boq_file(
+    items = parse_boq_pages(pages())
+
+    # 3. File record + lines, batched, in one transaction (replaces an earlier run's lines)
+    result = store_boq_file(
         tender_id=tender_id,
         file_path=pdf_path,
-        extracted_text=text,
+        extracted_text="\n".join(page_texts),
+        items=items,
+        file_sha256=digest,
+        batch_size=batch_size,
+        force=force,
         db=db
     )
-
-    # 3. Parse items
-    items = parse_boq_lines_from_text(text)
-
-    # 4. Insert each BOQ item
-    for it in items:
-        insert_boq_line(
-            tender_id=tender_id,
-            boq_id=boq_id,
-            item_code=it["item_no"],
-            description=it["description"],
-            unit=it["unit"],
-            quantity=it["quantity"],
-            rate=it["unit_price"],
-            cost=it["total_price"],
-            raw_line=it["raw"],
-            db=db
-        )
-
-    return boq_id
\ No newline at end of file
+    print(f"[INFO] Stored {result['lines']} BOQ lines for tender {tender_id} in {result['seconds']:.2f}s")
+    return result["boq_id"]
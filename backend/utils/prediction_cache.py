@@ -0,0 +1,126 @@
+# backend/utils/prediction_cache.py
+"""
+Per-worker LRU / TTL cache of priced projects.
+
+Entries hold the BOQ, climate breakdown, totals and ML estimate for one set of
+cost-relevant inputs; budget fields are not cached since they depend on the
+request's max_budget_pkr. The key is a hash of those inputs (normalised the way
+the estimator reads them) plus the catalog and model versions, so a price edit or
+a new model simply stops matching old entries. When either version moves, the
+cache is also cleared to free the memory right away.
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from backend.database import cfg
+
+# Fields that change the BOQ, climate totals or ML features; name, location,
+# company and budget do not
+COST_FIELDS = ("road_length_km", "road_width_m", "project_type", "location_type", "traffic_volume", "soil_type")
+
+
+def prediction_key(project, catalog_version, model_version):
+    """Canonical hash of the cost-relevant ProjectInput fields and the versions they were priced with"""
+    values = {}
+    for name in COST_FIELDS:
+        value = getattr(project, name)
+        values[name] = repr(float(value)) if name in ("road_length_km", "road_width_m") else str(value).lower().strip()
+    payload = json.dumps([values, list(catalog_version), model_version], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _deep_size(value):
+    """Approximate bytes held by a JSON-like value"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_size(v) for v in value)
+    return size
+
+
+class PredictionCache:
+    def __init__(self, max_entries=512, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # key -> (stored_at, value, bytes)
+        self._bytes = 0
+        self._versions = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "version_flushes": 0}
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def check_versions(self, catalog_version, model_version):
+        """Clear everything when the catalog or model changed since the last lookup"""
+        versions = (tuple(catalog_version), model_version)
+        if versions != self._versions:
+            with self._lock:
+                if versions != self._versions:
+                    if self._entries:
+                        self._stats["version_flushes"] += 1
+                    self._entries.clear()
+                    self._bytes = 0
+                    self._versions = versions
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                self._drop(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """value must not be mutated afterwards; it is shared by every hit"""
+        size = _deep_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_cache_cfg = cfg.get("prediction_cache") or {}
+_cache = PredictionCache(
+    max_entries=_cache_cfg.get("max_entries", 512),
+    ttl_seconds=_cache_cfg.get("ttl_seconds", 3600)
+)
+
+def get_prediction_cache():
+    return _cache
+
+def get_prediction_cache_stats():
+    return _cache.stats()
@@ -1,137 +1,143 @@
 # backend/utils/price_processor.py
-import pymysql
 import numpy as np
-import yaml
 from datetime import date
 
-with open("config.yaml", "r") as f:
-    cfg = yaml.safe_load(f)
+from backend.database import connection
 
 OUTLIER_SIGMA = 1.5
-
-def get_conn_local():
-    return pymysql.connect(
-        host=cfg["mysql"]["host"],
-        user=cfg["mysql"]["user"],
-        password=cfg["mysql"]["password"],
-        db=cfg["mysql"]["db"],
-        cursorclass=pymysql.cursors.DictCursor,
-        charset="utf8mb4"
-    )
+MAD_TO_SIGMA = 1.4826  # MAD x this = standard deviation, for normally distributed prices
+
+def robust_std(prices):
+    """
+    Spread of all observed prices as 1.4826 x median absolute deviation: outliers
+    barely move it, and unlike the std of the 1.5-sigma-trimmed prices it is not
+    biased low (trimming a normal sample at 1.5 sigma cuts its std by about a quarter).
+    Falls back to the sample std when more than half the prices are identical.
+    """
+    a = np.asarray(prices, dtype=np.float64)
+    if len(a) < 2:
+        return 0.0
+    mad = float(np.median(np.abs(a - np.median(a))))
+    return MAD_TO_SIGMA * mad if mad > 0 else float(a.std(ddof=1))
 
 def aggregate_yearly_prices(year):
-    conn = get_conn_local()
-    cur = conn.cursor()
-
-    cur.execute(
-        "SELECT material_name, canonical_material_id, price_pkr, unit "
-        "FROM material_price_raw WHERE year=%s",
-        (year,)
-    )
-    raws = cur.fetchall()
-
-    groups = {}
-    for r in raws:
-        if r["canonical_material_id"] is not None:
-            key = int(r["canonical_material_id"])
-        else:
-            key = r["material_name"].strip().lower()
-
-        groups.setdefault(key, []).append(r)
-
-    for key, items in groups.items():
-        prices = [float(i["price_pkr"]) for i in items if i["price_pkr"] is not None]
-        if not prices:
-            continue
-
-        a = np.array(prices)
-        mean = float(a.mean())
-        std = float(a.std(ddof=0))
-
-        if std > 0:
-            mask = np.abs(a - mean) <= OUTLIER_SIGMA * std
-            filtered = a[mask]
-            if len(filtered) == 0:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT material_name, canonical_material_id, price_pkr, unit "
+            "FROM material_price_raw WHERE year=%s",
+            (year,)
+        )
+        raws = cur.fetchall()
+
+        groups = {}
+        for r in raws:
+            if r["canonical_material_id"] is not None:
+                key = int(r["canonical_material_id"])
+            else:
+                key = r["material_name"].strip().lower()
+
+            groups.setdefault(key, []).append(r)
+
+        for key, items in groups.items():
+            prices = [float(i["price_pkr"]) for i in items if i["price_pkr"] is not None]
+            if not prices:
+                continue
+
+            a = np.array(prices)
+            mean = float(a.mean())
+            std = float(a.std(ddof=0))
+
+            if std > 0:
+                mask = np.abs(a - mean) <= OUTLIER_SIGMA * std
+                filtered = a[mask]
+                if len(filtered) == 0:
+                    filtered = a
+            else:
                 filtered = a
-        else:
-            filtered = a
 
-        final_mean = float(filtered.mean())
+            final_mean = float(filtered.mean())
+            p10, p50, p90 = np.percentile(a, [10, 50, 90]).tolist()
+
+            # resolve material_id
+            if isinstance(key, int):
+                material_id = key
+            else:
+                cur.execute(
+                    "SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)",
+                    (key,)
+                )
+                row = cur.fetchone()
+                material_id = row["material_id"] if row else None
+
+            if not material_id:
+                continue
+
+            unit_val = items[0].get("unit", "")
 
-        # resolve material_id
-        if isinstance(key, int):
-            material_id = key
-        else:
             cur.execute(
-                "SELECT material_id FROM materials WHERE LOWER(material_name)=LOWER(%s)",
-                (key,)
+                "INSERT INTO material_price_history "
+                "(material_id, year, price_pkr, unit, effective_date) "
+                "VALUES (%s,%s,%s,%s,%s) "
+                "ON DUPLICATE KEY UPDATE price_pkr=VALUES(price_pkr), "
+                "unit=VALUES(unit), effective_date=VALUES(effective_date)",
+                (material_id, year, final_mean, unit_val, date(year, 1, 1))
             )
-            row = cur.fetchone()
-            material_id = row["material_id"] if row else None
 
-        if not material_id:
-            continue
+            # Keep the spread as well, for Monte Carlo cost ranges (backend/utils/cost_uncertainty.py):
+            # std, min/max and quantiles over all prices so the range is not too narrow; only
+            # mean_pkr (the price used above) and sample_count describe the trimmed prices
+            cur.execute(
+                "INSERT INTO material_price_distribution "
+                "(material_id, year, raw_count, sample_count, mean_pkr, std_pkr, "
+                "min_pkr, p10_pkr, p50_pkr, p90_pkr, max_pkr, unit) "
+                "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) "
+                "ON DUPLICATE KEY UPDATE raw_count=VALUES(raw_count), sample_count=VALUES(sample_count), "
+                "mean_pkr=VALUES(mean_pkr), std_pkr=VALUES(std_pkr), min_pkr=VALUES(min_pkr), "
+                "p10_pkr=VALUES(p10_pkr), p50_pkr=VALUES(p50_pkr), p90_pkr=VALUES(p90_pkr), "
+                "max_pkr=VALUES(max_pkr), unit=VALUES(unit)",
+                (material_id, year, len(a), len(filtered), final_mean,
+                 robust_std(a),
+                 float(a.min()), p10, p50, p90, float(a.max()), unit_val)
+            )
 
-        unit_val = items[0].get("unit", "")
+        conn.commit()
 
+def compute_inflation_for_material(material_id, year):
+    with connection() as conn, conn.cursor() as cur:
         cur.execute(
-            "INSERT INTO material_price_history "
-            "(material_id, year, price_pkr, unit, effective_date) "
-            "VALUES (%s,%s,%s,%s,%s) "
-            "ON DUPLICATE KEY UPDATE price_pkr=VALUES(price_pkr), "
-            "unit=VALUES(unit), effective_date=VALUES(effective_date)",
-            (material_id, year, final_mean, unit_val, date(year, 1, 1))
+            "SELECT price_pkr FROM material_price_history WHERE material_id=%s AND year=%s",
+            (material_id, year)
         )
+        cur_r = cur.fetchone()
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.execute(
+            "SELECT price_pkr FROM material_price_history WHERE material_id=%s AND year=%s",
+            (material_id, year - 1)
+        )
+        prev_r = cur.fetchone()
 
-def compute_inflation_for_material(material_id, year):
-    conn = get_conn_local()
-    cur = conn.cursor()
-
-    cur.execute(
-        "SELECT price_pkr FROM material_price_history WHERE material_id=%s AND year=%s",
-        (material_id, year)
-    )
-    cur_r = cur.fetchone()
-
-    cur.execute(
-        "SELECT price_pkr FROM material_price_history WHERE material_id=%s AND year=%s",
-        (material_id, year - 1)
-    )
-    prev_r = cur.fetchone()
-
-    if not cur_r or not prev_r:
-        cur.close()
-        conn.close()
-        return None
-
-    inflation = (float(cur_r["price_pkr"]) - float(prev_r["price_pkr"])) / float(prev_r["price_pkr"])
-
-    cur.execute(
-        "INSERT INTO material_inflation_index (material_id, year, inflation_rate) "
-        "VALUES (%s,%s,%s) "
-        "ON DUPLICATE KEY UPDATE inflation_rate=VALUES(inflation_rate)",
-        (material_id, year, inflation)
-    )
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        if not cur_r or not prev_r:
+            return None
+
+        inflation = (float(cur_r["price_pkr"]) - float(prev_r["price_pkr"])) / float(prev_r["price_pkr"])
+
+        cur.execute(
+            "INSERT INTO material_inflation_index (material_id, year, inflation_rate) "
+            "VALUES (%s,%s,%s) "
+            "ON DUPLICATE KEY UPDATE inflation_rate=VALUES(inflation_rate)",
+            (material_id, year, inflation)
+        )
+
+        conn.commit()
     return inflation
 
 def recompute_all(years):
     for y in years:
         aggregate_yearly_prices(y)
 
-    conn = get_conn_local()
-    cur = conn.cursor()
-    cur.execute("SELECT material_id FROM materials")
-    mats = cur.fetchall()
-    cur.close()
-    conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT material_id FROM materials")
+        mats = cur.fetchall()
 
     for m in mats:
         for y in years:
@@ -0,0 +1,162 @@
+# backend/utils/quantity_estimator.py
+"""
+Vectorized material quantity estimation.
+
+The estimation rules are compiled once into coefficient arrays, one column per
+material:
+
+    q = base * f1 * f2 * f3 * type_mult * post / divisor * terrain * traffic
+
+  base       road area (m²) or road length (km), depending on the material
+  f1..f3     area / length / volume factors (e.g. layer thickness m, m³->cft, share)
+  type_mult  project-type multiplier for the material's group
+  post       extra factor applied after the type multiplier (cement PPC share)
+  divisor    billing-unit divisor (kg per cement bag)
+  terrain    mountainous uplift for terrain-sensitive materials, else 1.0
+  traffic    traffic multiplier for traffic-sensitive materials, else 1.0
+
+Factors are applied in the same order as the original per-material arithmetic,
+and unused slots are 1.0, so a single project gives bit-for-bit the same numbers.
+N projects are evaluated in one pass into an (N x materials) array.
+"""
+import numpy as np
+
+CFT_PER_M3 = 35.315
+
+# Road type multipliers
+PROJECT_TYPE_MULTIPLIERS = {
+    "rural_road": {"cement": 0.35, "bitumen": 0.40, "steel": 0.25, "aggregate": 0.50, "sand": 0.50},
+    "urban_road": {"cement": 0.70, "bitumen": 0.75, "steel": 0.60, "aggregate": 0.80, "sand": 0.80},
+    "highway": {"cement": 1.0, "bitumen": 1.0, "steel": 1.0, "aggregate": 1.0, "sand": 1.0},
+    "expressway": {"cement": 1.40, "bitumen": 1.35, "steel": 1.50, "aggregate": 1.30, "sand": 1.20}
+}
+DEFAULT_PROJECT_TYPE = "highway"
+
+LOCATION_TYPES = ("plain", "mountainous")
+MOUNTAIN_FACTOR = 1.25
+
+TRAFFIC_MULTIPLIERS = {"low": 0.85, "medium": 1.0, "high": 1.20}
+DEFAULT_TRAFFIC = "medium"
+
+# Not used by the rules; listed so inputs can be checked against the schema's ENUM
+SOIL_TYPES = ("normal", "sandy", "clayey", "rocky")
+
+AREA, LENGTH = 0, 1
+
+# (material, base, factors, type group, type scale, post, divisor, terrain?, traffic?)
+QUANTITY_RULES = [
+    # Bitumen (Metric Tons) - 12kg/m² for thicker asphalt
+    ("Bitumen 60/70",             AREA,   (0.012,),                     "bitumen",   1.0, 1.0, 1.0, True,  True),
+    ("Bitumen 80/100",            AREA,   (0.003,),                     "bitumen",   1.0, 1.0, 1.0, False, False),
+    # Asphalt mixes (Metric Tons)
+    ("Asphaltic Concrete (Mix)",  AREA,   (0.150,),                     "bitumen",   1.0, 1.0, 1.0, False, True),
+    ("Premix Carpet (Mix)",       AREA,   (0.075,),                     "bitumen",   1.0, 1.0, 1.0, False, False),
+    # Cement (50 kg bags) - 50kg/m² scaled by road type
+    ("Cement OPC Grade 53",       AREA,   (),                           "cement",   50.0, 1.0, 50.0, True,  True),
+    ("Cement PPC",                AREA,   (),                           "cement",   50.0, 0.3, 50.0, False, False),
+    # Steel (kg)
+    ("Steel Bar 10mm",            AREA,   (4.5,),                       "steel",     1.0, 1.0, 1.0, True,  True),
+    ("Steel Bar 16mm",            AREA,   (3.0,),                       "steel",     1.0, 1.0, 1.0, True,  False),
+    ("Steel Mesh",                AREA,   (0.4,),                       "steel",     1.0, 1.0, 1.0, False, False),
+    # Aggregates (cft) - 200mm base, 300mm subbase
+    ("Crushed Stone 20mm",        AREA,   (0.20, CFT_PER_M3, 0.5),      "aggregate", 1.0, 1.0, 1.0, True,  False),
+    ("Crushed Stone 40mm",        AREA,   (0.30, CFT_PER_M3, 0.4),      "aggregate", 1.0, 1.0, 1.0, False, False),
+    ("Bajri (Sargodha/Deena)",    AREA,   (0.30, CFT_PER_M3, 0.3),      "aggregate", 1.0, 1.0, 1.0, False, False),
+    ("Brick Ballast (Rora)",      AREA,   (0.30, CFT_PER_M3, 0.2),      "aggregate", 1.0, 1.0, 1.0, False, False),
+    ("Kankar",                    AREA,   (0.30, CFT_PER_M3, 0.1),      "aggregate", 1.0, 1.0, 1.0, False, False),
+    # Sand (cft) - 75mm leveling layer
+    ("Ravi Sand",                 AREA,   (0.075, CFT_PER_M3, 0.6),     "sand",      1.0, 1.0, 1.0, False, False),
+    ("Chenab Sand",               AREA,   (0.075, CFT_PER_M3, 0.4),     "sand",      1.0, 1.0, 1.0, False, False),
+    # Additives (Metric Tons)
+    ("Hydrated Lime",             AREA,   (0.0015,),                    "cement",    1.0, 1.0, 1.0, False, False),
+    ("Fly Ash",                   AREA,   (0.003,),                     "cement",    1.0, 1.0, 1.0, False, False),
+    # Road furniture and accessories (per km)
+    ("Thermoplastic Paint",       LENGTH, (200,),                       None,        1.0, 1.0, 1.0, False, True),
+    ("Glass Beads",               LENGTH, (20,),                        None,        1.0, 1.0, 1.0, False, False),
+    ("RCC Pipe 300mm",            LENGTH, (150,),                       None,        1.0, 1.0, 1.0, False, False),
+    ("PVC Pipe 200mm",            LENGTH, (75,),                        None,        1.0, 1.0, 1.0, False, False),
+    ("W-Beam Guardrail",          LENGTH, (300,),                       "steel",     1.0, 1.0, 1.0, True,  False),
+    ("Road Sign (Aluminum)",      LENGTH, (15,),                        None,        1.0, 1.0, 1.0, False, False),
+]
+
+# ----------------------------------------------------------------------------
+# Compiled coefficient arrays
+# ----------------------------------------------------------------------------
+
+MATERIAL_NAMES = tuple(rule[0] for rule in QUANTITY_RULES)
+PROJECT_TYPES = tuple(PROJECT_TYPE_MULTIPLIERS)
+TRAFFIC_LEVELS = tuple(TRAFFIC_MULTIPLIERS)
+
+_IS_LENGTH = np.array([rule[1] == LENGTH for rule in QUANTITY_RULES])
+_FACTORS = np.ones((3, len(QUANTITY_RULES)))
+for _j, _rule in enumerate(QUANTITY_RULES):
+    _FACTORS[:len(_rule[2]), _j] = _rule[2]
+_POST = np.array([rule[5] for rule in QUANTITY_RULES])
+_DIVISOR = np.array([rule[6] for rule in QUANTITY_RULES])
+
+# project type x material (type scale folded in first, like `50 * mult["cement"]`)
+_TYPE_MATRIX = np.array([
+    [rule[4] * PROJECT_TYPE_MULTIPLIERS[ptype][rule[3]] if rule[3] else 1.0 for rule in QUANTITY_RULES]
+    for ptype in PROJECT_TYPES
+])
+# location type x material
+_TERRAIN_MATRIX = np.array([
+    [MOUNTAIN_FACTOR if (loc == "mountainous" and rule[7]) else 1.0 for rule in QUANTITY_RULES]
+    for loc in LOCATION_TYPES
+])
+# traffic level x material
+_TRAFFIC_MATRIX = np.array([
+    [TRAFFIC_MULTIPLIERS[level] if rule[8] else 1.0 for rule in QUANTITY_RULES]
+    for level in TRAFFIC_LEVELS
+])
+
+_TYPE_INDEX = {name: i for i, name in enumerate(PROJECT_TYPES)}
+_LOCATION_INDEX = {name: i for i, name in enumerate(LOCATION_TYPES)}
+_TRAFFIC_INDEX = {name: i for i, name in enumerate(TRAFFIC_LEVELS)}
+
+
+def project_type_index(value):
+    return _TYPE_INDEX.get(value.lower().strip(), _TYPE_INDEX[DEFAULT_PROJECT_TYPE])
+
+def location_type_index(value):
+    # anything other than "mountainous" gets no terrain uplift
+    return _LOCATION_INDEX.get(value.lower().strip(), _LOCATION_INDEX["plain"])
+
+def traffic_index(value):
+    return _TRAFFIC_INDEX.get(value.lower().strip(), _TRAFFIC_INDEX[DEFAULT_TRAFFIC])
+
+
+def _field(project, name):
+    return project[name] if isinstance(project, dict) else getattr(project, name)
+
+def encode_projects(projects):
+    """ProjectInput objects (or dicts) -> arrays accepted by quantities_from_arrays."""
+    length_km = np.array([float(_field(p, "road_length_km")) for p in projects])
+    width_m = np.array([float(_field(p, "road_width_m")) for p in projects])
+    type_idx = np.array([project_type_index(_field(p, "project_type")) for p in projects], dtype=np.intp)
+    location_idx = np.array([location_type_index(_field(p, "location_type")) for p in projects], dtype=np.intp)
+    traffic_idx = np.array([traffic_index(_field(p, "traffic_volume")) for p in projects], dtype=np.intp)
+    return length_km, width_m, type_idx, location_idx, traffic_idx
+
+def quantities_from_arrays(length_km, width_m, type_idx, location_idx, traffic_idx):
+    """
+    Evaluate the compiled rules for N projects at once.
+    Returns an (N x len(MATERIAL_NAMES)) float64 array in billing units.
+    """
+    length_km = np.asarray(length_km, dtype=np.float64)
+    width_m = np.asarray(width_m, dtype=np.float64)
+
+    area_sqm = length_km * 1000 * width_m
+    q = np.where(_IS_LENGTH, length_km[:, None], area_sqm[:, None])
+    q = q * _FACTORS[0] * _FACTORS[1] * _FACTORS[2]
+    q = q * _TYPE_MATRIX[type_idx] * _POST / _DIVISOR
+    q = q * _TERRAIN_MATRIX[location_idx] * _TRAFFIC_MATRIX[traffic_idx]
+    return q
+
+def estimate_quantities_batch(projects):
+    """(N x materials) quantity array for a list of ProjectInput objects or dicts."""
+    return quantities_from_arrays(*encode_projects(projects))
+
+def quantities_to_dict(row):
+    """One row of the quantity array -> {material_name: quantity}, in rule order."""
+    return dict(zip(MATERIAL_NAMES, row.tolist()))
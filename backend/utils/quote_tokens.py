@@ -0,0 +1,110 @@
+# backend/utils/quote_tokens.py
+"""
+Signed, stateless quote tokens.
+
+A quote token carries the cost-relevant project input and the catalog version
+it was priced against, signed with HMAC-SHA256. Saving a quote re-runs the
+(deterministic) estimation against the same catalog version, so nothing has to
+be stored between /api/quote and /api/quote/save and any worker can accept it.
+
+Every worker must sign with the same key. It comes from INTELLIROAD_QUOTE_SECRET
+or quotes.secret; without either, the first worker to start generates one into
+quotes.secret_file and the others (and later restarts) read it from there. A
+deployment spread over several hosts has to set the secret explicitly. When no
+key can be obtained the import fails instead of signing with a per-process key
+that other workers would reject.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import time
+
+from backend.database import cfg
+
+_quote_cfg = cfg.get("quotes") or {}
+
+QUOTE_TTL_SECONDS = _quote_cfg.get("ttl_seconds", 7 * 24 * 3600)
+
+
+def _shared_secret_file(path):
+    """The key in path, generated there first if no worker has done so yet"""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".quote_secret-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            # link() never replaces an existing file: when workers race, the first key wins
+            os.link(tmp, path)
+            print(f"[INFO] Generated quote signing key in {path}")
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(path) as f:
+        secret = f.read().strip()
+    if not secret:
+        raise RuntimeError(f"Quote signing key file {path} is empty")
+    return secret
+
+def _load_secret():
+    secret = os.environ.get("INTELLIROAD_QUOTE_SECRET") or _quote_cfg.get("secret")
+    if secret:
+        return secret
+    path = _quote_cfg.get("secret_file")
+    if not path:
+        raise RuntimeError("quotes.secret is not set and there is no quotes.secret_file to share a key through")
+    try:
+        return _shared_secret_file(path)
+    except OSError as e:
+        raise RuntimeError(f"quotes.secret is not set and the shared key file {path} is unusable: {e}")
+
+_SECRET = _load_secret().encode()
+
+
+class InvalidQuoteToken(ValueError):
+    pass
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload):
+    return _b64encode(hmac.new(_SECRET, payload, hashlib.sha256).digest())
+
+
+def issue_quote_token(project, catalog_version):
+    """project: ProjectInput as a dict; catalog_version: CatalogSnapshot.version"""
+    payload = json.dumps(
+        {"p": project, "v": list(catalog_version), "iat": int(time.time())},
+        separators=(",", ":"), sort_keys=True
+    ).encode()
+    body = _b64encode(payload)
+    return f"{body}.{_sign(body.encode())}"
+
+def read_quote_token(token):
+    """Verify a token and return (project dict, catalog version tuple)"""
+    try:
+        body, signature = token.split(".")
+    except ValueError:
+        raise InvalidQuoteToken("Malformed quote token")
+
+    if not hmac.compare_digest(signature, _sign(body.encode())):
+        raise InvalidQuoteToken("Quote token signature is invalid")
+
+    try:
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        raise InvalidQuoteToken("Malformed quote token")
+
+    if time.time() - payload["iat"] > QUOTE_TTL_SECONDS:
+        raise InvalidQuoteToken("Quote has expired; request a new quote")
+
+    return payload["p"], tuple(payload["v"])
@@ -0,0 +1,172 @@
+# backend/utils/scenario_sweep.py
+"""
+Scenario sweeps: evaluate a base project over a grid of parameter values in one
+vectorized pass (quantity rules + catalog prices), and summarise how much each
+parameter moves cost and CO2.
+"""
+import time
+
+import numpy as np
+
+from backend.utils.cost_engine import price_quantities
+from backend.utils.quantity_estimator import (
+    LOCATION_TYPES, PROJECT_TYPES, TRAFFIC_LEVELS,
+    location_type_index, project_type_index, quantities_from_arrays, traffic_index
+)
+
+NUMERIC_PARAMETERS = ("road_length_km", "road_width_m")
+CATEGORICAL_PARAMETERS = {
+    "project_type": PROJECT_TYPES,
+    "traffic_volume": TRAFFIC_LEVELS,
+    "location_type": LOCATION_TYPES,
+}
+SWEEP_PARAMETERS = NUMERIC_PARAMETERS + tuple(CATEGORICAL_PARAMETERS)
+
+MAX_CELLS = 100_000
+MAX_STEPS = 1000
+
+
+class SweepError(ValueError):
+    pass
+
+
+def expand_numeric(name, spec):
+    """A list of values, or {start, stop, steps} -> list of floats"""
+    if isinstance(spec, dict):
+        steps = int(spec.get("steps", 5))
+        if not 1 <= steps <= MAX_STEPS:
+            raise SweepError(f"{name}: steps must be between 1 and {MAX_STEPS}")
+        values = np.linspace(float(spec["start"]), float(spec["stop"]), steps).tolist()
+    else:
+        values = [float(v) for v in spec]
+    if not values:
+        raise SweepError(f"{name}: empty value list")
+    if min(values) <= 0:
+        raise SweepError(f"{name}: values must be greater than 0")
+    return values
+
+
+def expand_categorical(name, spec):
+    vocabulary = CATEGORICAL_PARAMETERS[name]
+    values = [str(v).lower().strip() for v in spec]
+    if not values:
+        raise SweepError(f"{name}: empty value list")
+    unknown = [v for v in values if v not in vocabulary]
+    if unknown:
+        raise SweepError(f"{name}: unknown values {unknown}; expected one of {list(vocabulary)}")
+    return values
+
+
+def build_axes(base, grid):
+    """
+    base: ProjectInput as a dict; grid: {parameter: values or range}.
+    Parameters not in the grid stay at the base value (a single-value axis).
+    """
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise SweepError(f"Cannot sweep {sorted(unknown)}; supported: {list(SWEEP_PARAMETERS)}")
+
+    axes = {}
+    for name in SWEEP_PARAMETERS:
+        spec = grid.get(name)
+        if name in NUMERIC_PARAMETERS:
+            axes[name] = expand_numeric(name, spec) if spec is not None else [float(base[name])]
+        elif spec is not None:
+            axes[name] = expand_categorical(name, spec)
+        else:
+            axes[name] = [base[name]]
+
+    cells = int(np.prod([len(v) for v in axes.values()]))
+    if cells > MAX_CELLS:
+        raise SweepError(f"Grid has {cells} cells (max {MAX_CELLS})")
+    return axes
+
+
+def _sensitivity(name, values, cost_grid, co2_grid, axis):
+    other_axes = tuple(a for a in range(cost_grid.ndim) if a != axis)
+    mean_cost = cost_grid.mean(axis=other_axes)
+    mean_co2 = co2_grid.mean(axis=other_axes)
+    overall = float(cost_grid.mean())
+
+    result = {
+        "values": values,
+        "mean_cost": mean_cost.tolist(),
+        "mean_co2_tons": mean_co2.tolist(),
+        "cost_swing": float(mean_cost.max() - mean_cost.min()),
+        "cost_swing_percent": float((mean_cost.max() - mean_cost.min()) / overall * 100) if overall else 0.0,
+        "co2_swing_tons": float(mean_co2.max() - mean_co2.min()),
+    }
+    if name in NUMERIC_PARAMETERS:
+        x = np.asarray(values, dtype=np.float64)
+        # least-squares slope of mean cost vs the parameter, and elasticity at the means
+        slope = float(np.polyfit(x, mean_cost, 1)[0]) if len(x) > 1 and np.ptp(x) > 0 else 0.0
+        result["cost_per_unit"] = slope
+        result["elasticity"] = slope * float(x.mean()) / float(mean_cost.mean()) if mean_cost.mean() else 0.0
+    return result
+
+
+def run_sweep(base, axes, catalog, include_cells=True):
+    """
+    Evaluate every combination of the axes. Returns per-cell cost / CO2 / budget
+    status (optional) and per-parameter sensitivities, ranked by cost swing.
+    """
+    started = time.perf_counter()
+    names = list(axes)
+    shape = tuple(len(axes[n]) for n in names)
+    index = np.indices(shape).reshape(len(shape), -1)
+    pos = {n: i for i, n in enumerate(names)}
+
+    length_km = np.asarray(axes["road_length_km"], dtype=np.float64)[index[pos["road_length_km"]]]
+    width_m = np.asarray(axes["road_width_m"], dtype=np.float64)[index[pos["road_width_m"]]]
+    type_idx = np.array([project_type_index(v) for v in axes["project_type"]])[index[pos["project_type"]]]
+    location_idx = np.array([location_type_index(v) for v in axes["location_type"]])[index[pos["location_type"]]]
+    traffic_idx = np.array([traffic_index(v) for v in axes["traffic_volume"]])[index[pos["traffic_volume"]]]
+
+    priced = price_quantities(
+        quantities_from_arrays(length_km, width_m, type_idx, location_idx, traffic_idx), catalog
+    )
+    cost = priced["total_cost"]
+    co2_tons = priced["total_co2_kg"] / 1000
+    max_budget = float(base["max_budget_pkr"])
+    within = cost <= max_budget
+
+    cost_grid = cost.reshape(shape)
+    co2_grid = co2_tons.reshape(shape)
+    sensitivities = {
+        name: _sensitivity(name, axes[name], cost_grid, co2_grid, pos[name])
+        for name in names if len(axes[name]) > 1
+    }
+
+    result = {
+        "cells_evaluated": int(cost.size),
+        "grid": {name: axes[name] for name in names},
+        "summary": {
+            "min_cost": float(cost.min()),
+            "max_cost": float(cost.max()),
+            "mean_cost": float(cost.mean()),
+            "min_co2_tons": float(co2_tons.min()),
+            "max_co2_tons": float(co2_tons.max()),
+            "within_budget_cells": int(within.sum()),
+            "within_budget_share": float(within.mean()),
+        },
+        "sensitivities": sensitivities,
+        "parameter_ranking": sorted(sensitivities, key=lambda n: sensitivities[n]["cost_swing"], reverse=True),
+    }
+
+    if include_cells:
+        columns = {name: np.asarray(axes[name], dtype=object)[index[pos[name]]].tolist() for name in names}
+        costs = cost.tolist()
+        co2s = co2_tons.tolist()
+        withins = within.tolist()
+        result["cells"] = [
+            {
+                **{name: columns[name][i] for name in names},
+                "predicted_cost": costs[i],
+                "co2_emissions_tons": co2s[i],
+                "budget_status": "Within Budget" if withins[i] else "Over Budget",
+            }
+            for i in range(len(costs))
+        ]
+
+    result["elapsed_ms"] = (time.perf_counter() - started) * 1000
+    return result
@@ -0,0 +1,100 @@
+# backend/utils/warmup.py
+"""
+Background warm-up and readiness.
+
+The API starts serving as soon as the app is imported; the database pool, the
+material catalog, the cost model and other heavy pieces load lazily on first use.
+Warmup loads them ahead of traffic on a background thread and records, per
+component, whether it is pending / loading / ready / failed and how long it took.
+Required components that fail are retried, since a database that is still coming
+up should not leave the worker unready for good.
+"""
+import os
+import threading
+import time
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+def process_age_seconds():
+    """Seconds since this process was started (Linux /proc), or None elsewhere"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Warmup:
+    def __init__(self, retry_interval=5.0):
+        self.retry_interval = retry_interval
+        self._loaders = {}
+        self._state = {}
+        self._thread = None
+        self.timings = {}
+
+    def register(self, name, loader, required=False):
+        """loader() is called once on the warm-up thread; required components gate readiness"""
+        self._loaders[name] = (loader, required)
+        self._state[name] = {"status": PENDING, "required": required, "seconds": None, "error": None}
+
+    def mark(self, name, seconds):
+        self.timings[name] = round(seconds, 3)
+
+    def _load(self, name):
+        loader, _ = self._loaders[name]
+        state = self._state[name]
+        state["status"] = LOADING
+        started = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            state.update(status=FAILED, error=str(e), seconds=time.perf_counter() - started)
+            print(f"[WARN] Warm-up of {name} failed: {e}")
+            return False
+        state.update(status=READY, error=None, seconds=time.perf_counter() - started)
+        return True
+
+    def _run(self):
+        started = time.perf_counter()
+        for name in self._loaders:
+            self._load(name)
+        self.mark("warmup_s", time.perf_counter() - started)
+
+        age = process_age_seconds()
+        if age is not None:
+            self.mark("process_to_warm_s", age)
+        print(f"[INFO] Warm-up finished in {self.timings['warmup_s']:.2f}s: "
+              + ", ".join(f"{n}={s['status']}" for n, s in self._state.items()))
+
+        # Keep retrying required components (e.g. the database was not up yet)
+        while True:
+            failed = [n for n, s in self._state.items() if s["required"] and s["status"] == FAILED]
+            if not failed:
+                return
+            time.sleep(self.retry_interval)
+            for name in failed:
+                self._load(name)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    @property
+    def ready(self):
+        """All required components loaded, and no optional one still in progress"""
+        return all(
+            s["status"] == READY if s["required"] else s["status"] in (READY, FAILED)
+            for s in self._state.values()
+        )
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "components": {name: dict(state) for name, state in self._state.items()},
+            "startup": dict(self.timings),
+        }
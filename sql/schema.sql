@@ -173,8 +173,14 @@ CREATE TABLE IF NOT EXISTS tenders (
     boq_json JSON,
     used_for_training BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_used_for_training (used_for_training)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_used_for_training (used_for_training),
+    INDEX idx_tenders_updated (updated_at, tender_id)
 );
+-- Existing databases:
+--   ALTER TABLE tenders
+--     ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--     ADD INDEX idx_tenders_updated (updated_at, tender_id);
 
 -- 11. ML TRAINING DATA
 -- ============================================================================
@@ -198,8 +204,86 @@ CREATE TABLE IF NOT EXISTS model_training_logs (
     completed_at DATETIME,
     log_output TEXT,
     error_message TEXT,
+    feature_snapshot_hash CHAR(64),  -- sha256 of the feature store snapshot the model was fitted on
     FOREIGN KEY (admin_id) REFERENCES users(user_id)
 );
+-- Existing databases:
+--   ALTER TABLE model_training_logs ADD COLUMN feature_snapshot_hash CHAR(64);
+
+-- 12. MATERIAL PRICE DISTRIBUTION (Observed Price Spread per Year)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS material_price_distribution (
+    distribution_id INT PRIMARY KEY AUTO_INCREMENT,
+    material_id INT NOT NULL,
+    year INT NOT NULL,
+    raw_count INT NOT NULL,              -- all observed prices
+    sample_count INT NOT NULL,           -- prices left after 1.5-sigma outlier trimming
+    mean_pkr DOUBLE NOT NULL,            -- trimmed mean (= material_price_history.price_pkr)
+    std_pkr DOUBLE NOT NULL DEFAULT 0,   -- 1.4826 x MAD of all prices, untrimmed
+    min_pkr DOUBLE,                      -- min, quantiles and max: all prices, untrimmed
+    p10_pkr DOUBLE,
+    p50_pkr DOUBLE,
+    p90_pkr DOUBLE,
+    max_pkr DOUBLE,
+    unit VARCHAR(50),
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (material_id) REFERENCES materials(material_id) ON DELETE CASCADE,
+    UNIQUE KEY unique_material_year (material_id, year)
+);
+-- Existing databases: rows written before min/quantiles covered all prices are
+-- restated by re-running price_processor.recompute_all for their years
+
+-- 13. ETL WATERMARKS (Last Processed Change per Incremental Job)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+    job_name VARCHAR(100) PRIMARY KEY,
+    watermark_at TIMESTAMP NULL,
+    last_tender_id INT NOT NULL DEFAULT 0,
+    rows_processed INT NOT NULL DEFAULT 0,
+    last_run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- 14. TENDER BOQ FILES (Parsed BOQ PDFs and their Line Items)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS boq_files (
+    boq_id INT PRIMARY KEY AUTO_INCREMENT,
+    tender_id INT NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    file_sha256 CHAR(64),  -- re-ingesting an unchanged file is a no-op
+    extracted_text LONGTEXT,
+    line_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (tender_id) REFERENCES tenders(tender_id) ON DELETE CASCADE,
+    UNIQUE KEY unique_tender_file (tender_id, file_path)
+);
+CREATE TABLE IF NOT EXISTS boq_items (
+    item_id INT PRIMARY KEY AUTO_INCREMENT,
+    tender_id INT NOT NULL,
+    boq_id INT NOT NULL,
+    line_no INT,
+    item_code VARCHAR(50),
+    description TEXT,
+    unit VARCHAR(50),
+    quantity DOUBLE,
+    rate DOUBLE,
+    cost DOUBLE,
+    raw_line TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (boq_id) REFERENCES boq_files(boq_id) ON DELETE CASCADE,
+    UNIQUE KEY unique_boq_line (boq_id, line_no),
+    INDEX idx_boq_items_tender (tender_id)
+);
+-- Existing databases:
+--   ALTER TABLE boq_files
+--     ADD COLUMN file_sha256 CHAR(64),
+--     ADD COLUMN line_count INT NOT NULL DEFAULT 0,
+--     ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--     ADD UNIQUE KEY unique_tender_file (tender_id, file_path);
+--   ALTER TABLE boq_items
+--     ADD COLUMN line_no INT,
+--     ADD COLUMN raw_line TEXT,
+--     ADD UNIQUE KEY unique_boq_line (boq_id, line_no);
 
 INSERT INTO users (
     user_id, name, email, phone, username, password_hash, role